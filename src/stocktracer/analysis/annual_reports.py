@@ -7,6 +7,7 @@ from beartype import beartype
 
 import stocktracer.collector.sec as Sec
 from stocktracer.interface import Analysis as AnalysisInterface
+from stocktracer.interface import Requirements
 
 logger = logging.getLogger(__name__)
 
@@ -40,20 +41,30 @@ class Analysis(AnalysisInterface):
     """Class for collecting and processing annual report data."""
 
     under_development = True
+    # The rows of the report are indexed by ticker
+    per_ticker = True
 
-    def analyze(self) -> Optional[pd.DataFrame]:
+    def requirements(self) -> Requirements:
         # By omitting the tags, we'll collect all tags for securities
-        sec_filter = Sec.Filter(
-            # tags=["EarningsPerShareDiluted"],
-            years=1,  # Over the past 1 years
-            last_report=self.options.final_report,
-            only_annual=True,  # We only want the 10-K
+        return Requirements(
+            Sec.Filter(
+                # tags=["EarningsPerShareDiluted"],
+                years=1,  # Over the past 1 years
+                last_report=self.options.final_report,
+                only_annual=True,  # We only want the 10-K
+            )
         )
 
+    def analyze(self) -> Optional[pd.DataFrame]:
         # Create an SEC Data Source
-        table = create_normalized_sec_table(sec_filter, self.options.tickers, False)
+        table = create_normalized_sec_table(
+            self.requirements().sec_filter, self.options.tickers, False
+        )
 
         return table.data
 
+    # Reuse documentation from parent
+    requirements.__doc__ = AnalysisInterface.requirements.__doc__
+
     # Reuse documentation from parent
     analyze.__doc__ = AnalysisInterface.analyze.__doc__
@@ -7,6 +7,7 @@ from beartype import beartype
 
 import stocktracer.collector.sec as Sec
 from stocktracer.interface import Analysis as AnalysisInterface
+from stocktracer.interface import Requirements
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +17,30 @@ class Analysis(AnalysisInterface):
     """Class that calculates the EPS slope."""
 
     under_development = True
+    # The slope of each ticker only depends on its own reports
+    per_ticker = True
     years_of_analysis = 5
 
-    def analyze(self) -> Optional[pd.DataFrame]:
+    def requirements(self) -> Requirements:
         # Create the filter we'll use to scrape the results
-        sec_filter = Sec.Filter(
-            tags=["EarningsPerShareDiluted"],
-            years=self.years_of_analysis,
-            last_report=self.options.final_report,
-            only_annual=True,  # We only want the 10-K
+        return Requirements(
+            Sec.Filter(
+                tags=["EarningsPerShareDiluted"],
+                years=self.years_of_analysis,
+                last_report=self.options.final_report,
+                only_annual=True,  # We only want the 10-K
+            )
         )
 
+    def analyze(self) -> Optional[pd.DataFrame]:
         # This is an expensive operation
-        results = Sec.filter_data(tickers=self.options.tickers, sec_filter=sec_filter)
+        results = Sec.filter_data(
+            tickers=self.options.tickers, sec_filter=self.requirements().sec_filter
+        )
         return results.select("slope").data
 
+    # Reuse documentation from parent
+    requirements.__doc__ = AnalysisInterface.requirements.__doc__
+
     # Reuse documentation from parent
     analyze.__doc__ = AnalysisInterface.analyze.__doc__
@@ -6,11 +6,50 @@ import pandas as pd
 from beartype import beartype
 
 import stocktracer.collector.sec as Sec
+from stocktracer import metrics
 from stocktracer.analysis.annual_reports import create_normalized_sec_table
 from stocktracer.interface import Analysis as AnalysisInterface
+from stocktracer.interface import Requirements
 
 logger = logging.getLogger(__name__)
 
+metrics.register("delta-ROA", "delta(`return-on-assets`)", "Change in ROA")
+metrics.register(
+    "accruals",
+    "NetCashProvidedByUsedInOperatingActivities / Assets",
+    "Operating cash flow relative to the total assets",
+)
+
+# - Profitability
+#     - Return on Assets (ROA) (1 point if it is positive in the current year, 0 otherwise);
+metrics.register("ROA>0", "`return-on-assets` > 0")
+#     - Operating Cash Flow (1 point if it is positive in the current year, 0 otherwise);
+metrics.register("NetIncome>0", "`net-income` > 0")
+#     - Change in Return of Assets (ROA) (1 point if ROA is higher in the current year compared to the previous one, 0 otherwise);
+metrics.register("delta-ROA>0", "`delta-ROA` > 0")
+#     - Accruals (1 point if Operating Cash Flow/Total Assets is higher than ROA in the current year, 0 otherwise);
+metrics.register("CF/Total-Assets>ROA", "accruals > `return-on-assets`")
+# - Leverage, Liquidity and Source of Funds
+#     - Change in Leverage (long-term) ratio (1 point if the ratio is lower this year compared to the previous one, 0 otherwise);
+metrics.register("debt-to-assets<last-year", "delta(`debt-to-assets`) < 0")
+#     - Change in Current ratio (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
+metrics.register("current-ratio>last-year", "delta(`current-ratio`) > 0")
+#     - Change in the number of shares (1 point if no new shares were issued during the last year);
+metrics.register("shares-issued==0", "CommonStockSharesIssued == 0")
+# - Operating Efficiency
+#     - Change in Gross Margin (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
+#     - Change in Asset Turnover ratio (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
+
+F_SCORE_TAGS = [
+    "ROA>0",
+    "NetIncome>0",
+    "delta-ROA>0",
+    "CF/Total-Assets>ROA",
+    "debt-to-assets<last-year",
+    "current-ratio>last-year",
+    "shares-issued==0",
+]
+
 
 @beartype
 class Analysis(AnalysisInterface):
@@ -43,25 +82,31 @@ class Analysis(AnalysisInterface):
     """
 
     under_development = True
+    # Scores are taken from the latest fiscal year of all the tickers analyzed
+    per_ticker = False
     years_of_analysis = 2
 
-    def analyze(self) -> Optional[pd.DataFrame]:
+    def requirements(self) -> Requirements:
         # Create the filter to scrape the data we need for processing
-        sec_filter = Sec.Filter(
-            tags=[
-                "EarningsPerShareDiluted",
-                "CommonStockSharesIssued",
-                "AssetsCurrent",
-                "LiabilitiesCurrent",
-                "Assets",
-                "OperatingIncomeLoss",
-                "NetCashProvidedByUsedInOperatingActivities",
-            ],
-            years=self.years_of_analysis,
-            last_report=self.options.final_report,
-            only_annual=True,  # We only want the 10-K
+        return Requirements(
+            Sec.Filter(
+                tags=[
+                    "EarningsPerShareDiluted",
+                    "CommonStockSharesIssued",
+                    "AssetsCurrent",
+                    "LiabilitiesCurrent",
+                    "Assets",
+                    "OperatingIncomeLoss",
+                    "NetCashProvidedByUsedInOperatingActivities",
+                ],
+                years=self.years_of_analysis,
+                last_report=self.options.final_report,
+                only_annual=True,  # We only want the 10-K
+            )
         )
 
+    def analyze(self) -> Optional[pd.DataFrame]:
+        sec_filter = self.requirements().sec_filter
         table = create_normalized_sec_table(sec_filter, self.options.tickers, False)
         table.data.fillna(0, inplace=True)
 
@@ -73,84 +118,12 @@ class Analysis(AnalysisInterface):
         logger.debug(f"filtered_data:\n{table.data}")
         max_year = int(table.data.index.get_level_values("fy").max())
 
-        # Do calculations
-        table.calculate_return_on_assets("ROA")
-        table.calculate_net_income("net-income")
-        table.calculate_delta(column_name="delta-ROA", delta_of="ROA")
-        table.calculate_debt_to_assets("debt-to-assets")
-        table.calculate_current_ratio("current-ratio")
-
-        # fscore = pd.DataFrame(index=table.data.index)
-        # logger.debug(f"\n{fscore}")
-
-        f_score_tags = []
-
-        # - Profitability
-        #     - Return on Assets (ROA) (1 point if it is positive in the current year, 0 otherwise);
-        table.data["ROA>0"] = (table.data["ROA"] > 0).astype(int)
-        f_score_tags.append("ROA>0")
-        # TODO: select last year by ROA and assign a 1 if it's positive
-        # logger.debug(f"\n{fscore}")
-
-        #     - Operating Cash Flow (1 point if it is positive in the current year, 0 otherwise);
-
-        table.data["NetIncome>0"] = (table.data["net-income"] > 0).astype(int)
-        f_score_tags.append("NetIncome>0")
-        #     - Change in Return of Assets (ROA) (1 point if ROA is higher in the current year compared to the previous one, 0 otherwise);
-        table.data["delta-ROA>0"] = (table.data["delta-ROA"] > 0).astype(int)
-        f_score_tags.append("delta-ROA>0")
-
-        logger.debug(f"ROA:\n{table.data['ROA']}")
-        logger.debug(f"delta ROA:\n{table.data['delta-ROA']}")
-
-        #     - Accruals (1 point if Operating Cash Flow/Total Assets is higher than ROA in the current year, 0 otherwise);
-        table.data["accruals"] = (
-            table.data["NetCashProvidedByUsedInOperatingActivities"]
-            / table.data["Assets"]
-        )
-        table.data["CF/Total-Assets>ROA"] = (
-            table.data["accruals"] > table.data["ROA"]
-        ).astype(int)
-        f_score_tags.append("CF/Total-Assets>ROA")
-
-        logger.debug(f"accruals:\n{table.data['accruals']}")
-        logger.debug(f"CF/Total-Assets>ROA:\n{table.data['CF/Total-Assets>ROA']}")
-
-        # - Leverage, Liquidity and Source of Funds
-        #     - Change in Leverage (long-term) ratio (1 point if the ratio is lower this year compared to the previous one, 0 otherwise);
-        table.calculate_delta("debt-to-assets-delta", delta_of="debt-to-assets")
-        table.data["debt-to-assets<last-year"] = (
-            table.data["debt-to-assets-delta"] < 0
-        ).astype(int)
-        f_score_tags.append("debt-to-assets<last-year")
-
-        logger.debug(f"debt-to-assets-delta:\n{table.data['debt-to-assets-delta']}")
-        logger.debug(
-            f"debt-to-assets<last-year:\n{table.data['debt-to-assets<last-year']}"
-        )
-
-        #     - Change in Current ratio (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
-        table.calculate_delta("current-ratio-delta", delta_of="current-ratio")
-        table.data["current-ratio>last-year"] = (
-            table.data["current-ratio-delta"] > 0
-        ).astype(int)
-        f_score_tags.append("current-ratio>last-year")
-
-        logger.debug(f"current-ratio-delta:\n{table.data['current-ratio-delta']}")
-        logger.debug(
-            f"current-ratio>last-year:\n{table.data['current-ratio>last-year']}"
-        )
-
-        #     - Change in the number of shares (1 point if no new shares were issued during the last year);
-        table.data["shares-issued==0"] = (
-            table.data["CommonStockSharesIssued"] == 0
-        ).astype(int)
-        f_score_tags.append("shares-issued==0")
-        # - Operating Efficiency
-        #     - Change in Gross Margin (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
-        #     - Change in Asset Turnover ratio (1 point if it is higher in the current year compared to the previous one, 0 otherwise);
+        # Every criterion is computed in a single pass over the table
+        scores = Sec.Results.Table(table.evaluate(F_SCORE_TAGS))
+        logger.debug(f"f-score criteria:\n{scores}")
 
-        return table.slice(year=max_year, tags=f_score_tags)
+        return scores.slice(year=max_year, tags=F_SCORE_TAGS)
 
     # Reuse documentation from parent
+    requirements.__doc__ = AnalysisInterface.requirements.__doc__
     analyze.__doc__ = AnalysisInterface.analyze.__doc__
@@ -12,6 +12,7 @@ from stocktracer import cache
 from stocktracer.analysis.annual_reports import create_normalized_sec_table
 from stocktracer.collector.sec import Filter as SecFilter
 from stocktracer.interface import Analysis as AnalysisInterface
+from stocktracer.interface import Requirements
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +22,13 @@ class Analysis(AnalysisInterface):
     """Class for collecting and processing annual report data."""
 
     under_development = True
+    # The model is trained on the tickers analyzed along with the training tickers
+    per_ticker = False
 
-    def analyze(self) -> Optional[pd.DataFrame]:
+    good_tickers = frozenset({"aapl", "msft", "goog", "hd", "acn", "nvda"})
+    bad_tickers = frozenset({"wdc", "nclh", "grpn", "capr"})
+
+    def requirements(self) -> Requirements:
         # Build a training set involving good companies
         sec_filter = SecFilter(
             tags=[
@@ -38,26 +44,21 @@ class Analysis(AnalysisInterface):
             last_report=self.options.final_report,
             only_annual=True,  # We only want the 10-K
         )
-
-        good_tickers = set()
-        good_tickers.add("aapl")
-        good_tickers.add("msft")
-        good_tickers.add("goog")
-        good_tickers.add("hd")
-        good_tickers.add("acn")
-        good_tickers.add("nvda")
-
-        bad_tickers = set()
-        bad_tickers.add("wdc")
-        bad_tickers.add("nclh")
-        bad_tickers.add("grpn")
-        bad_tickers.add("capr")
         combined_tickers = list(
-            good_tickers.union(self.options.tickers).union(bad_tickers)
+            self.good_tickers.union(self.options.tickers).union(self.bad_tickers)
         )
+        return Requirements(sec_filter, combined_tickers)
+
+    def analyze(self) -> Optional[pd.DataFrame]:
+        requirements = self.requirements()
+        good_tickers = set(self.good_tickers)
+        bad_tickers = set(self.bad_tickers)
 
         # Create an SEC Data Source
-        table = create_normalized_sec_table(sec_filter, combined_tickers, False)
+        assert requirements.tickers is not None
+        table = create_normalized_sec_table(
+            requirements.sec_filter, requirements.tickers, False
+        )
 
         table.calculate_return_on_assets("ROA")
         table.calculate_net_income("net_income")
@@ -103,4 +104,5 @@ class Analysis(AnalysisInterface):
         return pd.DataFrame()
 
     # Reuse documentation from parent
+    requirements.__doc__ = AnalysisInterface.requirements.__doc__
     analyze.__doc__ = AnalysisInterface.analyze.__doc__
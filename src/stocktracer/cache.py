@@ -1,13 +1,43 @@
-"""This module takes care of managing caching configuration."""
-import hashlib
+"""This module takes care of managing caching configuration.
+
+The caches are opened the first time they're used rather than when this module is
+imported, so commands that don't need them, such as `stocktracer --help`, and worker
+processes start without opening any databases.
+
+The size of every cache can be limited, see `stocktracer.retention`. Values stored in
+the results cache are compressed, see `stocktracer.compression`. The daemon also keeps
+the values it used most recently in memory, up to `STOCKTRACER_HOT_SIZE_LIMIT`, so
+requests repeating them don't read and decode them from the disk again.
+
+Older versions kept the downloaded archives in a requests-cache database,
+`data.sqlite`. The archives it holds are moved to the archive store the first time the
+store is used, and the database is removed.
+"""
+import functools
+import logging
 import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
 from datetime import timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
 
 from beartype import beartype
-from diskcache import Cache
+from beartype.typing import Callable
 from platformdirs import user_cache_dir
-from requests_cache import CachedSession, SQLiteCache
+
+from stocktracer import retention
+from stocktracer.collector.dates import ReportDate
+
+if TYPE_CHECKING:  # pragma: no cover
+    from diskcache import Cache
+    from requests_cache import CachedSession
+
+    from stocktracer.collector.archive import ArchiveStore
+
+logger = logging.getLogger(__name__)
 
 
 @beartype
@@ -32,34 +62,305 @@ def get_cache_dir() -> Path:
 CACHE_DIR = get_cache_dir()
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-results = Cache(directory=CACHE_DIR / "results", tag_index=True)
+# Archives downloaded by older versions, see `_migrate_sec_data`
+LEGACY_SEC_DATA = CACHE_DIR / "data.sqlite"
+
+# Created on first use by `__getattr__`
+results: "Cache"
+sec_archives: "ArchiveStore"
+sec_tickers: "CachedSession"
+
+
+def _create_results() -> "Cache":
+    # pylint: disable=import-outside-toplevel
+    from diskcache import Cache
+
+    from stocktracer import versions
+    from stocktracer.compression import CompressedDisk
+
+    results_cache = Cache(
+        directory=CACHE_DIR / "results",
+        tag_index=True,
+        disk=CompressedDisk,
+        size_limit=retention.size_limit("results", default="1GB"),
+        eviction_policy=os.environ.get(
+            "STOCKTRACER_RESULTS_EVICTION_POLICY", "least-recently-used"
+        ),
+    )
+
+    # Only evict the stages whose code changed
+    versions.refresh(results_cache)
+    results_cache.delete("sec_file_hash")
+    return results_cache
+
+
+def _create_sec_archives() -> "ArchiveStore":
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector.archive import ArchiveStore
+
+    store = ArchiveStore(
+        directory=CACHE_DIR / "archives",
+        expire_after=timedelta(days=365 * 5),
+        size_limit=retention.size_limit("archives"),
+    )
+    _migrate_sec_data(store)
+    return store
+
+
+def _remove_sec_data(legacy: Path) -> int:
+    removed = 0
+    # Including the journal of the database
+    for path in legacy.parent.glob(f"{legacy.name}*"):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def _migrate_sec_data(store: "ArchiveStore", legacy: Path = LEGACY_SEC_DATA) -> int:
+    """Move the archives cached by older versions into the archive store.
+
+    The database is removed afterwards, even if some archives couldn't be read. Those
+    are downloaded again.
+
+    Args:
+        store (ArchiveStore): the archive store
+        legacy (Path): requests-cache database of the older versions
+
+    Returns:
+        int: number of archives moved
+    """
+    if not legacy.exists():
+        return 0
+    # pylint: disable=import-outside-toplevel
+    from requests_cache import SQLiteCache
+
+    logger.info(f"moving the archives cached in {legacy} to the archive store")
+    migrated = 0
+    try:
+        responses = SQLiteCache(db_path=legacy).responses
+        try:
+            for response in responses.values():
+                if response.status_code == 200 and store.metadata(response.url) is None:
+                    store.put(response.url, [response.content])
+                    migrated += 1
+        finally:
+            responses.close()
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger.warning(f"unable to move the archives cached in {legacy}: {error}")
+    _remove_sec_data(legacy)
+    logger.info(f"moved {migrated} archives to the archive store")
+    return migrated
+
+
+def _create_sec_tickers() -> "CachedSession":
+    # pylint: disable=import-outside-toplevel
+    from requests_cache import CachedSession, SQLiteCache
+
+    return CachedSession(
+        "tickers",
+        backend=SQLiteCache(db_path=CACHE_DIR / "tickers"),
+        expire_after=timedelta(days=365),
+        stale_if_error=True,
+    )
+
+
+_FACTORIES: dict[str, Callable[[], Any]] = {
+    "results": _create_results,
+    "sec_archives": _create_sec_archives,
+    "sec_tickers": _create_sec_tickers,
+}
+_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    """Create the caches the first time they're used.
+
+    Args:
+        name (str): name of the cache
+
+    Raises:
+        AttributeError: if there's no such cache
 
+    Returns:
+        Any: the cache
+    """
+    if name not in _FACTORIES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lock:
+        module = sys.modules[__name__]
+        if name not in module.__dict__:
+            setattr(module, name, _FACTORIES[name]())
+        return module.__dict__[name]
+
+
+class HotCache:
+    """Values of the results cache kept in memory, the least recently used are dropped
+    first once they outgrow `size_limit`.
+
+    Values are shared by every call returning them, so they must not be modified.
+    """
+
+    def __init__(self, size_limit: Optional[int]):
+        """Create an empty cache.
+
+        Args:
+            size_limit (Optional[int]): bytes the values may use. Defaults to no
+                limit.
+        """
+        self.size_limit = size_limit
+        self.size = 0
+        # Keys of the results cache can hold lists, so they're compared pickled the
+        # same way the results cache does
+        self._entries: OrderedDict[bytes, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
-sec_data = CachedSession(
-    "data",
-    backend=SQLiteCache(db_path=CACHE_DIR / "data"),
-    serializer="pickle",
-    expire_after=timedelta(days=365 * 5),
-    stale_if_error=True,
-)
-sec_tickers = CachedSession(
-    "tickers",
-    backend=SQLiteCache(db_path=CACHE_DIR / "tickers"),
-    expire_after=timedelta(days=365),
-    stale_if_error=True,
-)
+    def get(self, key: tuple) -> Optional[Any]:
+        """Get a value, marking it as the most recently used.
 
+        Args:
+            key (tuple): key of the value in the results cache
 
-dir_name = os.path.dirname(__file__)
-with open(os.path.join(dir_name, "collector/sec.py"), encoding="utf8") as opened_file:
-    readFile = opened_file.read()
+        Returns:
+            Optional[Any]: the value or None if it's not in memory
+        """
+        pickled = pickle.dumps(key)
+        with self._lock:
+            if pickled not in self._entries:
+                return None
+            self._entries.move_to_end(pickled)
+            return self._entries[pickled][0]
 
+    def set(self, key: tuple, value: Any, size: int):
+        """Keep a value in memory, dropping the least recently used ones to fit it.
+
+        Args:
+            key (tuple): key of the value in the results cache
+            value (Any): the value
+            size (int): bytes used by the value
+        """
+        if self.size_limit is not None and size > self.size_limit:
+            return
+        pickled = pickle.dumps(key)
+        with self._lock:
+            if pickled in self._entries:
+                self.size -= self._entries.pop(pickled)[1]
+            self._entries[pickled] = (value, size)
+            self.size += size
+            while self.size_limit is not None and self.size > self.size_limit:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.size -= dropped
+
+
+hot: Optional[HotCache] = None
+"""Values kept in memory by the daemon, see `keep_hot`."""
+
+
+@beartype
+def keep_hot(size_limit: Optional[int] = None):
+    """Keep the values of memoized functions in memory once they're used.
+
+    Only the daemon does this: a single invocation of the CLI rarely uses the same
+    values twice.
+
+    Args:
+        size_limit (Optional[int]): bytes the values may use. Defaults to
+            `STOCKTRACER_HOT_SIZE_LIMIT`, or 1GB.
+    """
+    global hot  # pylint: disable=global-statement
+    if size_limit is None:
+        size_limit = retention.size_limit("hot", default="1GB")
+    hot = HotCache(size_limit)
+
+
+def memoize(
+    canonical: Optional[Callable[..., dict[str, Any]]] = None,
+    weigh: Optional[Callable[[Any], int]] = None,
+    **options,
+) -> Callable[[Callable], Callable]:
+    """Same as `results.memoize` but the cache is only opened once the function is called.
+
+    Args:
+        canonical (Optional[Callable[..., dict[str, Any]]]): takes the arguments of
+            the function and returns them as keyword arguments in a canonical form.
+            Calls with equivalent arguments then share the same cache entry.
+        weigh (Optional[Callable[[Any], int]]): takes a value of the function and
+            returns the bytes it uses. Values are only kept in `hot` when it's set.
+        **options: options of `diskcache.Cache.memoize`
+
+    Returns:
+        Callable[[Callable], Callable]: the decorator
+    """
+
+    def decorator(function: Callable) -> Callable:
+        def memoized() -> Callable:
+            return sys.modules[__name__].results.memoize(**options)(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if canonical is not None:
+                args, kwargs = (), canonical(*args, **kwargs)
+            if hot is None or weigh is None:
+                return memoized()(*args, **kwargs)
+            key = memoized().__cache_key__(*args, **kwargs)
+            value = hot.get(key)
+            if value is None:
+                value = memoized()(*args, **kwargs)
+                hot.set(key, value, weigh(value))
+            return value
+
+        def cache_key(*args, **kwargs) -> tuple:
+            if canonical is not None:
+                args, kwargs = (), canonical(*args, **kwargs)
+            return memoized().__cache_key__(*args, **kwargs)
+
+        wrapper.__cache_key__ = cache_key  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+def prune(years: Optional[int] = None) -> dict[str, int]:
+    """Drop the quarters outside the retention window and trim the caches to size.
+
+    Args:
+        years (Optional[int]): number of years kept before the current quarter.
+            Defaults to `STOCKTRACER_RETENTION_YEARS`, which keeps every quarter
+            when it's not set.
+
+    Returns:
+        dict[str, int]: number of entries removed from each cache
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector import sec
 
-SEC_FILE_HASH = hashlib.sha256(readFile.encode()).hexdigest()
+    module = sys.modules[__name__]
+    oldest = retention.oldest_retained(years)
+    removed = {
+        "archives": len(module.sec_archives.prune(oldest))
+        + len(module.sec_archives.trim()),
+        "store": len(sec.columnar_store.prune(oldest)) + len(sec.columnar_store.trim()),
+        "cube": len(sec.fundamentals_cube.prune(oldest))
+        + len(sec.fundamentals_cube.trim()),
+        "results": _prune_results(module.results, oldest),
+        "legacy": _remove_sec_data(LEGACY_SEC_DATA),
+    }
+    return removed
 
-if SEC_FILE_HASH != results.get("sec_file_hash"):
-    results.evict(tag="sec")
-    results.evict(tag="results")
 
-# Update the cache that keeps track of when files are modified.
-results.set("sec_file_hash", SEC_FILE_HASH)
+def _prune_results(results_cache: "Cache", oldest: Optional[ReportDate]) -> int:
+    removed = 0
+    if oldest is not None:
+        for key in list(results_cache.iterkeys()):
+            # Extractions are keyed by their quarter, see `Extraction.key`
+            if isinstance(key, tuple) and key[:1] == ("extraction",):
+                quarter = key[1]
+            elif isinstance(key, str) and key.startswith("num-index-"):
+                quarter = key[len("num-index-") :]
+            else:
+                continue
+            if not retention.is_retained(quarter, oldest) and results_cache.delete(key):
+                removed += 1
+    return removed + results_cache.cull()
@@ -4,22 +4,49 @@ import io
 import logging
 import warnings
 from pathlib import Path
-from typing import Literal, Optional, Union
+from typing import TYPE_CHECKING, Any, Literal, Optional, Union
 
-import pandas as pd
 from beartype import beartype
 from beartype.typing import Sequence, Tuple
 
-from stocktracer import cache
-from stocktracer.interface import Analysis as AnalysisInterface
-from stocktracer.interface import Options as CliOptions
-from stocktracer.interface import ReportDate
+from stocktracer import cache, server, versions
+from stocktracer.collector import memory
+from stocktracer.collector.dates import ReportDate
+
+# pandas and the analysis modules take most of the startup time, so they're only
+# imported once a command needs them. Type hints refer to them by their full name,
+# which beartype resolves when the methods are first called.
+if TYPE_CHECKING:  # pragma: no cover
+    import pandas
+
+    import stocktracer.interface
 
 logger = logging.getLogger(__name__)
 
 
 @beartype
-def get_analysis_instance(module_name: str, options: CliOptions) -> AnalysisInterface:
+def get_analysis_class(module_name: str) -> type:
+    """Dynamically import the Analysis class of a module.
+
+    Args:
+        module_name (str): full name of the module. For example, "my.module"
+
+    Returns:
+        type: subclass of `stocktracer.interface.Analysis`
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.interface import Analysis as AnalysisInterface
+
+    module = importlib.import_module(module_name)
+    class_ = getattr(module, "Analysis")
+    assert issubclass(class_, AnalysisInterface)
+    return class_
+
+
+@beartype
+def get_analysis_instance(
+    module_name: str, options: "stocktracer.interface.Options"
+) -> "stocktracer.interface.Analysis":
     """Dynamically import and load the Analysis class from a module.
 
     Args:
@@ -29,14 +56,164 @@ def get_analysis_instance(module_name: str, options: CliOptions) -> AnalysisInte
     Returns:
         AnalysisInterface: analysis instance
     """
-    module = importlib.import_module(module_name)
-    class_ = getattr(module, "Analysis")
-    instance = class_(options)
-    assert isinstance(instance, AnalysisInterface)
-    return instance
+    return get_analysis_class(module_name)(options)
 
 
-ReportFormat = Literal["csv", "md", "json", "txt"]
+ReportFormat = Literal["csv", "md", "json", "txt", "parquet", "feather"]
+
+# Analysis results are computed again once they're a week old
+RESULTS_EXPIRE = 60 * 60 * 24 * 7
+
+
+@beartype
+def _companies(tickers: list[str]) -> dict[str, tuple[str, ...]]:
+    """Get the tickers of the company of each ticker.
+
+    The SEC lists several tickers for some companies, such as GOOG and GOOGL, and
+    the results of any of them include the rows of all of them.
+
+    Args:
+        tickers (list[str]): tickers to look up
+
+    Returns:
+        dict[str, tuple[str, ...]]: sorted tickers of the company of each ticker. A
+            ticker the SEC doesn't list is on its own, and the analysis reports it.
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector.sec import download_manager
+
+    ticker_map = download_manager.ticker_reader.map_of_cik_to_ticker
+    symbols = ticker_map["ticker"].astype(str).str.upper()
+    requested = symbols.isin([ticker.upper() for ticker in tickers])
+    listed = ticker_map["cik_str"].isin(ticker_map["cik_str"][requested])
+    ciks = ticker_map["cik_str"][listed]
+    groups = {cik: tuple(sorted(group)) for cik, group in symbols[listed].groupby(ciks)}
+    companies = {symbol: groups[cik] for symbol, cik in zip(symbols[listed], ciks)}
+    return {
+        ticker: companies.get(ticker.upper(), (ticker.upper(),)) for ticker in tickers
+    }
+
+
+@beartype
+def _result_keys(  # pylint: disable=too-many-arguments
+    tickers: list[str],
+    analysis_plugin: str,
+    final_year: int,
+    final_quarter: int,
+    plugin_version: str,
+) -> dict[str, tuple]:
+    """Get the keys the results of an analysis are cached with.
+
+    Args:
+        tickers (list[str]): tickers to include in the analysis
+        analysis_plugin (str): module to load for analysis
+        final_year (int): last year to consider for report collection
+        final_quarter (int): last quarter to consider for report collection
+        plugin_version (str): version of the plugin, see `versions.plugin_key`
+
+    Returns:
+        dict[str, tuple]: key of the results of each ticker. The tickers of an
+            analysis without `per_ticker` results all share a key for the whole list.
+            Tickers only differing by their case share a key too, and only the first
+            of them is listed.
+    """
+    prefix = ("results", analysis_plugin, plugin_version, final_year, final_quarter)
+    symbols: dict[str, str] = {}
+    for ticker in tickers:
+        symbols.setdefault(ticker.upper(), ticker)
+    if not get_analysis_class(analysis_plugin).per_ticker:
+        key = (*prefix, tuple(sorted(symbols)))
+        return {ticker: key for ticker in symbols.values()}
+    return {ticker: (*prefix, symbol) for symbol, ticker in symbols.items()}
+
+
+def _cached(key: tuple) -> Optional["pandas.DataFrame"]:
+    """Get the cached results of an analysis.
+
+    The results of `per_ticker` analyses are cached for each company. The entry of a
+    ticker only holds the tickers of its company, so the tickers of a company share
+    its results, and the company of a ticker is only looked up when it's analyzed.
+
+    Args:
+        key (tuple): key of the results, see `_result_keys`
+
+    Returns:
+        Optional[pd.DataFrame]: the results, or None if they aren't cached
+    """
+    entry = cache.results.get(key)
+    if isinstance(entry, tuple):
+        entry = cache.results.get((*key[:-1], entry))
+    return entry
+
+
+def _assemble(frames: list["pandas.DataFrame"]) -> "pandas.DataFrame":
+    """Assemble the cached results of an analysis.
+
+    Args:
+        frames (list[pd.DataFrame]): results of each ticker, or of the whole list
+
+    Returns:
+        pd.DataFrame: the results of every ticker
+    """
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd
+
+    if len(frames) == 1:
+        return frames[0]
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    aligned = all(frame.columns.equals(frames[0].columns) for frame in frames)
+    results = pd.concat(frames, sort=not aligned)
+    # Tickers of the same company have the same rows
+    return results[~results.index.duplicated()]
+
+
+def _rows_by_company(
+    results: "pandas.DataFrame", companies: list[tuple[str, ...]]
+) -> dict[tuple[str, ...], "pandas.DataFrame"]:
+    """Split the results of an analysis into the rows of each company analyzed.
+
+    Args:
+        results (pd.DataFrame): results with the tickers in the first level of the
+            index
+        companies (list[tuple[str, ...]]): tickers of each company analyzed
+
+    Returns:
+        dict[tuple[str, ...], pd.DataFrame]: rows of the tickers of each company,
+            empty if it has no results
+    """
+    labels = results.index.get_level_values(0).astype(str).str.upper()
+    return {company: results[labels.isin(company)] for company in companies}
+
+
+def _company_entries(
+    results: "pandas.DataFrame", prefix: tuple, tickers: list[str]
+) -> tuple[dict[tuple, Any], dict[str, "pandas.DataFrame"]]:
+    """Split the results of a `per_ticker` analysis into the cache entries of each company.
+
+    Args:
+        results (pd.DataFrame): results with the tickers in the first level of the
+            index
+        prefix (tuple): key of the results without the ticker, see `_result_keys`
+        tickers (list[str]): tickers analyzed
+
+    Returns:
+        tuple[dict[tuple, Any], dict[str, pd.DataFrame]]: entries of each company and
+            of its tickers, see `_cached`, and the rows of the company of each ticker
+    """
+    companies = _companies(tickers)
+    computed = _rows_by_company(results, list(dict.fromkeys(companies.values())))
+    entries: dict[tuple, Any] = {}
+    for company, rows in computed.items():
+        entries[(*prefix, company)] = rows
+        entries.update({(*prefix, symbol): company for symbol in company})
+    return entries, {ticker: computed[companies[ticker]] for ticker in tickers}
+
+
+def _split(names: Union[Sequence[str], str]) -> list[str]:
+    # Fire hands over comma separated module names as a single string
+    if isinstance(names, str):
+        names = [names]
+    return [name for value in names for name in value.split(",") if name]
 
 
 @beartype
@@ -44,31 +221,56 @@ class Cli:
     """Tools for gathering resources, analyzing data, and publishing the results."""
 
     return_results: bool = True
+    forward: bool = True
 
-    def analyze(  # pylint: disable=too-many-arguments
+    def analyze(  # pylint: disable=too-many-arguments,too-many-locals
         self,
         tickers: Union[Sequence[str], str],
-        analysis_plugin: str = "stocktracer.analysis.annual_reports",
+        analysis_plugin: Union[
+            Sequence[str], str
+        ] = "stocktracer.analysis.annual_reports",
         final_year: int = ReportDate().year,
         final_quarter: int = ReportDate().quarter,
-        report_format: ReportFormat = "txt",
+        report_format: str = "txt",
         report_file: Optional[Path | str] = None,
-    ) -> Optional[pd.DataFrame]:
+        memory_budget: Optional[int | str] = None,
+        report_compression: Optional[str] = None,
+        split_report: bool = False,
+    ) -> Optional["pandas.DataFrame"]:
         """Perform stock analysis.
 
         Args:
             tickers (Union[Sequence[str], str]): tickers to include in the analysis
-            analysis_plugin (str): module to load for analysis
+            analysis_plugin (Union[Sequence[str], str]): module to load for analysis. Several modules run together share a single extraction of the data they need, and their results are reported side by side.
             final_year (int): last year to consider for report collection
             final_quarter (int): last quarter to consider for report collection
-            report_format (ReportFormat): Format of the report. Options include: csv, json, md (markdown)
+            report_format (str): Format of the report, in any case. Options include: csv, json, md (markdown), txt, parquet and feather (Arrow IPC). Parquet and feather reports have a row per ticker and require pyarrow.
             report_file (Optional[Path | str]): Where to store the report. Required if report_format is specified.
+            memory_budget (Optional[int | str]): Memory the collection may use, such as 4GB. Defaults to STOCKTRACER_MEMORY_BUDGET. Requests forwarded to a daemon use the budget of the daemon.
+            report_compression (Optional[str]): Compression of the report file: gzip, bz2, xz or zstd for text reports, snappy, gzip, brotli, zstd or lz4 for parquet and zstd or lz4 for feather.
+            split_report (bool): Write a report per ticker, in parallel, to the report_file directory.
 
         Returns:
             Optional[pd.DataFrame]: results of analysis
         """
+        # pylint: disable=import-outside-toplevel
+        from stocktracer import report
+
+        report_format = report_format.lower()
+        # Fail before analyzing anything if the report can't be written
+        report.check(report_format, report_compression)
         if report_file:
             report_file = Path(report_file)
+        elif (
+            split_report
+            or report_compression
+            or report_format not in report.TEXT_FORMATS
+        ):
+            raise ValueError(
+                "a report_file is required for split, compressed and binary reports"
+            )
+        if memory_budget is not None:
+            memory.configure(memory_budget)
         tickers_set = set()
         if isinstance(tickers, str):
             tickers_set.add(tickers)
@@ -81,15 +283,18 @@ class Cli:
         tickers_list = list(tickers_set)
         tickers_list.sort()
 
-        results, analysis_module = self._get_result(
+        plugins = _split(analysis_plugin)
+        results, under_development = self._analyze(
             tickers=tickers_list,
-            analysis_plugin=analysis_plugin,
+            analysis_plugin=plugins[0] if len(plugins) == 1 else plugins,
             final_year=final_year,
             final_quarter=final_quarter,
         )
 
-        self._generate_report(report_format, report_file, results)
-        if analysis_module.under_development:
+        self._generate_report(
+            report_format, report_file, results, report_compression, split_report
+        )
+        if under_development:
             warnings.warn(
                 "This analysis module is under development and may be incorrect, incomplete, or may change."
             )
@@ -97,61 +302,266 @@ class Cli:
             return results
         return None
 
+    def serve(
+        self,
+        socket_path: Optional[Path | str] = None,
+        memory_budget: Optional[int | str] = None,
+    ):
+        """Run a daemon that answers analysis requests until it's interrupted.
+
+        While the daemon is running, `analyze` forwards its requests to it, so the
+        modules, ticker mappings and worker processes are only loaded once.
+
+        Args:
+            socket_path (Optional[Path | str]): Unix socket to listen on. Defaults to a
+                socket in the cache directory.
+            memory_budget (Optional[int | str]): memory the collection may use, such as
+                4GB. Defaults to `STOCKTRACER_MEMORY_BUDGET`.
+        """
+        if memory_budget is not None:
+            memory.configure(memory_budget)
+        server.serve(
+            server.SOCKET_PATH if socket_path is None else Path(socket_path),
+            {"analyze": self._compute},
+        )
+
+    def prune(self, retention_years: Optional[int] = None):
+        """Drop cached quarters outside the retention window and trim the caches.
+
+        Size limits are configured with `STOCKTRACER_<CACHE>_SIZE_LIMIT`, see
+        `stocktracer.retention`.
+
+        Args:
+            retention_years (Optional[int]): number of years kept before the current
+                quarter. Defaults to `STOCKTRACER_RETENTION_YEARS`.
+        """
+        for name, removed in cache.prune(retention_years).items():
+            print(f"removed {removed} entries from the {name} cache")
+
+    def _analyze(
+        self,
+        tickers: list[str],
+        analysis_plugin: str | list[str],
+        final_year: int,
+        final_quarter: int,
+    ) -> Tuple["pandas.DataFrame", bool]:
+        """Get the results from the daemon, or compute them here when it's not answering.
+
+        Args:
+            tickers (list[str]): tickers to include in the analysis
+            analysis_plugin (str | list[str]): module or modules to load for analysis
+            final_year (int): last year to consider for report collection
+            final_quarter (int): last quarter to consider for report collection
+
+        Returns:
+            Tuple[pd.DataFrame, bool]: results and whether the analysis module is
+                under development
+        """
+        kwargs = {
+            "tickers": tickers,
+            "analysis_plugin": analysis_plugin,
+            "final_year": final_year,
+            "final_quarter": final_quarter,
+        }
+        client = server.Client(
+            timeout=server.REQUEST_TIMEOUT, connect_timeout=server.CONNECT_TIMEOUT
+        )
+        if self.forward and client.available:
+            logger.info(f"forwarding request to the daemon on {client.socket_path}")
+            try:
+                return client.request("analyze", **kwargs)
+            except TimeoutError:
+                logger.warning(
+                    f"the daemon on {client.socket_path} didn't answer in time, "
+                    "running the request here"
+                )
+        return self._compute(**kwargs)
+
+    def _compute(self, **kwargs) -> Tuple["pandas.DataFrame", bool]:
+        if not isinstance(kwargs["analysis_plugin"], str):
+            return self._compute_batch(**kwargs)
+        # Results are cached per version of the plugin, so changing one plugin doesn't
+        # invalidate the results of the others
+        results = self._get_result(
+            plugin_version=versions.plugin_key(kwargs["analysis_plugin"]), **kwargs
+        )
+        analysis_class = get_analysis_class(kwargs["analysis_plugin"])
+        return results, analysis_class.under_development
+
+    def _compute_batch(
+        self,
+        tickers: list[str],
+        analysis_plugin: list[str],
+        final_year: int,
+        final_quarter: int,
+    ) -> Tuple["pandas.DataFrame", bool]:
+        """Run several analysis plugins over a single extraction of their data.
+
+        Args:
+            tickers (list[str]): tickers to include in the analysis
+            analysis_plugin (list[str]): modules to load for analysis
+            final_year (int): last year to consider for report collection
+            final_quarter (int): last quarter to consider for report collection
+
+        Returns:
+            Tuple[pd.DataFrame, bool]: results of every plugin, side by side, and
+                whether any of the plugins is under development
+        """
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
+
+        from stocktracer.collector.batch import shared_extraction
+        from stocktracer.interface import Options as CliOptions
+
+        requests = []
+        for plugin in analysis_plugin:
+            # Only the tickers without cached results are extracted
+            missing = [
+                ticker
+                for ticker, key in _result_keys(
+                    tickers,
+                    plugin,
+                    final_year,
+                    final_quarter,
+                    versions.plugin_key(plugin),
+                ).items()
+                if _cached(key) is None
+            ]
+            if not missing:
+                continue
+            requirements = get_analysis_instance(
+                plugin,
+                CliOptions(
+                    tickers=missing,
+                    final_report=ReportDate(year=final_year, quarter=final_quarter),
+                ),
+            ).requirements()
+            if requirements is not None:
+                requests.append(
+                    (requirements.tickers or missing, requirements.sec_filter)
+                )
+
+        results = {}
+        under_development = False
+        with shared_extraction(requests):
+            for plugin in analysis_plugin:
+                results[plugin], development = self._compute(
+                    tickers=tickers,
+                    analysis_plugin=plugin,
+                    final_year=final_year,
+                    final_quarter=final_quarter,
+                )
+                under_development |= development
+        return pd.concat(results, axis=1), under_development
+
     @classmethod
-    def _generate_report(
+    def _generate_report(  # pylint: disable=too-many-arguments
         cls,
         report_format: ReportFormat,
-        report_file: Path | io.StringIO | None,
-        results: pd.DataFrame,
+        report_file: Path | io.TextIOBase | None,
+        results: "pandas.DataFrame",
+        compression: Optional[str] = None,
+        split: bool = False,
     ):
-        if report_file is None:
-            report_file = io.StringIO()
-        results = results.transpose()
-        match report_format.lower():
-            case "csv":
-                results.to_csv(report_file)
-            case "md":
-                results.to_markdown(report_file)
-            case "json":
-                results.to_json(report_file)
-            case "txt":
-                results.to_string(report_file)
-        if isinstance(report_file, io.StringIO):
-            print(report_file.getvalue())
-
-    @cache.results.memoize(typed=True, expire=60 * 60 * 24 * 7, tag="results")
-    def _get_result(
+        # pylint: disable=import-outside-toplevel
+        from stocktracer import report
+
+        if split:
+            assert isinstance(report_file, Path)
+            report.write_split(results, report_format, report_file, compression)
+        else:
+            report.write(results, report_format, report_file, compression)
+
+    def _get_result(  # pylint: disable=too-many-arguments
         self,
         tickers: list[str],
         analysis_plugin: str,
         final_year: int,
         final_quarter: int,
-    ) -> Tuple[Optional[pd.DataFrame], AnalysisInterface]:
-        """Gets the results.
+        plugin_version: str,
+    ) -> "pandas.DataFrame":
+        """Get the results of an analysis, analyzing the tickers that aren't cached.
+
+        The results of analyses with `per_ticker` results are cached for each company
+        and assembled, so only the companies without cached results are analyzed. The
+        results of other analyses are cached for the whole list of tickers.
+
+        Args:
+            tickers (list[str]): tickers to include in the analysis
+            analysis_plugin (str): module to load for analysis
+            final_year (int): last year to consider for report collection
+            final_quarter (int): last quarter to consider for report collection
+            plugin_version (str): version of the plugin, see `versions.plugin_key`
+
+        Raises:
+            LookupError: no analysis results found, cached or not
+
+        Returns:
+            pd.DataFrame: results of the analysis. The cached results are returned
+                alone when the other tickers have no results.
+        """
+        keys = _result_keys(
+            tickers, analysis_plugin, final_year, final_quarter, plugin_version
+        )
+        cached = {key: _cached(key) for key in keys.values()}
+        missing = [ticker for ticker, key in keys.items() if cached[key] is None]
+        if missing:
+            logger.info(
+                f"analyzing {len(missing)} of {len(keys)} tickers with {analysis_plugin}"
+            )
+            try:
+                results = self._run(missing, analysis_plugin, final_year, final_quarter)
+            except LookupError:
+                if all(rows is None for rows in cached.values()):
+                    raise
+                logger.warning(
+                    f"no results for {missing} with {analysis_plugin}, "
+                    "only returning the cached results"
+                )
+                return _assemble([rows for rows in cached.values() if rows is not None])
+            if get_analysis_class(analysis_plugin).per_ticker:
+                entries, computed = _company_entries(
+                    results, keys[missing[0]][:-1], missing
+                )
+                cached.update({keys[ticker]: computed[ticker] for ticker in missing})
+            else:
+                entries = {keys[missing[0]]: results}
+                cached[keys[missing[0]]] = results
+            with cache.results.transact():
+                for key, entry in entries.items():
+                    cache.results.set(key, entry, expire=RESULTS_EXPIRE, tag="results")
+
+        return _assemble(list(cached.values()))
+
+    @staticmethod
+    def _run(
+        tickers: list[str], analysis_plugin: str, final_year: int, final_quarter: int
+    ) -> "pandas.DataFrame":
+        """Run an analysis without caching its results.
 
         Args:
-            tickers (list[str]): _description_
-            analysis_plugin (str): _description_
-            final_year (int): _description_
-            final_quarter (int): _description_
+            tickers (list[str]): tickers to include in the analysis
+            analysis_plugin (str): module to load for analysis
+            final_year (int): last year to consider for report collection
+            final_quarter (int): last quarter to consider for report collection
 
         Raises:
             LookupError: no analysis results found
 
         Returns:
-            Tuple[Optional[pd.DataFrame], AnalysisInterface]: _description_
+            pd.DataFrame: results of the analysis
         """
-        analysis_module: AnalysisInterface = get_analysis_instance(
+        # pylint: disable=import-outside-toplevel
+        from stocktracer.interface import Options as CliOptions
+
+        analysis_module = get_analysis_instance(
             analysis_plugin,
             CliOptions(
-                tickers=tickers,
+                tickers=list(tickers),
                 final_report=ReportDate(year=final_year, quarter=final_quarter),
             ),
         )
-
-        # Call analysis plugin
-        results = None
         results = analysis_module.analyze()
         if results is None:
             raise LookupError("No analysis results available!")
-        return results, analysis_module
+        return results
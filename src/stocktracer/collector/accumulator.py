@@ -0,0 +1,200 @@
+"""Collect many DataFrames and combine them once.
+
+Appending to a DataFrame with `pd.concat` copies everything accumulated so far, so
+collecting results chunk by chunk gets quadratically slower as the results grow. The
+`Accumulator` keeps the pieces in a list and concatenates them a single time when the
+result is requested. When a memory ceiling is configured, the pieces collected so far
+are spilled to a temporary file on disk whenever the ceiling is exceeded.
+
+The ceiling bounds the memory used while the pieces are collected. Consumers that can
+work on one piece at a time, such as a groupby that is reduced piece by piece, read the
+spilled pieces back one at a time with `Accumulator.parts`, so their peak stays near
+the ceiling. `Accumulator.result` has to hold the whole result: with `pyarrow`, the
+spilled pieces are memory-mapped and copied once into the result, so its peak is the
+size of the result rather than twice that.
+
+The default ceiling can be set in bytes with the `STOCKTRACER_SPILL_MEMORY`
+environment variable.
+"""
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterator
+
+from stocktracer.collector.store import HAS_PYARROW
+
+if HAS_PYARROW:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY: Optional[int] = (
+    int(os.environ["STOCKTRACER_SPILL_MEMORY"])
+    if "STOCKTRACER_SPILL_MEMORY" in os.environ
+    else None
+)
+
+
+@beartype
+class Accumulator:
+    """Accumulates DataFrames with an optional memory ceiling.
+
+    >>> accumulator = Accumulator()
+    >>> accumulator.append(pd.DataFrame({"A": [1, 2]}))
+    >>> accumulator.append(pd.DataFrame({"A": [3]}))
+    >>> len(accumulator)
+    3
+    >>> accumulator.result()["A"].tolist()
+    [1, 2, 3]
+    """
+
+    def __init__(
+        self,
+        max_memory: Optional[int] = DEFAULT_MAX_MEMORY,
+        spill_directory: Optional[Path] = None,
+    ):
+        """Create an empty accumulator.
+
+        Args:
+            max_memory (Optional[int]): number of bytes that may be held in memory before
+                spilling to disk. Defaults to `DEFAULT_MAX_MEMORY`.
+            spill_directory (Optional[Path]): where temporary files are created.
+                Defaults to the system temporary directory.
+        """
+        self.max_memory = max_memory
+        self.spill_directory = spill_directory
+        self._frames: list[pd.DataFrame] = []
+        self._memory = 0
+        self._rows = 0
+        self._spilled: list[Path] = []
+        self._temporary_directory: Optional[tempfile.TemporaryDirectory] = None
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def empty(self) -> bool:
+        """Check if nothing was accumulated.
+
+        Returns:
+            bool: True if no rows were accumulated
+        """
+        return self._rows == 0 and not self._frames
+
+    @property
+    def spilled(self) -> int:
+        """Number of times the accumulated data was spilled to disk.
+
+        Returns:
+            int: spill count
+        """
+        return len(self._spilled)
+
+    def append(self, data: pd.DataFrame):
+        """Add a DataFrame to the accumulated results.
+
+        Args:
+            data (pd.DataFrame): data to add
+        """
+        self._frames.append(data)
+        self._rows += len(data)
+        if self.max_memory is not None:
+            self._memory += int(data.memory_usage(deep=True).sum())
+            if self._memory > self.max_memory:
+                self._spill()
+
+    def _spill(self):
+        if self._temporary_directory is None:
+            # Kept until the accumulator is emptied, see `_cleanup`
+            # pylint: disable-next=consider-using-with
+            self._temporary_directory = tempfile.TemporaryDirectory(
+                prefix="stocktracer-", dir=self.spill_directory
+            )
+        data = self._frames[0] if len(self._frames) == 1 else pd.concat(self._frames)
+        path = Path(self._temporary_directory.name) / f"{len(self._spilled)}"
+        if HAS_PYARROW:
+            # Uncompressed Arrow IPC files can be memory-mapped when they're read back
+            table = pa.Table.from_pandas(data, preserve_index=True)
+            with pa.OSFile(str(path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:  # pragma: no cover
+            data.to_pickle(path)
+        logger.debug(f"spilled {len(data)} records ({self._memory} bytes) to {path}")
+        self._spilled.append(path)
+        self._frames = []
+        self._memory = 0
+
+    @staticmethod
+    def _read_table(path: Path):
+        return pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        if HAS_PYARROW:
+            return self._read_table(path).to_pandas()
+        return pd.read_pickle(path)  # pragma: no cover
+
+    def _cleanup(self):
+        if self._temporary_directory is not None:
+            self._temporary_directory.cleanup()
+            self._temporary_directory = None
+        self._spilled = []
+
+    def parts(self) -> Iterator[pd.DataFrame]:
+        """Hand back the accumulated data a piece at a time, in the order it was added.
+
+        Spilled pieces are only read once they're requested, so a consumer that drops
+        each piece before asking for the next holds about `max_memory` at a time. The
+        accumulator is empty afterwards.
+
+        >>> accumulator = Accumulator(max_memory=0)
+        >>> accumulator.append(pd.DataFrame({"A": [1, 2]}))
+        >>> accumulator.append(pd.DataFrame({"A": [3]}))
+        >>> [part["A"].tolist() for part in accumulator.parts()]
+        [[1, 2], [3]]
+
+        Yields:
+            Iterator[pd.DataFrame]: the accumulated pieces
+        """
+        spilled, frames = self._spilled, self._frames
+        self._frames, self._memory, self._rows = [], 0, 0
+        try:
+            for path in spilled:
+                yield self._read(path)
+            yield from frames
+        finally:
+            self._cleanup()
+
+    def result(self) -> Optional[pd.DataFrame]:
+        """Combine everything accumulated into a single DataFrame.
+
+        Returns:
+            Optional[pd.DataFrame]: the combined data or None if nothing was accumulated
+        """
+        if self._spilled and HAS_PYARROW:
+            # Only the result is materialized, the spilled pieces are mapped from disk
+            if self._frames:
+                self._spill()
+            try:
+                frames = [
+                    pa.concat_tables(
+                        [self._read_table(path) for path in self._spilled]
+                    ).to_pandas()
+                ]
+            except pa.ArrowInvalid as schema_error:
+                # Columns that were inferred differently from one piece to the next
+                logger.debug(f"combining spilled pieces as DataFrames: {schema_error}")
+                frames = [self._read(path) for path in self._spilled]
+        else:
+            frames = [self._read(path) for path in self._spilled] + self._frames
+        self._cleanup()
+        if not frames:
+            return None
+        self._frames = [frames[0] if len(frames) == 1 else pd.concat(frames)]
+        self._memory = 0
+        return self._frames[0]
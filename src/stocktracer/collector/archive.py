@@ -0,0 +1,364 @@
+"""File backed store for the raw quarterly archives downloaded from the SEC.
+
+Each archive is written once to its own file named after the SHA-256 of its contents.
+A small JSON document per archive keeps track of where it came from and when it was
+retrieved. Readers open the file directly and memory-map it, so no process ever has to
+copy the whole archive into memory.
+
+Downloads of the same archive are serialized by `exclusive`, across threads and,
+where `fcntl` is available, across processes.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from zipfile import ZipFile
+
+from beartype import beartype
+from beartype.typing import Iterable, Iterator
+
+from stocktracer import retention
+from stocktracer.collector.dates import ReportDate
+
+try:
+    import fcntl
+
+    HAS_FCNTL = True
+except ImportError:  # pragma: no cover
+    HAS_FCNTL = False
+
+logger = logging.getLogger(__name__)
+
+# Locks of the archives being downloaded by the threads of this process
+_download_locks: dict[Path, threading.Lock] = {}
+_download_locks_guard = threading.Lock()
+
+
+class _MappedFile(mmap.mmap):
+    """Memory mapped file that can be read by `ZipFile`."""
+
+    def seekable(self) -> bool:
+        """Memory maps can always seek.
+
+        Returns:
+            bool: True
+        """
+        return True
+
+
+@beartype
+@dataclass(frozen=True)
+class ArchiveMetadata:
+    """Information kept about a stored archive."""
+
+    url: str
+    sha256: str
+    size: int
+    retrieved: str
+
+    @property
+    def retrieved_date(self) -> datetime:
+        """When the archive was downloaded.
+
+        Returns:
+            datetime: time of the download
+        """
+        return datetime.fromisoformat(self.retrieved)
+
+
+@beartype
+class ArchiveStore:
+    """Content addressed store of downloaded archives.
+
+    The layout of the store looks like the following:
+
+    .. code-block:: text
+
+        archives/
+            meta/2023q1.zip.json
+            objects/3f2a...e1.zip
+            partial/2023q2.zip.part
+
+    Once the archives outgrow `size_limit`, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        expire_after: timedelta,
+        size_limit: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.expire_after = expire_after
+        self.size_limit = size_limit
+
+    @classmethod
+    def name(cls, url: str) -> str:
+        """Get the name of the archive referenced by the url.
+
+        >>> ArchiveStore.name("https://www.sec.gov/files/2023q1.zip")
+        '2023q1.zip'
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            str: name of the archive
+        """
+        return url.rsplit("/", 1)[-1]
+
+    def _metadata_path(self, url: str) -> Path:
+        return self.directory / "meta" / f"{self.name(url)}.json"
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.directory / "objects" / f"{sha256}.zip"
+
+    def metadata(self, url: str) -> Optional[ArchiveMetadata]:
+        """Get the metadata of a stored archive.
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            Optional[ArchiveMetadata]: metadata or None if the archive is not stored
+        """
+        try:
+            with open(self._metadata_path(url), encoding="utf8") as metadata_file:
+                return ArchiveMetadata(**json.load(metadata_file))
+        except FileNotFoundError:
+            return None
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[Path]:
+        """Get the path to a stored archive.
+
+        Args:
+            url (str): location of the archive
+            allow_stale (bool): return the archive even if it expired. Defaults to False.
+
+        Returns:
+            Optional[Path]: path of the archive or None if it is missing or expired
+        """
+        metadata = self.metadata(url)
+        if metadata is None:
+            return None
+        path = self._object_path(metadata.sha256)
+        if not path.exists():
+            return None
+        if not allow_stale and (
+            datetime.now() - metadata.retrieved_date > self.expire_after
+        ):
+            return None
+        retention.touch(path)
+        return path
+
+    def partial_path(self, url: str) -> Path:
+        """Location where an archive is downloaded to before it is committed.
+
+        Keeping partial downloads around lets interrupted downloads resume where they
+        left off.
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            Path: path of the partially downloaded archive
+        """
+        return self.directory / "partial" / f"{self.name(url)}.part"
+
+    def validator_path(self, url: str) -> Path:
+        """Location of the validator of a partial download.
+
+        The validator is the `ETag` or `Last-Modified` header of the response the
+        partial download started with. Resuming the download is only valid if the
+        archive still has the same validator.
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            Path: path of the validator
+        """
+        return self.directory / "partial" / f"{self.name(url)}.validator"
+
+    def lock_path(self, url: str) -> Path:
+        """Location of the lock held while an archive is downloaded, see `exclusive`.
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            Path: path of the lock
+        """
+        return self.directory / "partial" / f"{self.name(url)}.lock"
+
+    def put(self, url: str, content: Iterable[bytes]) -> Path:
+        """Store an archive.
+
+        The contents are streamed to disk, so the archive is never held in memory.
+
+        Args:
+            url (str): location the archive was downloaded from
+            content (Iterable[bytes]): chunks of the archive
+
+        Returns:
+            Path: path of the stored archive
+        """
+        partial = self.partial_path(url)
+        with exclusive(self.lock_path(url)):
+            with open(partial, "wb") as partial_file:
+                for chunk in content:
+                    partial_file.write(chunk)
+            return self.commit(url, partial)
+
+    def commit(self, url: str, partial: Path) -> Path:
+        """Move a completely downloaded archive into the store.
+
+        Args:
+            url (str): location the archive was downloaded from
+            partial (Path): file holding the downloaded archive
+
+        Returns:
+            Path: path of the stored archive
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial, "rb") as partial_file:
+            while chunk := partial_file.read(1024 * 1024):
+                digest.update(chunk)
+                size += len(chunk)
+
+        path = self._object_path(digest.hexdigest())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial, path)
+
+        metadata = ArchiveMetadata(
+            url=url,
+            sha256=digest.hexdigest(),
+            size=size,
+            retrieved=datetime.now().isoformat(),
+        )
+        self._write_metadata(metadata)
+        logger.debug(f"stored {url} as {path}")
+        self.trim(keep=path)
+        return path
+
+    def trim(self, keep: Optional[Path] = None) -> list[Path]:
+        """Evict the least recently used archives until they fit in `size_limit`.
+
+        Args:
+            keep (Optional[Path]): archive that must not be evicted
+
+        Returns:
+            list[Path]: archives evicted
+        """
+        removed = retention.trim(
+            (self.directory / "objects").glob("*.zip"),
+            self.size_limit,
+            keep=() if keep is None else (keep,),
+        )
+        if removed:
+            self._remove_orphaned_metadata()
+        return removed
+
+    def prune(self, oldest: Optional[ReportDate]) -> list[Path]:
+        """Remove the archives of the quarters outside the retention window.
+
+        Args:
+            oldest (Optional[ReportDate]): the oldest quarter kept, see
+                `retention.oldest_retained`
+
+        Returns:
+            list[Path]: archives removed
+        """
+        removed = []
+        for metadata_path in (self.directory / "meta").glob("*.json"):
+            if retention.is_retained(metadata_path.name, oldest):
+                continue
+            with open(metadata_path, encoding="utf8") as metadata_file:
+                metadata = ArchiveMetadata(**json.load(metadata_file))
+            path = self._object_path(metadata.sha256)
+            path.unlink(missing_ok=True)
+            metadata_path.unlink(missing_ok=True)
+            removed.append(path)
+        for pattern in ("*.part", "*.validator"):
+            retention.drop_quarters((self.directory / "partial").glob(pattern), oldest)
+        return removed
+
+    def _remove_orphaned_metadata(self):
+        for metadata_path in (self.directory / "meta").glob("*.json"):
+            with open(metadata_path, encoding="utf8") as metadata_file:
+                metadata = ArchiveMetadata(**json.load(metadata_file))
+            if not self._object_path(metadata.sha256).exists():
+                metadata_path.unlink(missing_ok=True)
+
+    def _write_metadata(self, metadata: ArchiveMetadata):
+        metadata_path = self._metadata_path(metadata.url)
+        metadata_path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=metadata_path.parent, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf8") as metadata_file:
+            json.dump(asdict(metadata), metadata_file)
+        os.replace(temporary, metadata_path)
+
+    def open(self, url: str) -> ZipFile:
+        """Open a stored archive by memory mapping the file.
+
+        Args:
+            url (str): location of the archive
+
+        Raises:
+            LookupError: if the archive is not stored
+
+        Returns:
+            ZipFile: opened archive
+        """
+        path = self.get(url, allow_stale=True)
+        if path is None:
+            raise LookupError(f"missing cache entry for request: {url}")
+        return open_archive(path)
+
+
+@contextmanager
+def exclusive(lock_path: Path) -> Iterator[None]:
+    """Hold a lock across the threads of the process and, with `fcntl`, across processes.
+
+    Args:
+        lock_path (Path): file used as the lock
+
+    Yields:
+        Iterator[None]: while the lock is held
+    """
+    with _download_locks_guard:
+        thread_lock = _download_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock:
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "ab") as lock_file:
+            if HAS_FCNTL:
+                # Released when the file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+@beartype
+def open_archive(path: Path) -> ZipFile:
+    """Open an archive by memory mapping the file.
+
+    The mapping stays valid after the file is closed and is released as soon as the
+    returned archive is closed.
+
+    Args:
+        path (Path): location of the archive
+
+    Returns:
+        ZipFile: opened archive
+    """
+    with open(path, "rb") as archive_file:
+        mapped = _MappedFile(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return ZipFile(mapped)
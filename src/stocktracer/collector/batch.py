@@ -0,0 +1,150 @@
+"""Extractions shared by a batch of requests.
+
+Analysis plugins run one after the other each ask `filter_data` for their own
+tickers and filter, so running several of them over the same tickers used to extract
+the same quarters once per plugin. The requests of a batch are merged into a single
+extraction of everything they need, which `filter_data` slices each request out of.
+"""
+import contextlib
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+from beartype import beartype
+from beartype.typing import Iterable, Iterator
+
+from stocktracer.collector.dates import ReportDate
+from stocktracer.collector.results import Filter, Results
+
+logger = logging.getLogger(__name__)
+
+
+@beartype
+class SharedExtraction:
+    """Records retrieved once for all of the requests they cover."""
+
+    def __init__(self, tickers: Iterable[str], sec_filter: Filter):
+        """Describe the records to retrieve.
+
+        Args:
+            tickers (Iterable[str]): tickers of every request
+            sec_filter (Filter): filter covering the filter of every request
+        """
+        self.tickers = frozenset(ticker.upper() for ticker in tickers)
+        self.sec_filter = sec_filter
+        self._results: Optional[Results] = None
+        self._lock = threading.RLock()
+        self._loader: Optional[int] = None
+
+    def covers(self, tickers: Iterable[str], sec_filter: Filter) -> bool:
+        """Check if a request can be sliced out of these records.
+
+        Args:
+            tickers (Iterable[str]): tickers of the request
+            sec_filter (Filter): filter of the request
+
+        Returns:
+            bool: True if the request is covered
+        """
+        # The request retrieving the records themselves is not answered by them
+        return (
+            self._loader != threading.get_ident()
+            and {ticker.upper() for ticker in tickers} <= self.tickers
+            and self.sec_filter.covers(sec_filter)
+        )
+
+    def get(self, tickers: Iterable[str], sec_filter: Filter) -> Results:
+        """Slice the records of a request, retrieving all of them on first use.
+
+        Args:
+            tickers (Iterable[str]): tickers of the request
+            sec_filter (Filter): filter of the request, which must be covered
+
+        Returns:
+            Results: the records of the request
+        """
+        # pylint: disable=import-outside-toplevel
+        from stocktracer.collector.sec import filter_data
+
+        with self._lock:
+            if self._results is None:
+                self._loader = threading.get_ident()
+                try:
+                    self._results = filter_data(sorted(self.tickers), self.sec_filter)
+                finally:
+                    self._loader = None
+        return self._results.subset(tickers, sec_filter)
+
+
+# Extractions shared by the `shared_extraction` contexts open in the current thread,
+# requests served concurrently by the daemon never see each other's extractions
+_shared_extractions: ContextVar[tuple[SharedExtraction, ...]] = ContextVar(
+    "shared_extractions", default=()
+)
+
+
+@beartype
+def covering(tickers: Iterable[str], sec_filter: Filter) -> Optional[SharedExtraction]:
+    """Find a shared extraction a request can be sliced out of.
+
+    Args:
+        tickers (Iterable[str]): tickers of the request
+        sec_filter (Filter): filter of the request
+
+    Returns:
+        Optional[SharedExtraction]: the first extraction of the open contexts covering
+            the request, or None if none does
+    """
+    tickers = list(tickers)
+    for extraction in _shared_extractions.get():
+        if extraction.covers(tickers, sec_filter):
+            return extraction
+    return None
+
+
+@contextlib.contextmanager
+def shared_extraction(
+    requests: Iterable[tuple[Iterable[str], Filter]]
+) -> Iterator[list[SharedExtraction]]:
+    """Retrieve the records of several requests with a single extraction.
+
+    The requests ending with the same report are merged into one extraction of every
+    ticker, tag, fiscal period and year they need. While the context is open,
+    `filter_data` slices the requests it covers out of it. The records are only
+    retrieved by the first request that needs them, so nothing is extracted when
+    every request is already cached.
+
+    !!! example
+        ``` python
+        with shared_extraction([(["aapl"], eps_filter), (["msft"], f_score_filter)]):
+            eps = filter_data(["aapl"], eps_filter)
+            f_score = filter_data(["msft"], f_score_filter)
+        ```
+
+    Args:
+        requests (Iterable[tuple[Iterable[str], Filter]]): tickers and filter of
+            each request
+
+    Yields:
+        list[SharedExtraction]: an extraction for each report the requests end with
+    """
+    groups: dict[ReportDate, tuple[set[str], list[Filter]]] = {}
+    for tickers, sec_filter in requests:
+        group = groups.setdefault(sec_filter.last_report, (set(), []))
+        group[0].update(ticker.upper() for ticker in tickers)
+        group[1].append(sec_filter)
+    extractions = [
+        SharedExtraction(tickers, Filter.union(filters))
+        for tickers, filters in groups.values()
+    ]
+    for extraction in extractions:
+        logger.info(
+            f"sharing an extraction of {len(extraction.tickers)} tickers: "
+            f"{extraction.sec_filter}"
+        )
+    token = _shared_extractions.set(_shared_extractions.get() + tuple(extractions))
+    try:
+        yield extractions
+    finally:
+        _shared_extractions.reset(token)
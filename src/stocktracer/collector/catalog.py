@@ -0,0 +1,82 @@
+"""Catalog of the extractions cached by `filter_data`.
+
+`filter_data` memoizes whole requests, so a request for fewer tickers, years, fiscal
+periods or tags than one already cached used to be extracted again. The results cache
+keeps a catalog of the requests it holds, and a request covered by one of them is
+sliced out of its results with `Results.subset` instead.
+
+Requests are compared by company rather than by ticker, since the tickers of a company
+share its records.
+"""
+import logging
+from typing import Optional
+
+from stocktracer import cache
+from stocktracer.collector.results import Filter, Results
+
+logger = logging.getLogger(__name__)
+
+# Entry of the results cache listing the key, CIK values and filter of every
+# extraction cached by `filter_data`
+_CATALOG_KEY = ("stocktracer.collector.sec", "catalog")
+
+
+def record(tickers: list[str], sec_filter: Filter, universe: bool):
+    """Record the request of results about to be cached by `filter_data`.
+
+    Entries that were evicted from the cache since are dropped from the catalog.
+
+    Args:
+        tickers (list[str]): ticker symbols of the request
+        sec_filter (Filter): filter of the request
+        universe (bool): extract every company in the ticker map
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector.sec import download_manager, filter_data
+
+    key = filter_data.__cache_key__(tickers, sec_filter, universe)
+    ciks = download_manager.ticker_reader.get_ciks(frozenset(tickers))
+    with cache.results.transact():
+        catalog = [
+            entry
+            for entry in cache.results.get(_CATALOG_KEY, default=[])
+            if entry[0] != key and entry[0] in cache.results
+        ]
+        catalog.append((key, ciks, sec_filter.canonical()))
+        cache.results.set(_CATALOG_KEY, catalog, tag="sec")
+
+
+def superset(tickers: list[str], sec_filter: Filter) -> Optional[Results]:
+    """Find cached results covering a request.
+
+    Args:
+        tickers (list[str]): ticker symbols of the request
+        sec_filter (Filter): filter of the request
+
+    Returns:
+        Optional[Results]: the smallest cached results covering every company, year,
+            fiscal period and tag of the request, or None if none does
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector.sec import download_manager
+
+    # Only read the catalog when there is one, so uncached requests don't count as
+    # cache misses twice
+    if _CATALOG_KEY not in cache.results:
+        return None
+    catalog = cache.results.get(_CATALOG_KEY, default=[])
+    # Tickers of the same company share its records, so requests are compared by CIK
+    ciks = download_manager.ticker_reader.get_ciks(frozenset(tickers))
+    covering = [
+        (key, cached_ciks, cached_filter)
+        for key, cached_ciks, cached_filter in catalog
+        if ciks <= cached_ciks and cached_filter.covers(sec_filter)
+    ]
+    covering.sort(key=lambda entry: (len(entry[1]), entry[2].years))
+    for key, *_ in covering:
+        results = None if cache.hot is None else cache.hot.get(key)
+        if results is None:
+            results = cache.results.get(key)
+        if results is not None:
+            return results
+    return None
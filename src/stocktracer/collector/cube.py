@@ -0,0 +1,277 @@
+"""Persistent cube of the fundamentals of every company in the ticker map.
+
+Screening thousands of tickers one list at a time scans every archive once per list.
+In universe mode, each quarter is extracted a single time for every company in the
+ticker map and the records are stored in a cube indexed by cik, fiscal year, fiscal
+period and tag. Any later query for the same or fewer fiscal periods and tags is then
+answered by slicing the cube, whatever tickers it asks for.
+
+The cube is stored in one file per quarter, sorted by `cik` and `tag` so reading a few
+companies only touches the row groups holding them. Quarters are stored separately for
+every set of fiscal periods and tags they were extracted with.
+
+!!! note
+    The cube is stored as Parquet when `pyarrow` is installed and as pickles otherwise.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from functools import cached_property
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable, Iterator
+
+from stocktracer import retention
+from stocktracer.collector.dates import ReportDate
+from stocktracer.collector.extraction import Extraction
+from stocktracer.collector.store import HAS_PYARROW
+from stocktracer.versions import stage_key
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the stored data changes. Changes to the code that
+# extracts the records are picked up by `stocktracer.versions`.
+CUBE_VERSION = 1
+
+# Number of rows per row group. Smaller groups give finer grained predicate pushdown.
+ROW_GROUP_SIZE = 50000
+
+_INDEX = ["adsh", "tag", "cik"]
+_SUFFIX = ".parquet" if HAS_PYARROW else ".pickle"
+
+
+@beartype
+def covers(
+    extraction: Extraction,
+    focus_periods: Iterable[str],
+    tags: Optional[Iterable[str]],
+) -> bool:
+    """Check if an extraction holds every record of a narrower one.
+
+    >>> extraction = Extraction.create("2023q1", ["FY", "Q1"], None)
+    >>> covers(extraction, {"FY"}, ["Assets"])
+    True
+    >>> covers(extraction, {"FY", "Q2"}, None)
+    False
+
+    Args:
+        extraction (Extraction): records that are available
+        focus_periods (Iterable[str]): fiscal periods requested
+        tags (Optional[Iterable[str]]): tags requested. None requests all tags.
+
+    Returns:
+        bool: True if the requested records can be sliced out of the extraction
+    """
+    if not set(focus_periods) <= set(extraction.focus_periods):
+        return False
+    if extraction.tags is None:
+        return True
+    return tags is not None and set(tags) <= set(extraction.tags)
+
+
+@beartype
+class FundamentalsCube:
+    """Stores the records extracted from each quarter for every company.
+
+    Quarters are stored as `<scope>/<quarter>-<oldest fiscal year>` where the scope
+    identifies the fiscal periods and tags the quarter was extracted with.
+
+    Once the cube outgrows `size_limit`, the least recently used quarters are evicted.
+    """
+
+    def __init__(self, directory: Path, size_limit: Optional[int] = None):
+        self.root = directory
+        self.size_limit = size_limit
+
+    @cached_property
+    def directory(self) -> Path:
+        """Directory of the cube for the current version of the code.
+
+        Returns:
+            Path: the directory
+        """
+        code = stage_key("cube")[:16]
+        return self.root / f"v{CUBE_VERSION}-{code}"
+
+    def _scope(self, extraction: Extraction) -> Path:
+        periods = "-".join(extraction.focus_periods)
+        if extraction.tags is None:
+            return self.directory / f"{periods}-all"
+        digest = hashlib.sha256(json.dumps(extraction.tags).encode()).hexdigest()
+        return self.directory / f"{periods}-{digest[:16]}"
+
+    def _scopes(self) -> Iterator[tuple[Path, Extraction]]:
+        if not self.directory.exists():
+            return
+        for scope in self.directory.iterdir():
+            try:
+                description = json.loads((scope / "scope.json").read_text("utf8"))
+            except (OSError, ValueError):
+                continue
+            yield scope, Extraction.create(
+                "", description["focus_periods"], description["tags"]
+            )
+
+    def find(
+        self,
+        quarter: str,
+        focus_periods: Iterable[str],
+        tags: Optional[Iterable[str]],
+        oldest_fy: int,
+    ) -> Optional[Path]:
+        """Find a stored quarter holding the requested records.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+            focus_periods (Iterable[str]): fiscal periods requested
+            tags (Optional[Iterable[str]]): tags requested. Defaults to all tags.
+            oldest_fy (int): oldest fiscal year requested
+
+        Returns:
+            Optional[Path]: the stored quarter or None if it needs to be extracted
+        """
+        focus_periods = frozenset(focus_periods)
+        tags = None if tags is None else frozenset(tags)
+        for scope, extraction in self._scopes():
+            if not covers(extraction, focus_periods, tags):
+                continue
+            for path in scope.glob(f"{quarter}-*{_SUFFIX}"):
+                if int(path.stem.rsplit("-", 1)[1]) <= oldest_fy:
+                    retention.touch(path)
+                    return path
+        return None
+
+    def write(self, extraction: Extraction, data: pd.DataFrame, oldest_fy: int) -> Path:
+        """Store the records extracted from a quarter for every company.
+
+        Args:
+            extraction (Extraction): the quarter, fiscal periods and tags extracted
+            data (pd.DataFrame): records indexed by adsh, tag and cik
+            oldest_fy (int): oldest fiscal year the records were filtered on
+
+        Returns:
+            Path: the stored quarter
+        """
+        scope = self._scope(extraction)
+        scope.mkdir(parents=True, exist_ok=True)
+        description = scope / "scope.json"
+        if not description.exists():
+            description.write_text(
+                json.dumps(
+                    {"focus_periods": extraction.focus_periods, "tags": extraction.tags}
+                ),
+                "utf8",
+            )
+
+        data = data.reset_index()
+        for column in ("adsh", "tag", "uom", "fp"):
+            data[column] = data[column].astype(str)
+        data = data.sort_values(["cik", "tag"], ignore_index=True)
+
+        # Write to a temporary file first, so concurrent readers never observe a
+        # partially written quarter.
+        destination = scope / f"{extraction.quarter}-{oldest_fy}{_SUFFIX}"
+        handle, temporary = tempfile.mkstemp(dir=scope, suffix=".tmp")
+        os.close(handle)
+        try:
+            if HAS_PYARROW:
+                data.to_parquet(temporary, index=False, row_group_size=ROW_GROUP_SIZE)
+            else:  # pragma: no cover
+                data.to_pickle(temporary)
+            os.replace(temporary, destination)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+        # Quarters filtered on a more recent fiscal year are superseded
+        for path in scope.glob(f"{extraction.quarter}-*{_SUFFIX}"):
+            if path != destination:
+                path.unlink(missing_ok=True)
+        logger.info(f"stored {len(data)} records of {extraction.quarter} in the cube")
+        self.trim(keep=destination)
+        return destination
+
+    def trim(self, keep: Optional[Path] = None) -> list[Path]:
+        """Evict the least recently used quarters until they fit in `size_limit`.
+
+        Quarters stored by other versions of the code are never used, so they're
+        evicted first.
+
+        Args:
+            keep (Optional[Path]): quarter that must not be evicted
+
+        Returns:
+            list[Path]: quarters evicted
+        """
+        return retention.trim(
+            self.root.glob(f"*/*/*{_SUFFIX}"),
+            self.size_limit,
+            keep=() if keep is None else (keep,),
+        )
+
+    def prune(self, oldest: Optional[ReportDate]) -> list[Path]:
+        """Remove the quarters outside the retention window and other versions.
+
+        Args:
+            oldest (Optional[ReportDate]): the oldest quarter kept, see
+                `retention.oldest_retained`
+
+        Returns:
+            list[Path]: files and directories removed
+        """
+        removed = retention.drop_versions(self.root, self.directory)
+        return removed + retention.drop_quarters(
+            self.directory.glob(f"*/*{_SUFFIX}"), oldest
+        )
+
+    @staticmethod
+    def scan(  # pylint: disable=too-many-arguments
+        path: Path,
+        ciks: Iterable[int],
+        focus_periods: Iterable[str],
+        oldest_fy: int,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Slice the records of a stored quarter.
+
+        Args:
+            path (Path): the stored quarter, see `find`
+            ciks (Iterable[int]): companies to keep
+            focus_periods (Iterable[str]): fiscal periods to keep, such as `FY`
+            oldest_fy (int): oldest fiscal year to keep
+            tags (Optional[Iterable[str]]): tags to keep. Defaults to all tags.
+
+        Returns:
+            Optional[pd.DataFrame]: records indexed the same way as
+                `DataSetReader.process_zip` or None if nothing matched
+        """
+        ciks = [int(cik) for cik in ciks]
+        focus_periods = list(focus_periods)
+        tags = None if tags is None else list(tags)
+        if HAS_PYARROW:
+            filters = [
+                ("cik", "in", ciks),
+                ("fp", "in", focus_periods),
+                ("fy", ">=", float(oldest_fy)),
+            ]
+            if tags is not None:
+                filters.append(("tag", "in", tags))
+            data = pd.read_parquet(path, filters=filters)
+        else:  # pragma: no cover
+            data = pd.read_pickle(path)
+            mask = (
+                data["cik"].isin(ciks)
+                & data["fp"].isin(focus_periods)
+                & (data["fy"] >= oldest_fy)
+            )
+            if tags is not None:
+                mask &= data["tag"].isin(tags)
+            data = data[mask]
+        if data.empty:
+            return None
+        return data.set_index(_INDEX)
@@ -0,0 +1,31 @@
+"""Dates identifying the quarterly archives published by the SEC.
+
+This module only depends on the standard library, so the CLI can use it without
+importing the rest of the collector.
+"""
+from dataclasses import dataclass
+from datetime import date
+
+from beartype import beartype
+
+
+@beartype
+@dataclass(frozen=True)
+class ReportDate:
+    """ReportDate is used to select and identify archives created by the SEC."""
+
+    year: int = date.today().year
+    quarter: int = ((date.today().month - 1) // 3) + 1
+
+    def __post_init__(self):
+        if self.year > date.today().year:
+            raise ValueError(
+                "you cannot request reports in the future...that would be illegal :)"
+            )
+        if self.quarter not in range(1, 5):
+            raise ValueError(
+                f"the quarter must be a value between 1 and 4 - given: {self.quarter}"
+            )
+
+    def __str__(self) -> str:
+        return f"{self.year}-q{self.quarter}"
@@ -0,0 +1,155 @@
+"""Cache of the records extracted from each quarter, kept separately for every company.
+
+`filter_data` memoizes whole queries, so adding a ticker to the list or moving
+`last_report` forward by a quarter used to reprocess every quarter. The records extracted
+from each quarter are also cached for every company and set of tags, so
+`DataSetCollector` only processes the quarters and companies that are missing and
+assembles the rest from the cache.
+
+Records are cached together with the oldest fiscal year they were filtered on. They're
+reused by every request for the same or a more recent fiscal year, which keeps them valid
+while the window of a recurring report rolls forward.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable
+from diskcache import Cache
+
+logger = logging.getLogger(__name__)
+
+
+@beartype
+@dataclass(frozen=True)
+class Extraction:
+    """Records of a quarter extracted for the same fiscal periods and tags.
+
+    >>> Extraction.create("2023q1", {"Q1", "FY"}, ["Liabilities", "Assets"])
+    Extraction(quarter='2023q1', focus_periods=('FY', 'Q1'), tags=('Assets', 'Liabilities'))
+    """
+
+    quarter: str
+    focus_periods: tuple[str, ...]
+    tags: Optional[tuple[str, ...]] = None
+
+    @classmethod
+    def create(
+        cls,
+        quarter: str,
+        focus_periods: Iterable[str],
+        tags: Optional[Iterable[str]] = None,
+    ) -> "Extraction":
+        """Describe an extraction independently of the order of its periods and tags.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+            focus_periods (Iterable[str]): fiscal periods extracted, such as `FY`
+            tags (Optional[Iterable[str]]): tags extracted. Defaults to all tags.
+
+        Returns:
+            Extraction: the extraction
+        """
+        return cls(
+            quarter=quarter,
+            focus_periods=tuple(sorted(set(focus_periods))),
+            tags=None if tags is None else tuple(sorted(set(tags))),
+        )
+
+    def key(self, cik: int) -> tuple:
+        """Key of the records of a company in the cache.
+
+        Args:
+            cik (int): the company
+
+        Returns:
+            tuple: cache key
+        """
+        return ("extraction", self.quarter, self.focus_periods, self.tags, int(cik))
+
+    def load(
+        self, store: Cache, ciks: Iterable[int], oldest_fy: int
+    ) -> tuple[list[pd.DataFrame], frozenset[int]]:
+        """Get the cached records of the companies.
+
+        Args:
+            store (Cache): cache holding the records
+            ciks (Iterable[int]): companies to get the records of
+            oldest_fy (int): oldest fiscal year to keep
+
+        Returns:
+            tuple[list[pd.DataFrame], frozenset[int]]: the cached records and the
+                companies that still need to be extracted
+        """
+        found: list[pd.DataFrame] = []
+        missing: set[int] = set()
+        for cik in ciks:
+            entry = store.get(self.key(cik))
+            if entry is None or entry[0] > oldest_fy:
+                missing.add(int(cik))
+                continue
+            data: Optional[pd.DataFrame] = entry[1]
+            if data is not None:
+                data = data[data["fy"] >= oldest_fy]
+                if not data.empty:
+                    found.append(data)
+        logger.debug(
+            f"{self.quarter}: {len(found)} companies cached, {len(missing)} missing"
+        )
+        return found, frozenset(missing)
+
+    def save(
+        self,
+        store: Cache,
+        data: Optional[pd.DataFrame],
+        ciks: Iterable[int],
+        oldest_fy: int,
+    ):
+        """Cache the records extracted for the companies.
+
+        Companies without any records are cached too, so they're not extracted again.
+
+        Args:
+            store (Cache): cache holding the records
+            data (Optional[pd.DataFrame]): records indexed by adsh, tag and cik
+            ciks (Iterable[int]): companies the records were extracted for
+            oldest_fy (int): oldest fiscal year the records were filtered on
+        """
+        companies: dict[int, pd.DataFrame] = {}
+        if data is not None:
+            companies = {
+                int(cik): records
+                for cik, records in data.groupby(level="cik", sort=False)
+            }
+        with store.transact():
+            for cik in ciks:
+                store.set(
+                    self.key(cik),
+                    (oldest_fy, companies.get(int(cik))),
+                    tag="extraction",
+                )
+
+
+@beartype
+def assemble(pieces: list[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Combine cached and newly extracted records of a quarter.
+
+    The records are ordered by submission, the same way a single extraction orders
+    them, so the result doesn't depend on what was cached.
+
+    Args:
+        pieces (list[pd.DataFrame]): records indexed by adsh, tag and cik
+
+    Returns:
+        Optional[pd.DataFrame]: the records of the quarter or None if there are none
+    """
+    if not pieces:
+        return None
+    if len(pieces) == 1:
+        return pieces[0]
+    data = pd.concat(pieces)
+    order = np.argsort(data.index.get_level_values("adsh").to_numpy(), kind="stable")
+    return data.take(order)
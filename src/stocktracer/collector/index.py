@@ -0,0 +1,197 @@
+"""Byte range index over the `num.txt` file of a quarterly archive.
+
+`num.txt` contains millions of rows, but the rows belonging to a single submission
+(`adsh`) are stored next to each other. Recording where each block of rows starts
+and stops lets us read only the blocks for the handful of submissions that match
+our companies, instead of parsing the entire file.
+"""
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@beartype
+@dataclass(frozen=True)
+class NumTextIndex:
+    """Index of the contiguous blocks of rows for each submission in `num.txt`.
+
+    The blocks are kept in a DataFrame that looks like the following:
+
+    .. code-block:: text
+
+        adsh                  cik     start     stop
+        0000320193-23-000006  320193  61        2130
+        0000723125-23-000022  723125  2130      2411
+    """
+
+    header: bytes
+    size: int
+    blocks: pd.DataFrame
+
+    @classmethod
+    def build(cls, num_buffer, sub_buffer=None) -> "NumTextIndex":
+        """Scan `num.txt` once and record the byte range of every block of rows.
+
+        >>> num = b"adsh\\ttag\\n0001\\tA\\n0001\\tB\\n0002\\tA\\n"
+        >>> index = NumTextIndex.build(BytesIO(num))
+        >>> index.blocks[["adsh", "start", "stop"]].values.tolist()
+        [['0001', 9, 23], ['0002', 23, 30]]
+
+        Args:
+            num_buffer: binary contents of `num.txt`
+            sub_buffer: binary contents of `sub.txt` used to map each `adsh` to a cik.
+                Defaults to None.
+
+        Returns:
+            NumTextIndex: the index
+        """
+        header = num_buffer.readline()
+        offset = len(header)
+        adshs: list[bytes] = []
+        starts: list[int] = []
+        current: Optional[bytes] = None
+        for line in num_buffer:
+            adsh = line.split(b"\t", 1)[0].rstrip()
+            if adsh != current:
+                adshs.append(adsh)
+                starts.append(offset)
+                current = adsh
+            offset += len(line)
+
+        starts_array = np.array(starts, dtype=np.int64)
+        blocks = pd.DataFrame(
+            {
+                "adsh": [adsh.decode() for adsh in adshs],
+                "start": starts_array,
+                "stop": np.append(starts_array[1:], offset).astype(np.int64),
+            }
+        )
+        if sub_buffer is not None:
+            mapping = pd.read_csv(
+                sub_buffer,
+                delimiter="\t",
+                usecols=["adsh", "cik"],
+                index_col="adsh",
+                dtype={"cik": np.int64},
+            )
+            blocks = blocks.join(mapping, on="adsh")
+        logger.debug(f"indexed {len(blocks)} blocks in num.txt")
+        return cls(header=header, size=offset, blocks=blocks)
+
+    def _select(self, adshs: Iterable[str]) -> np.ndarray:
+        selected = self.blocks[self.blocks["adsh"].isin(list(adshs))]
+        blocks = selected[["start", "stop"]].to_numpy(dtype=np.int64)
+        return blocks[np.argsort(blocks[:, 0], kind="stable")]
+
+    @staticmethod
+    def _merge(blocks: np.ndarray) -> list[tuple[int, int]]:
+        merged: list[tuple[int, int]] = []
+        for start, stop in blocks:
+            if merged and merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], int(stop))
+            else:
+                merged.append((int(start), int(stop)))
+        return merged
+
+    def ranges(self, adshs: Iterable[str]) -> list[tuple[int, int]]:
+        """Get the sorted byte ranges holding the rows of the submissions.
+
+        Neighbouring ranges are merged so the file is read with as few seeks as
+        possible.
+
+        Args:
+            adshs (Iterable[str]): submissions to look up
+
+        Returns:
+            list[tuple[int, int]]: list of `(start, stop)` byte offsets
+        """
+        return self._merge(self._select(adshs))
+
+    def partition(
+        self, adshs: Iterable[str], parts: int, min_size: int = 0
+    ) -> list[list[tuple[int, int]]]:
+        """Split the byte ranges of the submissions into parts of similar size.
+
+        Ranges are only ever split between blocks, so every part starts at the
+        beginning of a line and the rows of a submission stay together.
+
+        >>> num = b"adsh\\ttag\\n0001\\tA\\n0001\\tB\\n0002\\tA\\n0003\\tA\\n"
+        >>> index = NumTextIndex.build(BytesIO(num))
+        >>> index.partition(["0001", "0002", "0003"], 2)
+        [[(9, 23)], [(23, 37)]]
+
+        Args:
+            adshs (Iterable[str]): submissions to look up
+            parts (int): maximum number of parts
+            min_size (int): smallest number of bytes worth putting in a part of its
+                own. Defaults to 0.
+
+        Returns:
+            list[list[tuple[int, int]]]: sorted byte ranges of each part
+        """
+        blocks = self._select(adshs)
+        if len(blocks) == 0:
+            return []
+        sizes = np.cumsum(blocks[:, 1] - blocks[:, 0])
+        total = int(sizes[-1])
+        if min_size > 0:
+            parts = min(parts, max(1, total // min_size))
+        parts = max(1, min(parts, len(blocks)))
+
+        # Cut after the block that crosses each multiple of the target size
+        targets = total * np.arange(1, parts) / parts
+        cuts = np.unique(np.searchsorted(sizes, targets, side="left") + 1)
+        return [self._merge(part) for part in np.split(blocks, cuts) if len(part) > 0]
+
+    def read(self, num_buffer, ranges: list[tuple[int, int]]) -> BytesIO:
+        """Read the header and the byte ranges of `num.txt`.
+
+        Since the ranges are sorted, the buffer is only ever seeked forward, which
+        is cheap even on a compressed member of a zip file.
+
+        Args:
+            num_buffer: seekable binary contents of `num.txt`
+            ranges (list[tuple[int, int]]): sorted `(start, stop)` byte offsets
+
+        Returns:
+            BytesIO: the header and the selected rows
+        """
+        extracted = BytesIO()
+        extracted.write(self.header)
+        for start, stop in ranges:
+            num_buffer.seek(start)
+            extracted.write(num_buffer.read(stop - start))
+        extracted.seek(0)
+        return extracted
+
+    def extract(
+        self, num_buffer, adshs: Iterable[str], max_fraction: float = 0.5
+    ) -> Optional[BytesIO]:
+        """Read only the rows of `num.txt` belonging to the submissions.
+
+        Args:
+            num_buffer: seekable binary contents of `num.txt`
+            adshs (Iterable[str]): submissions to extract
+            max_fraction (float): if the selected rows make up more than this fraction
+                of the file, reading it sequentially is cheaper. Defaults to 0.5.
+
+        Returns:
+            Optional[BytesIO]: the header and the selected rows, or None when the index
+                would not save any work
+        """
+        ranges = self.ranges(adshs)
+        selected_size = sum(stop - start for start, stop in ranges)
+        if selected_size > max_fraction * self.size:
+            return None
+
+        extracted = self.read(num_buffer, ranges)
+        logger.debug(f"extracted {selected_size} of {self.size} bytes from num.txt")
+        return extracted
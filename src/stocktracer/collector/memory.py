@@ -0,0 +1,231 @@
+"""Memory budget shared by the collector and its worker processes.
+
+Every worker filters its own chunks of `num.txt`, so peak memory grows with the
+number of workers and the size of the chunks. On machines with hard memory limits,
+one worker per CPU with the default chunk size is enough to get the process killed.
+
+Given a budget, the collector starts only as many workers as the budget fits, parses
+smaller chunks when the budget is tight, and holds back new work while the resident
+memory of the process and its workers is close to the budget.
+
+The budget is set with the `STOCKTRACER_MEMORY_BUDGET` environment variable or the
+`--memory_budget` option of the CLI, for example `4GB`. Without either, the budget is
+a share of the memory limit of the cgroup the process runs in, if it has one.
+
+!!! note
+    The memory used by the workers is measured through `/proc`, so throttling only
+    happens on Linux. The number of workers and the chunk size are adjusted everywhere.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+from typing import Optional
+
+from beartype import beartype
+from beartype.typing import Iterable
+
+from stocktracer.retention import parse_size
+
+logger = logging.getLogger(__name__)
+
+# Share of the cgroup memory limit used when no budget is configured
+CGROUP_SHARE = 0.8
+
+# Memory a worker is expected to need before it was ever measured
+WORKER_MEMORY = 512 * 1024 * 1024
+
+# Memory a parsed row of num.txt takes, including the copies made while filtering it
+BYTES_PER_ROW = 512
+
+# Bounds on the number of rows parsed at a time
+MIN_CHUNK_SIZE = 10000
+MAX_CHUNK_SIZE = 200000
+
+# New work is held back once memory use goes past this share of the budget
+HIGH_WATER = 0.9
+
+# How often memory use is measured while work is held back
+POLL_INTERVAL = 0.25
+
+_CGROUP_LIMITS = (
+    Path("/sys/fs/cgroup/memory.max"),
+    Path("/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+)
+
+
+@beartype
+def cgroup_limit() -> Optional[int]:
+    """Get the memory limit of the cgroup this process runs in.
+
+    Returns:
+        Optional[int]: limit in bytes or None if the memory is not limited
+    """
+    for path in _CGROUP_LIMITS:
+        try:
+            value = path.read_text("utf8").strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            limit = int(value)
+            # cgroup v1 reports a huge number when the memory is not limited
+            pages = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+            return limit if limit < pages else None
+        return None
+    return None
+
+
+@beartype
+def resident_memory(pid: int) -> int:
+    """Measure the resident memory of a process.
+
+    Args:
+        pid (int): the process
+
+    Returns:
+        int: resident memory in bytes or 0 if it can't be measured
+    """
+    try:
+        with open(f"/proc/{pid}/statm", encoding="utf8") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+@beartype
+class MemoryBudget:
+    """Limit on the memory used by a process and its workers.
+
+    >>> budget = MemoryBudget(2 * 1024**3, worker_memory=512 * 1024**2)
+    >>> budget.workers(16, parent=0)
+    4
+    >>> budget.chunk_size(4)
+    200000
+    >>> MemoryBudget(None).workers(16)
+    16
+    """
+
+    def __init__(self, limit: Optional[int], worker_memory: int = WORKER_MEMORY):
+        """Create a budget.
+
+        Args:
+            limit (Optional[int]): memory in bytes or None for no limit
+            worker_memory (int): memory a worker is expected to need until the
+                workers are measured
+        """
+        self.limit = limit
+        self.worker_memory = worker_memory
+        self._lock = threading.Lock()
+
+    def workers(self, cpus: int, parent: Optional[int] = None) -> int:
+        """Number of workers that fit in the budget.
+
+        Args:
+            cpus (int): the most workers worth starting
+            parent (Optional[int]): memory used by this process. Defaults to the
+                memory it uses now.
+
+        Returns:
+            int: number of workers, at least 1
+        """
+        if self.limit is None:
+            return cpus
+        parent = resident_memory(os.getpid()) if parent is None else parent
+        fitting = (self.limit - parent) // self.worker_memory
+        return max(1, min(cpus, fitting))
+
+    def chunk_size(self, workers: int) -> int:
+        """Number of rows each worker parses at a time.
+
+        Args:
+            workers (int): number of workers running at the same time
+
+        Returns:
+            int: rows per chunk
+        """
+        if self.limit is None:
+            return MAX_CHUNK_SIZE
+        # A quarter of the share of each worker is left for the chunks in flight
+        rows = self.limit // max(1, workers) // 4 // BYTES_PER_ROW
+        return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, rows))
+
+    def usage(self, pids: Iterable[int]) -> int:
+        """Measure the memory used by this process and its workers.
+
+        The largest worker measured so far becomes the estimate of the memory a
+        worker needs.
+
+        Args:
+            pids (Iterable[int]): process ids of the workers
+
+        Returns:
+            int: resident memory in bytes
+        """
+        workers = [resident_memory(pid) for pid in pids]
+        with self._lock:
+            self.worker_memory = max([self.worker_memory, *workers])
+        return resident_memory(os.getpid()) + sum(workers)
+
+    def throttle(self, pids: Iterable[int], pending: Iterable[Future]) -> int:
+        """Wait for pending work to finish while memory use is close to the budget.
+
+        Nothing is held back when no work is pending, so the collection always makes
+        progress, even with a budget that's too small.
+
+        Args:
+            pids (Iterable[int]): process ids of the workers
+            pending (Iterable[Future]): work that was already submitted
+
+        Returns:
+            int: number of times memory use was measured past the budget
+        """
+        if self.limit is None:
+            return 0
+        pids = list(pids)
+        pending = {future for future in pending if not future.done()}
+        waits = 0
+        while pending and self.usage(pids) > self.limit * HIGH_WATER:
+            if waits == 0:
+                logger.info(
+                    f"memory use is close to the budget of {self.limit} bytes, "
+                    f"waiting for {len(pending)} tasks"
+                )
+            waits += 1
+            _, pending = wait(
+                pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED
+            )
+        return waits
+
+
+@beartype
+def default_limit() -> Optional[int]:
+    """Get the default memory budget.
+
+    Returns:
+        Optional[int]: `STOCKTRACER_MEMORY_BUDGET`, or a share of the cgroup memory
+            limit, or None if the memory is not limited
+    """
+    if value := os.environ.get("STOCKTRACER_MEMORY_BUDGET"):
+        return parse_size(value)
+    limit = cgroup_limit()
+    return None if limit is None else int(limit * CGROUP_SHARE)
+
+
+budget = MemoryBudget(default_limit())
+
+
+@beartype
+def configure(limit: Optional[int | str]):
+    """Set the memory budget of the process.
+
+    The budget must be set before the worker pool is started to limit the number of
+    workers.
+
+    Args:
+        limit (Optional[int | str]): memory in bytes, or a size such as `4GB`. None
+            removes the limit.
+    """
+    budget.limit = parse_size(limit) if isinstance(limit, str) else limit
+    logger.debug(f"memory budget set to {budget.limit}")
@@ -0,0 +1,217 @@
+"""Long lived pool of worker processes shared by every collection.
+
+Starting a process pool is expensive: every worker has to be spawned and has to import
+pandas, numpy and the collector modules before it can do any work. The pool is created
+the first time it's needed and then reused by every call in the process until it exits.
+
+Where the platform supports it, workers are forked from a `forkserver` that already
+imported the collector modules, so new workers start without importing anything.
+
+The number of workers defaults to the number of CPUs that fit in the memory budget, see
+`stocktracer.collector.memory`, and can be set with the `STOCKTRACER_WORKERS`
+environment variable.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from beartype import beartype
+from beartype.typing import Callable, Sequence
+
+from stocktracer.collector import memory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS: Optional[int] = (
+    int(os.environ["STOCKTRACER_WORKERS"])
+    if "STOCKTRACER_WORKERS" in os.environ
+    else None
+)
+
+# Modules imported by the forkserver before any worker is started
+PRELOAD_MODULES = ("stocktracer.collector.sec",)
+
+# Seconds to wait for a worker to start
+START_TIMEOUT = 60
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _register(started) -> None:
+    # Runs once in every worker as it starts
+    started.put(os.getpid())
+
+
+@beartype
+class WorkerPool:  # pylint: disable=too-many-instance-attributes
+    """Process pool that is created on first use and reused afterwards.
+
+    >>> pool = WorkerPool(max_workers=1)
+    >>> pool.submit(abs, -1).result()
+    1
+    >>> pool.shutdown()
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = DEFAULT_WORKERS,
+        preload: Sequence[str] = PRELOAD_MODULES,
+    ):
+        """Create the pool without starting any workers.
+
+        Args:
+            max_workers (Optional[int]): number of worker processes. Defaults to the
+                number of CPUs that fit in the memory budget when the pool starts.
+            preload (Sequence[str]): modules imported by the forkserver
+        """
+        self._max_workers = max_workers
+        self.preload = list(preload)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = 0
+        self._started = None
+        self._pids: set[int] = set()
+        self._broken = False
+        self._starting: list[Future] = []
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    @property
+    def max_workers(self) -> int:
+        """Number of worker processes.
+
+        Returns:
+            int: number of workers the pool runs, or would start with
+        """
+        if self._executor is not None:
+            return self._workers
+        if self._max_workers is not None:
+            return self._max_workers
+        return memory.budget.workers(os.cpu_count() or 1)
+
+    def pids(self) -> list[int]:
+        """Process ids of the running workers.
+
+        Returns:
+            list[int]: process ids, empty when the pool is not started
+        """
+        with self._lock:
+            if self._executor is None:
+                return []
+            self._register(block=False)
+            return list(self._pids)
+
+    def _register(self, block: bool):
+        # Collect the process ids reported by the workers, waiting for all of them
+        # to start when blocking
+        while True:
+            wait = block and len(self._pids) < self._workers
+            try:
+                self._pids.add(self._started.get(block=wait, timeout=START_TIMEOUT))
+            except queue.Empty:
+                return
+
+    def _context(self):
+        if "forkserver" not in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context()  # pragma: no cover
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(self.preload)
+        return context
+
+    def _start(self):
+        max_workers = self.max_workers
+        logger.debug(f"starting a pool of {max_workers} workers")
+        context = self._context()
+        # Workers report their process id as they start
+        self._started = context.Queue()
+        self._pids = set()
+        self._broken = False
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_register,
+            initargs=(self._started,),
+        )
+        self._workers = max_workers
+        self._starting = [self._executor.submit(_ready) for _ in range(max_workers)]
+
+    def _check(self, future: Future):
+        # A worker that died breaks the pool, which is restarted on the next submit
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._broken = True
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """The executor running the workers, created on first use.
+
+        All of the workers are started as soon as the executor is created, so they're
+        ready by the time the first downloads complete.
+
+        Returns:
+            ProcessPoolExecutor: the executor
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            return self._executor
+
+    def _restart(self):
+        logger.warning("worker pool is broken, restarting it")
+        self.shutdown(wait=False)
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Schedule a function to run in one of the workers.
+
+        If a worker died and broke the pool, which shows up as `BrokenProcessPool`
+        when work is submitted or when its result is ready, the pool is restarted.
+
+        Args:
+            function (Callable): picklable function to run
+            *args: arguments passed to the function
+
+        Returns:
+            Future: result of the function
+        """
+        if self._broken:
+            self._restart()
+        try:
+            future = self.executor.submit(function, *args)
+        except BrokenProcessPool:
+            self._restart()
+            future = self.executor.submit(function, *args)
+        future.add_done_callback(self._check)
+        return future
+
+    def warm(self) -> set[int]:
+        """Start all of the workers ahead of time and wait until they're ready.
+
+        Returns:
+            set[int]: process ids of the workers that started
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            starting = self._starting
+        for future in starting:
+            future.result()
+        with self._lock:
+            self._register(block=True)
+            return set(self._pids)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers. The pool starts again the next time it's used.
+
+        Args:
+            wait (bool): wait for the running work to finish. Defaults to True.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
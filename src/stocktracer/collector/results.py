@@ -0,0 +1,647 @@
+"""Filters of the SEC data sets and the results extracted with them."""
+import copy
+import logging
+import os
+from dataclasses import dataclass, field, replace
+from typing import Any, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Callable, Iterable, Mapping, Sequence
+
+from stocktracer.collector.dates import ReportDate
+from stocktracer.metrics import evaluate as evaluate_metrics
+
+logger = logging.getLogger(__name__)
+
+# Values of the results are stored as float32 to halve their size when set to float32
+DEFAULT_VALUE_DTYPE: Literal["float64", "float32"] = os.environ.get(  # type: ignore[assignment]
+    "STOCKTRACER_VALUE_DTYPE", "float64"
+)
+
+
+@beartype
+def slope(data: pd.Series, order: int = 1) -> float:
+    """Calculate the trend of a series.
+
+    >>> import math
+    >>> math.isclose(slope(pd.Series((1,2,3))), 1)
+    True
+
+    >>> math.isclose(slope(pd.Series((3,2,1))), -1)
+    True
+
+    Args:
+        data (pd.Series): _description_
+        order (int): _description_. Defaults to 1.
+
+    Returns:
+        float: slope of the trend line
+    """
+    x_axis = range(len(data.keys()))
+    y_axis = data.values
+
+    try:
+        # An exception can be thrown if there's only one element of it's a nan
+        coeffs = np.polyfit(x_axis, y_axis, order)
+    except np.linalg.LinAlgError:
+        return float(0)
+    except Exception as e:
+        logger.warning(f"slope exception: {e}")
+        return float(0)
+    return coeffs[0]
+
+
+@beartype
+def slopes(data: pd.DataFrame, by: list[str], value: str = "value") -> pd.Series:
+    """Calculate the trend of every group of a table at once.
+
+    Same as applying `slope` to the values of each group, but the least squares fit
+    of every group is computed from grouped sums in a few vectorized passes. Groups
+    with a single value have a slope of 0, and groups with more values of which some
+    are missing have no slope.
+
+    >>> data = pd.DataFrame({"ticker": ["A", "A", "A", "B"], "value": [1, 3, 5, 2]})
+    >>> slopes(data, ["ticker"])
+    ticker
+    A    2.0
+    B    0.0
+    Name: value, dtype: float64
+
+    Args:
+        data (pd.DataFrame): rows to group, in the order the trend is measured in
+        by (list[str]): columns or index levels to group by
+        value (str): column to measure the trend of. Defaults to "value".
+
+    Returns:
+        pd.Series: slope of each group, indexed by the group
+    """
+    grouped = data.groupby(by, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keep = codes >= 0  # rows with missing keys don't belong to any group
+    codes = codes[keep]
+    x_axis = grouped.cumcount().to_numpy(dtype=np.float64)[keep]
+    y_axis = data[value].to_numpy(dtype=np.float64)[keep]
+    missing = np.isnan(y_axis)
+    y_axis = np.where(missing, 0.0, y_axis)
+
+    # The x axis of a group of n values is 0..n-1, so its mean is (n-1)/2, the sum of
+    # its squared deviations is n(n²-1)/12, and the slope only needs the sums of y and
+    # x*y
+    count = np.bincount(codes, minlength=grouped.ngroups).astype(np.float64)
+    sum_y = np.bincount(codes, weights=y_axis, minlength=grouped.ngroups)
+    sum_xy = np.bincount(codes, weights=x_axis * y_axis, minlength=grouped.ngroups)
+    has_missing = np.bincount(codes, weights=missing, minlength=grouped.ngroups) > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (sum_xy - (count - 1) / 2 * sum_y) / (count * (count**2 - 1) / 12)
+    result = np.where(count > 1, np.where(has_missing, np.nan, result), 0.0)
+    return pd.Series(result, index=grouped.size().index, name=value)
+
+
+@beartype
+@dataclass(frozen=True)
+class Filter:
+    """Filter for SEC tools to scrape relevant information when processing records."""
+
+    years: int = field(hash=True)
+    tags: Optional[list[str]] = field(default=None, hash=True)
+    last_report: ReportDate = field(default=ReportDate(), hash=True)
+    only_annual: bool = field(default=True, hash=True)
+
+    @property
+    def focus_period(self) -> frozenset[str]:
+        """Get the focus period for the report.
+
+        Companies file quarterly reports. The annual report replaces the quarterly
+        report depending on when that is reported. Typically Q4 is replaced with FY
+        for the annual reports.
+
+        Returns:
+            frozenset[str]: list of focus periods to use for the filter
+        """
+        if self.only_annual:
+            return frozenset({"FY"})
+        return frozenset({"FY", "Q1", "Q2", "Q3", "Q4"})
+
+    @property
+    def oldest_fy(self) -> int:
+        """Get the oldest fiscal year kept by the filter.
+
+        Returns:
+            int: fiscal year
+        """
+        return self.last_report.year - self.years
+
+    def canonical(self) -> "Filter":
+        """Get the same filter with its tags sorted and without duplicates.
+
+        >>> Filter(years=1, tags=["EPS", "Assets", "EPS"]).canonical().tags
+        ['Assets', 'EPS']
+
+        Returns:
+            Filter: a filter equal to every filter matching the same records
+        """
+        if self.tags is None:
+            return self
+        return replace(self, tags=sorted(set(self.tags)))
+
+    def covers(self, other: "Filter") -> bool:
+        """Check if every record matching another filter also matches this one.
+
+        >>> Filter(years=5, tags=["Assets", "Revenue"]).covers(Filter(years=2, tags=["Assets"]))
+        True
+        >>> Filter(years=5, only_annual=True).covers(Filter(years=5, only_annual=False))
+        False
+
+        Args:
+            other (Filter): the other filter
+
+        Returns:
+            bool: True if the records of `other` can be sliced out of the records of
+                this filter
+        """
+        return (
+            self.last_report == other.last_report
+            and self.years >= other.years
+            and self.focus_period >= other.focus_period
+            and (
+                self.tags is None
+                or (other.tags is not None and set(other.tags) <= set(self.tags))
+            )
+        )
+
+    @classmethod
+    def union(cls, filters: Iterable["Filter"]) -> "Filter":
+        """Create the smallest filter covering several filters.
+
+        >>> union = Filter.union([Filter(years=1, tags=["EPS"]), Filter(years=5, tags=["Assets"])])
+        >>> union.years, union.tags
+        (5, ['Assets', 'EPS'])
+
+        Args:
+            filters (Iterable[Filter]): filters ending with the same report
+
+        Raises:
+            ValueError: if there are no filters or they end with different reports
+
+        Returns:
+            Filter: a filter covering all of them
+        """
+        filters = list(filters)
+        if not filters:
+            raise ValueError("at least one filter is required")
+        last_reports = {sec_filter.last_report for sec_filter in filters}
+        if len(last_reports) > 1:
+            raise ValueError(f"filters end with different reports: {last_reports}")
+        tags: Optional[set[str]] = set()
+        for sec_filter in filters:
+            if sec_filter.tags is None:
+                tags = None
+                break
+            tags.update(sec_filter.tags)  # type: ignore[union-attr]
+        return cls(
+            years=max(sec_filter.years for sec_filter in filters),
+            tags=None if tags is None else sorted(tags),
+            last_report=filters[0].last_report,
+            only_annual=all(sec_filter.only_annual for sec_filter in filters),
+        )
+
+    @property
+    def required_reports(self) -> list[ReportDate]:
+        """Get a list of required reports to download for all the quarters.
+
+        The list generated will include an extra quarter so that you will always be
+        able to do analysis from the current quarter to the previous quarter.
+
+        Also note that it doesn't matter if you specify only_annual=True. Because
+        companies don't have the same fiscal year, we have to check every quarterly
+        report just to see if their annual report is in there.
+
+        Returns:
+            list[ReportDate]: list of report dates to retrieve
+        """
+        dl_list: list[ReportDate] = []
+        next_report = copy.deepcopy(self.last_report)
+        final_report = ReportDate(
+            self.last_report.year - self.years, self.last_report.quarter
+        )
+        while 1:
+            dl_list.append(
+                ReportDate(year=next_report.year, quarter=next_report.quarter)
+            )
+            if next_report == final_report:
+                break
+            if 1 == next_report.quarter:
+                next_report = ReportDate(year=next_report.year - 1, quarter=4)
+            else:
+                next_report = ReportDate(
+                    year=next_report.year, quarter=next_report.quarter - 1
+                )
+        return dl_list
+
+
+@beartype
+def report_code(report_date: ReportDate) -> int:
+    """Number the quarterly reports in the order they're published.
+
+    >>> report_code(ReportDate(2023, 1)) - report_code(ReportDate(2022, 4))
+    1
+
+    Args:
+        report_date (ReportDate): the quarterly report
+
+    Returns:
+        int: code of the report
+    """
+    return report_date.year * 4 + report_date.quarter - 1
+
+
+@beartype
+@dataclass
+class Results:
+    """Filtered data looks like this(in csv format):
+
+    Note that fp has the "Q" removed from the front so it can be stored as a simple number.
+
+    .. code-block:: text
+
+        ticker,tag,fy,fp,ddate,uom,value,period
+        AAPL,EntityCommonStockSharesOutstanding,2022,Q1,2023-01-31,shares,2000.0,2022-12-31
+        AAPL,FakeAttributeTag,2022,Q1,2023-01-31,shares,200.0,2022-12-31
+
+    The data is kept in a compact layout: the repetitive strings are categoricals, the
+    fiscal year is a small integer and the names of the companies are kept once per
+    ticker in `titles` rather than on every row. Values are stored as float32 when
+    `value_dtype` is float32, which defaults to the `STOCKTRACER_VALUE_DTYPE`
+    environment variable.
+    """
+
+    filtered_data: pd.DataFrame
+
+    _cik_list: Optional[set[np.int64]] = None
+
+    titles: Optional[pd.Series] = None
+    """Name of the company of each ticker."""
+
+    reports: Optional[np.ndarray] = None
+    """Quarterly report each record was retrieved from, see `report_code`."""
+
+    value_dtype: Literal["float64", "float32"] = DEFAULT_VALUE_DTYPE
+
+    def __post_init__(self):
+        if not self.filtered_data.empty:
+            self.filtered_data = self._compact(self.filtered_data).set_index(
+                ["ticker", "tag", "fy", "fp"]
+            )
+
+    def _compact(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Convert the filtered data to the compact layout.
+
+        Args:
+            data (pd.DataFrame): filtered data, with or without a title column
+
+        Returns:
+            pd.DataFrame: the compacted data
+        """
+        if "title" in data:
+            if self.titles is None:
+                self.titles = (
+                    data.drop_duplicates("ticker")
+                    .set_index("ticker")["title"]
+                    .astype(str)
+                )
+            data = data.drop(columns="title")
+
+        types: dict[str, Any] = {
+            column: "category"
+            for column in ("ticker", "tag", "uom", "fp")
+            if column in data
+        }
+        if "fy" in data and not data["fy"].isna().any():
+            types["fy"] = np.int16
+        if "value" in data:
+            types["value"] = self.value_dtype
+        data = data.astype(types)
+        for column, kind in types.items():
+            if kind == "category":
+                data[column] = data[column].cat.remove_unused_categories()
+        return data
+
+    def memory_usage(self) -> pd.Series:
+        """Report the memory used by the results.
+
+        Returns:
+            pd.Series: bytes used by the index, each column and the titles
+        """
+        usage = self.filtered_data.memory_usage(deep=True)
+        if self.titles is not None:
+            usage["titles"] = self.titles.memory_usage(deep=True)
+        if self.reports is not None:
+            usage["reports"] = self.reports.nbytes
+        return usage
+
+    def nbytes(self) -> int:
+        """Report the total memory used by the results.
+
+        Returns:
+            int: bytes used by the results
+        """
+        return int(self.memory_usage().sum())
+
+    def subset(self, tickers: Iterable[str], sec_filter: Filter) -> "Results":
+        """Slice the records of fewer companies, tags, fiscal periods or years.
+
+        The records are the same as the ones extracted for the request itself: every
+        ticker of the companies is kept, and only the records of the reports required
+        by the filter.
+
+        Args:
+            tickers (Iterable[str]): tickers of the companies to keep. The case does
+                not matter.
+            sec_filter (Filter): filter covered by the filter these results were
+                retrieved with
+
+        Returns:
+            Results: the records matching the companies and the filter
+        """
+        # pylint: disable=import-outside-toplevel
+        from stocktracer.collector.sec import download_manager
+
+        ticker_map = download_manager.ticker_reader.map_of_cik_to_ticker
+        ciks = download_manager.ticker_reader.get_ciks(frozenset(tickers))
+        tickers = set(ticker_map["ticker"][ticker_map["cik_str"].isin(ciks)])
+        data = self.filtered_data
+        if data.empty:
+            return Results(data, titles=self.titles, value_dtype=self.value_dtype)
+        index = data.index
+        mask = index.get_level_values("ticker").isin(tickers)
+        mask &= index.get_level_values("fp").isin(sec_filter.focus_period)
+        mask &= index.get_level_values("fy") >= sec_filter.oldest_fy
+        if sec_filter.tags is not None:
+            mask &= index.get_level_values("tag").isin(sec_filter.tags)
+        reports = self.reports
+        if reports is not None:
+            # Records of the quarters outside the window of the filter can still
+            # have a recent enough fiscal year
+            mask &= np.isin(
+                reports, [report_code(report) for report in sec_filter.required_reports]
+            )
+            reports = reports[mask]
+        data = data[mask]
+        titles = self.titles
+        if titles is not None:
+            titles = titles[
+                titles.index.isin(data.index.unique(level="ticker").astype(str))
+            ]
+        return Results(
+            data.reset_index(),
+            titles=titles,
+            reports=reports,
+            value_dtype=self.value_dtype,
+        )
+
+    @beartype
+    @dataclass
+    class Table:
+        """This is the results from a `Filter.select()` call.
+
+        The results table looks like the following:
+
+        ```
+        tag            AccountsPayableCurrent  ...  WeightedAverageNumberOfSharesOutstandingBasic
+        ticker fy                              ...
+        AAPL   2021.0            4.852950e+10  ...                                   1.750824e+10
+               2022.0            5.943900e+10  ...                                   1.675645e+10
+        MSFT   2021.0            1.384650e+10  ...                                   7.610000e+09
+               2022.0            1.708150e+10  ...                                   7.551000e+09
+        TMO    2021.0            2.521000e+09  ...                                   3.966667e+08
+               2022.0            3.124000e+09  ...                                   3.940000e+08
+        ```
+
+        From here, you can call functions on this class like `get_value()` or `normalize()`.
+
+        !!! note
+            To get a list of all the tags, run the `annual_reports` analysis module and search through the output for meaningful tags.
+
+        """
+
+        data: pd.DataFrame
+
+        def __str__(self) -> str:
+            return str(self.data)
+
+        @property
+        def tags(self) -> np.ndarray:
+            """List of tags that can be used on this data set.
+
+            Returns:
+                np.ndarray: array with results
+            """
+            return self.data.columns.values
+
+        def get_value(
+            self, ticker: str, tag: str, year: int
+        ) -> int | float | np.number:
+            """Retrieve the exact value of a table cell.
+
+            Args:
+                ticker (str): ticker identifying the equity of interest.
+                tag (str): attribute indicating the type of data to look at.
+                year (int): The year this data applies to.
+
+            Returns:
+                int | float | np.number: value of result
+            """
+            # Lookup convert ticker to cik
+            ticker = ticker.upper()
+            return self.data.loc[ticker].loc[year].loc[tag]
+
+        def normalize(self):
+            """Remove all values that are NaN."""
+            self.data = self.data.dropna(axis=1, how="any")
+
+        def slice(
+            self,
+            ticker: Optional[str | list[str]] = None,
+            year: Optional[int] = None,
+            tags: Optional[list[str]] = None,
+        ) -> pd.DataFrame:
+            """Slice the results by the specified values
+
+            Args:
+                ticker (Optional[str | list[str]]): _description_. Defaults to None.
+                tags (Optional[str]): _description_. Defaults to None.
+                year (Optional[int]): _description_. Defaults to None.
+
+            Returns:
+                pd.DataFrame: _description_
+            """
+            result = self.data
+            if ticker:
+                if isinstance(ticker, str):
+                    ticker = ticker.upper()
+                else:
+                    ticker = [t.upper() for t in ticker]
+                result = result.loc(axis=0)[ticker, :]
+            if year:
+                result = result.loc(axis=0)[:, year, :]
+            if tags:
+                result = pd.DataFrame(result.loc[:, tags], columns=tags)
+            return result
+
+        def evaluate(
+            self, metrics: str | Sequence[str] | Mapping[str, str]
+        ) -> pd.DataFrame:
+            """Evaluate metrics over the table in a single pass.
+
+            Every subexpression shared by the metrics is only computed once, see
+            `stocktracer.metrics`.
+
+            !!! example
+                ``` python
+                table.evaluate({"ROA": "OperatingIncomeLoss / Assets", "ROA>0": "ROA > 0"})
+                ```
+
+            Args:
+                metrics (str | Sequence[str] | Mapping[str, str]): names of registered
+                    metrics, or expressions by the name to give their column
+
+            Returns:
+                pd.DataFrame: a column per requested metric
+            """
+            return evaluate_metrics(self.data, metrics)
+
+        def _assign(self, column_name: str, expression: str):
+            self.data[column_name] = self.evaluate({column_name: expression})[
+                column_name
+            ]
+
+        def calculate_net_income(self, column_name: str):
+            """Calculates the net income stocks as a series.
+
+            !!! example
+                ``` python
+                results.calculate_net_income()
+                ```
+
+            Args:
+                column_name (str): name to assign to the column
+            """
+            self._assign(column_name, "`net-income`")
+
+        def calculate_current_ratio(self, column_name: str):
+            """Calculate the current ratio.
+
+            The current ratio is a liquidity ratio that measures a company’s
+            ability to pay short-term obligations or those due within one year.
+
+            Args:
+                column_name (str): _description_
+            """
+            self._assign(column_name, "`current-ratio`")
+
+        def calculate_debt_to_assets(self, column_name: str):
+            """Calculates the current debt to assets ratio.
+
+            Having more debt than assets is a risk indicator that could indicate
+            a potential for bankruptcy.
+
+            Args:
+                column_name (str): name to assign to the column
+            """
+            self._assign(column_name, "`debt-to-assets`")
+
+        def calculate_return_on_assets(self, column_name: str):
+            """Returns the ROA of stocks as a series.
+
+            !!! example
+                ``` python
+                results.calculate_return_on_assets('ROA')
+                ```
+            Args:
+                column_name (str): name to assign to the column
+            """
+            self._assign(column_name, "`return-on-assets`")
+
+        def calculate_delta(self, column_name: str, delta_of: str):
+            """Calculate the change between the latest row and the one before it within a ticker.
+
+            Args:
+                column_name (str): name to give the calculated column
+                delta_of (str): column name to calculate the delta of, such as ROI
+            """
+            self._assign(column_name, f"delta(`{delta_of}`)")
+
+    def select(
+        self,
+        aggregate_func: Optional[
+            Callable | Literal["mean", "std", "var", "sum", "min", "max", "slope"]
+        ] = "mean",
+        tickers: Optional[Sequence[str]] = None,
+    ) -> Table:
+        """Select only a subset of the data matching the specified criteria.
+
+        Args:
+            aggregate_func (Optional[Callable | Literal['mean', 'std', 'var', 'sum', 'min','max','slope']]): Numpy function to use for aggregating the results. This should be a function like `numpy.average` or `numpy.sum`.
+            tickers (Optional[Sequence[str]]): ticker symbol for the company
+
+        Returns:
+            Results.Table: Object that represents a pivot table with the data requested
+        """
+        assert self.filtered_data is not None
+        if tickers is not None:
+            tickers = [t.upper() for t in tickers]
+            logger.debug(f"ticker filter: {tickers}")
+
+        data = (
+            self.filtered_data
+            if tickers is None
+            else self.filtered_data.query("ticker in @tickers")
+        )
+        logger.debug(f"pre-pivot:\n{data}")
+
+        if aggregate_func == "slope":
+            # Fit every trend at once instead of calling `slope` for each group
+            table = slopes(data, ["ticker", "fy", "tag"]).unstack("tag")
+            # Drop the rows and tags without any trend, the same way pivot_table does
+            table = table.dropna(how="all").dropna(axis=1, how="all")
+            return Results.Table(table)
+
+        # Try and see if the function exists
+        if isinstance(aggregate_func, str):
+            if aggregate_func in globals():
+                aggregate_func = globals()[aggregate_func]
+
+        table: pd.DataFrame = pd.pivot_table(
+            data,
+            values="value",
+            columns="tag",
+            index=["ticker", "fy"],
+            aggfunc=aggregate_func,
+            observed=True,
+        )
+
+        return Results.Table(table)
+
+    @property
+    def ciks(self) -> set[np.int64]:
+        """Retrieves a list of CIK values corresponding to the tickers being looked up.
+
+        The SEC object will call populateCikList to generate this information. This helps
+        with dependency injection by avoiding the Filter having to maintain references to
+        these helper objects for temporary processing. It also lets us stub out the information
+        provided without having to involve heavier utilities or network access.
+
+        Raises:
+            LookupError: _description_
+
+        Returns:
+            set[int]: Set containing all the CIKs that are being filtered out
+        """
+        if self._cik_list is None:
+            raise LookupError(
+                "Filter was not provided a mapping of cik's based on the tickers."
+            )
+        return self._cik_list
@@ -0,0 +1,175 @@
+"""Concurrent downloads of quarterly archives that respect the SEC rate limits.
+
+The SEC asks that automated tools keep their request rate low (currently no more than
+10 requests per second). The scheduler fetches missing archives on a small pool of
+threads while a shared rate limiter spaces out the requests. Interrupted downloads are
+resumed with HTTP range requests, as long as the archive didn't change in between
+(`If-Range`). Only one download of an archive runs at a time.
+
+The defaults can be adjusted with the `STOCKTRACER_DOWNLOAD_WORKERS` and
+`STOCKTRACER_REQUESTS_PER_SECOND` environment variables.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import requests
+from beartype import beartype
+from beartype.typing import Iterable, Iterator
+
+from stocktracer import cache
+from stocktracer.collector.archive import exclusive
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DEFAULT_DOWNLOAD_WORKERS = int(os.environ.get("STOCKTRACER_DOWNLOAD_WORKERS", 4))
+DEFAULT_REQUESTS_PER_SECOND = float(
+    os.environ.get("STOCKTRACER_REQUESTS_PER_SECOND", 5)
+)
+
+
+def _save_validator(response: requests.Response, validator_path: Path):
+    """Keep the validator of a download so that it can be resumed.
+
+    Weak entity tags can't be used with `If-Range`, the modification date is used
+    instead.
+
+    Args:
+        response (requests.Response): response the download starts with
+        validator_path (Path): where the validator is kept
+    """
+    etag = response.headers.get("ETag", "")
+    validator = (
+        etag
+        if etag and not etag.startswith("W/")
+        else response.headers.get("Last-Modified", "")
+    )
+    if validator:
+        validator_path.write_text(validator, "utf8")
+    else:
+        validator_path.unlink(missing_ok=True)
+
+
+@beartype
+class RateLimiter:
+    """Thread safe limiter that spaces out requests evenly."""
+
+    def __init__(self, requests_per_second: int | float):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be greater than 0")
+        self._interval = 1.0 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        """Block until the next request is allowed to start."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+@beartype
+class DownloadScheduler:
+    """Download archives concurrently under a requests per second cap."""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+        requests_per_second: int | float = DEFAULT_REQUESTS_PER_SECOND,
+        timeout: int | float = 60,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._limiter = RateLimiter(requests_per_second)
+
+    def fetch(self, url: str) -> Optional[Path]:
+        """Retrieve an archive from the cache or download it.
+
+        If an earlier download was interrupted, only the missing bytes are requested.
+        When the download fails, an expired copy of the archive is used if one exists.
+
+        Args:
+            url (str): location of the archive
+
+        Returns:
+            Optional[Path]: path of the stored archive or None if it can't be retrieved
+        """
+        path = cache.sec_archives.get(url)
+        if path is not None:
+            logger.info(f"Retrieved {url} from cache")
+            return path
+
+        with exclusive(cache.sec_archives.lock_path(url)):
+            # Another download of the archive may have finished in the meantime
+            path = cache.sec_archives.get(url)
+            if path is not None:
+                logger.info(f"Retrieved {url} from cache")
+                return path
+            return self._download(url)
+
+    def _download(self, url: str) -> Optional[Path]:
+        partial = cache.sec_archives.partial_path(url)
+        validator_path = cache.sec_archives.validator_path(url)
+        offset = partial.stat().st_size if partial.exists() else 0
+        validator = validator_path.read_text("utf8") if validator_path.exists() else ""
+        # Without a validator there is no telling whether the archive changed since
+        # the partial download started, so it is downloaded again
+        headers = (
+            {"Range": f"bytes={offset}-", "If-Range": validator}
+            if offset and validator
+            else {}
+        )
+
+        self._limiter.wait()
+        try:
+            with requests.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            ) as response:
+                # 416 means there is nothing left to download
+                if response.status_code != 416:
+                    response.raise_for_status()
+                    resumed = response.status_code == 206
+                    if resumed:
+                        logger.info(f"Resuming download of {url} at byte {offset}")
+                    else:
+                        _save_validator(response, validator_path)
+                    with open(partial, "ab" if resumed else "wb") as partial_file:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            partial_file.write(chunk)
+        except requests.RequestException as download_error:
+            stale = cache.sec_archives.get(url, allow_stale=True)
+            if stale is None:
+                logger.warning(f"unable to download {url}: {download_error}")
+                return None
+            logger.warning(f"using stale copy of {url}: {download_error}")
+            return stale
+
+        logger.info(f"Downloaded {url}")
+        path = cache.sec_archives.commit(url, partial)
+        validator_path.unlink(missing_ok=True)
+        return path
+
+    def fetch_all(self, urls: Iterable[str]) -> Iterator[tuple[str, Optional[Path]]]:
+        """Retrieve many archives concurrently.
+
+        Archives are yielded as soon as they are available, so processing can start
+        while the remaining archives are still downloading.
+
+        Args:
+            urls (Iterable[str]): locations of the archives
+
+        Yields:
+            Iterator[tuple[str, Optional[Path]]]: url and path of each archive
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, url): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
@@ -0,0 +1,187 @@
+"""Declared schemas for the text files inside the quarterly archives.
+
+By default `pd.read_csv` infers the type of every column chunk by chunk and parses
+dates from strings, which dominates the time spent reading `num.txt`. Declaring the
+schema up front avoids the inference. Repetitive strings such as `tag`, `uom` and `fp`
+are read as categoricals, and the `yyyymmdd` dates are read as integers and converted
+with integer arithmetic.
+
+The parsing mode is selected on `DataSetReader` and defaults to the
+`STOCKTRACER_PARSE_MODE` environment variable:
+
+| Mode      | Description                                                          |
+| --------- | -------------------------------------------------------------------- |
+| `infer`   | let pandas infer the types (default)                                 |
+| `schema`  | declared types using the default C parser                            |
+| `pyarrow` | declared types using the multithreaded pyarrow parser (no chunking)  |
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+ParseMode = Literal["infer", "schema", "pyarrow"]
+
+DEFAULT_PARSE_MODE: ParseMode = os.environ.get(  # type: ignore[assignment]
+    "STOCKTRACER_PARSE_MODE", "infer"
+)
+
+# Columns that are stored as categoricals once the results are combined
+CATEGORICAL_COLUMNS = ("uom", "fp")
+
+
+@beartype
+def parse_yyyymmdd(values: pd.Series) -> pd.Series:
+    """Convert integer dates such as 20230131 to datetimes.
+
+    >>> parse_yyyymmdd(pd.Series([20230131, 20221231])).dt.strftime("%Y-%m-%d").tolist()
+    ['2023-01-31', '2022-12-31']
+
+    Args:
+        values (pd.Series): dates as `yyyymmdd` numbers. Missing values become NaT.
+
+    Returns:
+        pd.Series: the dates
+    """
+    return pd.to_datetime(
+        {"year": values // 10000, "month": values // 100 % 100, "day": values % 100}
+    )
+
+
+@beartype
+def categorize(data: pd.DataFrame) -> pd.DataFrame:
+    """Convert the repetitive string columns of combined results to categoricals.
+
+    Chunks read with different categories are combined as plain objects, so the
+    categories are recreated once all of the chunks are combined.
+
+    Args:
+        data (pd.DataFrame): combined results
+
+    Returns:
+        pd.DataFrame: results with categorical columns
+    """
+    return data.astype(
+        {column: "category" for column in CATEGORICAL_COLUMNS if column in data}
+    )
+
+
+@beartype
+@dataclass(frozen=True)
+class Schema:
+    """Columns read from one of the text files and how they are parsed."""
+
+    dtypes: dict[str, object]
+    index: list[str]
+    dates: list[str] = field(default_factory=list)
+    inferred_dtypes: dict[str, object] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> list[str]:
+        """Columns read from the file.
+
+        Returns:
+            list[str]: column names
+        """
+        return list(self.dtypes)
+
+    def read(
+        self, filepath_or_buffer, mode: ParseMode, chunksize: int
+    ) -> Iterable[pd.DataFrame]:
+        """Read the file in chunks.
+
+        Args:
+            filepath_or_buffer: contents of the file
+            mode (ParseMode): how the columns are parsed
+            chunksize (int): number of rows per chunk. The `pyarrow` parser reads
+                the whole file as a single chunk.
+
+        Returns:
+            Iterable[pd.DataFrame]: chunks indexed by the schema's index
+        """
+        if mode == "infer":
+            return pd.read_csv(
+                filepath_or_buffer,
+                delimiter="\t",
+                usecols=self.columns,
+                index_col=self.index,
+                chunksize=chunksize,
+                parse_dates=self.dates,
+                dtype=self.inferred_dtypes,
+            )
+        chunks: Optional[Iterable[pd.DataFrame]] = None
+        if mode == "pyarrow":
+            chunks = self._read_pyarrow(filepath_or_buffer)
+        if chunks is None:
+            chunks = pd.read_csv(
+                filepath_or_buffer,
+                delimiter="\t",
+                usecols=self.columns,
+                chunksize=chunksize,
+                dtype=self.dtypes,
+            )
+        return self._finish(chunks)
+
+    def _read_pyarrow(self, filepath_or_buffer) -> Optional[list[pd.DataFrame]]:
+        # The pyarrow parser rejects rows with missing trailing fields, which the
+        # default parser accepts. Those files are parsed again with the default parser.
+        try:
+            return [
+                pd.read_csv(
+                    filepath_or_buffer,
+                    delimiter="\t",
+                    usecols=self.columns,
+                    dtype=self.dtypes,
+                    engine="pyarrow",
+                )
+            ]
+        except ValueError as parse_error:
+            if not hasattr(filepath_or_buffer, "seek"):
+                raise
+            logger.warning(f"falling back to the default parser: {parse_error}")
+            filepath_or_buffer.seek(0)
+            return None
+
+    def _finish(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            for column in self.dates:
+                chunk[column] = parse_yyyymmdd(chunk[column])
+            yield chunk.set_index(self.index)
+
+
+SUB_SCHEMA = Schema(
+    dtypes={
+        "adsh": object,
+        "cik": np.int32,
+        "period": np.float64,
+        "fy": np.float64,
+        "fp": "category",
+    },
+    index=["adsh", "cik"],
+    dates=["period"],
+    inferred_dtypes={"cik": np.int32},
+)
+"""Submissions in `sub.txt`.
+
+The `period` is read as a float since it's missing for a few submissions.
+"""
+
+NUM_SCHEMA = Schema(
+    dtypes={
+        "adsh": object,
+        "tag": "category",
+        "ddate": np.int64,
+        "uom": "category",
+        "value": np.float64,
+    },
+    index=["adsh", "tag"],
+    dates=["ddate"],
+)
+"""Numerical data in `num.txt`."""
@@ -1,516 +1,288 @@
 """This data source grabs information from quarterly SEC data archives."""
-import copy
+import hashlib
 import logging
+import os
 import sys
-from concurrent.futures import Future, ProcessPoolExecutor
-from dataclasses import dataclass, field
-from datetime import date
-from io import BytesIO
-from typing import Literal, Optional
+from concurrent.futures import Future, as_completed
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Optional
 from zipfile import ZipFile
 
 import numpy as np
 import pandas as pd
 from alive_progress import alive_bar
 from beartype import beartype
-from beartype.typing import Callable, Sequence
-
-from stocktracer import cache
+from beartype.typing import Callable, Iterable, Iterator, Sequence
+
+from stocktracer import cache, retention
+from stocktracer.collector import batch, catalog
+from stocktracer.collector.accumulator import Accumulator
+from stocktracer.collector.archive import open_archive
+from stocktracer.collector.cube import FundamentalsCube
+from stocktracer.collector.dates import ReportDate
+from stocktracer.collector.extraction import Extraction, assemble
+from stocktracer.collector.index import NumTextIndex
+from stocktracer.collector.memory import MAX_CHUNK_SIZE, MemoryBudget
+from stocktracer.collector.memory import budget as memory_budget
+from stocktracer.collector.pool import WorkerPool
+from stocktracer.collector.results import Filter, Results, report_code
+from stocktracer.collector.scheduler import DownloadScheduler
+from stocktracer.collector.schema import (
+    DEFAULT_PARSE_MODE,
+    NUM_SCHEMA,
+    SUB_SCHEMA,
+    ParseMode,
+    categorize,
+)
+from stocktracer.collector.shared import SharedFrame, combine, discard, share
+from stocktracer.collector.store import HAS_PYARROW, ColumnarStore
+from stocktracer.collector.tickers import TickerReader
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_CHUNK_SIZE = 200000
-pd.set_option("mode.chained_assignment", "raise")
+DEFAULT_CHUNK_SIZE = MAX_CHUNK_SIZE
 
+# Smallest part of num.txt worth filtering in a process of its own
+MIN_PARTITION_SIZE = 16 * 1024 * 1024
 
-@beartype
-@dataclass(frozen=True)
-class ReportDate:
-    """ReportDate is used to select and identify archives created by the SEC."""
+# Decode every quarter into the columnar store the first time it's processed. The
+# store reads the whole of num.txt on a single process, so it only pays off when the
+# same quarters are scanned many times.
+DEFAULT_USE_STORE = (
+    HAS_PYARROW and os.environ.get("STOCKTRACER_COLUMNAR_STORE", "0") == "1"
+)
 
-    year: int = date.today().year
-    quarter: int = ((date.today().month - 1) // 3) + 1
+# Extract every company in the ticker map into the fundamentals cube by default
+DEFAULT_UNIVERSE = os.environ.get("STOCKTRACER_UNIVERSE", "0") == "1"
 
-    def __post_init__(self):
-        if self.year > date.today().year:
-            raise ValueError(
-                "you cannot request reports in the future...that would be illegal :)"
-            )
-        if self.quarter not in range(1, 5):
-            raise ValueError(
-                f"the quarter must be a value between 1 and 4 - given: {self.quarter}"
-            )
+pd.set_option("mode.chained_assignment", "raise")
 
-    def __str__(self) -> str:
-        return f"{self.year}-q{self.quarter}"
 
+columnar_store = ColumnarStore(
+    cache.CACHE_DIR / "store", size_limit=retention.size_limit("store")
+)
+fundamentals_cube = FundamentalsCube(
+    cache.CACHE_DIR / "cube", size_limit=retention.size_limit("cube")
+)
 
-@beartype
-class TickerReader:
-    """This class provides translation services for CIK and Ticker values.
 
-    The SEC has a `json` file that provides mappings from CIK values to Tickers.
-    The data providing this conversion is injected into this class and then
-    this class provides helper methods for performing the conversion on this data set.
+@beartype
+@dataclass(frozen=True)
+class SubmissionCodes:
+    """Submissions selected from `sub.txt` encoded as compact integer codes.
 
-    This class is provided CSV data which is parsed upon initialization. So creating
-    this object is the most expensive part.
+    Each `adsh` is assigned its position in the sorted list of submissions as its code.
+    Rows of `num.txt` are matched against the submissions by looking up their codes,
+    which avoids joining on the long accession number strings.
     """
 
-    def __init__(self, data: str):
-        self._cik_to_ticker_map = pd.read_json(data, orient="index")
-
-    @property
-    def map_of_cik_to_ticker(self) -> pd.DataFrame:
-        """Dataframe containing mapping of cik and ticker information.
-
-        Returns:
-            pd.DataFrame: Dataframe with mapping information
-        """
-        return self._cik_to_ticker_map
-
-    def convert_to_cik(self, ticker: str) -> np.int64:
-        """Get the Cik from the stock ticker.
-
-        Args:
-            ticker (str): stock ticker. The case does not matter.
-
-        Raises:
-            LookupError: If ticker is not found
-
-        Returns:
-            np.int64: cik
-        """
-        result = self.map_of_cik_to_ticker[
-            self.map_of_cik_to_ticker["ticker"] == ticker.upper()
-        ]
-        if result.empty:
-            raise LookupError(f"unable to find ticker: {ticker}")
-        return result.cik_str.iloc[0]
+    adsh: pd.Index
+    columns: pd.DataFrame
 
-    def convert_to_ticker(self, cik: int) -> str:
-        """Get the stock ticker from the Cik number.
+    @classmethod
+    def encode(cls, sub_dataframe: pd.DataFrame) -> "SubmissionCodes":
+        """Encode the submissions once so they can be matched against every chunk.
 
         Args:
-            cik (int): Cik number for the stock
+            sub_dataframe (pd.DataFrame): submissions indexed by adsh and cik
 
         Returns:
-            str: stock ticker
+            SubmissionCodes: the encoded submissions
         """
-        result = self.map_of_cik_to_ticker[self.map_of_cik_to_ticker["cik_str"] == cik]
-        return result.ticker.iloc[0]
+        columns = sub_dataframe.reset_index(level="cik").sort_index(kind="stable")
+        return cls(adsh=columns.index, columns=columns.reset_index(drop=True))
 
-    def contains(self, tickers: frozenset) -> bool:
-        """Check that the tickers provided exist.
+    def lookup(self, adsh: pd.Index) -> np.ndarray:
+        """Get the code of each submission.
 
         Args:
-            tickers (frozenset): tickers to check
+            adsh (pd.Index): accession numbers to look up
 
         Returns:
-            bool: if all the tickers are found
+            np.ndarray: codes of the submissions, or -1 if they're not selected
         """
-        for ticker in tickers:
-            self.convert_to_cik(ticker)
-
-        return True
+        return self.adsh.get_indexer(adsh)
 
-    def get_ciks(self, tickers: frozenset[str]) -> frozenset[int]:
-        """Populates the filter's CIK list to be used for filtering.
-
-        The Filter doesn't need the ticker symbols. If we expand to other data sources,
-        we would have to repeat ticker symbols. For now, the only info we need in the
-        report is the CIK values to find the corresponding stocks.
+    def attach(self, data: pd.DataFrame, codes: np.ndarray) -> pd.DataFrame:
+        """Add the submission columns to the matching rows of `num.txt`.
 
         Args:
-            tickers (frozenset[str]): ticker symbols to search for
+            data (pd.DataFrame): rows of `num.txt` indexed by adsh and tag
+            codes (np.ndarray): code of the submission for every row
 
         Returns:
-            frozenset[int]: CIKs values translated from the tickers specified
+            pd.DataFrame: rows indexed by adsh, tag and cik with the submission columns
         """
-        cik_list: set[int] = set()
-        for ticker in tickers:
-            cik = self.convert_to_cik(ticker)
-            cik_list.add(int(cik))
-        return frozenset(cik_list)
-
-
-@beartype
-def slope(data: pd.Series, order: int = 1) -> float:
-    """Calculate the trend of a series.
-
-    >>> import math
-    >>> math.isclose(slope(pd.Series((1,2,3))), 1)
-    True
-
-    >>> math.isclose(slope(pd.Series((3,2,1))), -1)
-    True
-
-    Args:
-        data (pd.Series): _description_
-        order (int): _description_. Defaults to 1.
-
-    Returns:
-        float: slope of the trend line
-    """
-    x_axis = range(len(data.keys()))
-    y_axis = data.values
-
-    try:
-        # An exception can be thrown if there's only one element of it's a nan
-        coeffs = np.polyfit(x_axis, y_axis, order)
-    except np.linalg.LinAlgError:
-        return float(0)
-    except Exception as e:
-        logger.warning(f"slope exception: {e}")
-        return float(0)
-    return coeffs[0]
-
-
-@beartype
-@dataclass(frozen=True)
-class Filter:
-    """Filter for SEC tools to scrape relevant information when processing records."""
-
-    years: int = field(hash=True)
-    tags: Optional[list[str]] = field(default=None, hash=True)
-    last_report: ReportDate = field(default=ReportDate(), hash=True)
-    only_annual: bool = field(default=True, hash=True)
-
-    @property
-    def focus_period(self) -> frozenset[str]:
-        """Get the focus period for the report.
-
-        Companies file quarterly reports. The annual report replaces the quarterly
-        report depending on when that is reported. Typically Q4 is replaced with FY
-        for the annual reports.
-
-        Returns:
-            frozenset[str]: list of focus periods to use for the filter
-        """
-        if self.only_annual:
-            return frozenset({"FY"})
-        return frozenset({"FY", "Q1", "Q2", "Q3", "Q4"})
-
-    @property
-    def required_reports(self) -> list[ReportDate]:
-        """Get a list of required reports to download for all the quarters.
-
-        The list generated will include an extra quarter so that you will always be
-        able to do analysis from the current quarter to the previous quarter.
-
-        Also note that it doesn't matter if you specify only_annual=True. Because
-        companies don't have the same fiscal year, we have to check every quarterly
-        report just to see if their annual report is in there.
-
-        Returns:
-            list[ReportDate]: list of report dates to retrieve
-        """
-        dl_list: list[ReportDate] = []
-        next_report = copy.deepcopy(self.last_report)
-        final_report = ReportDate(
-            self.last_report.year - self.years, self.last_report.quarter
+        columns = self.columns.take(codes)
+        data = data.assign(
+            **{
+                column: columns[column].to_numpy()
+                for column in columns.columns
+                if column != "cik"
+            }
         )
-        while 1:
-            dl_list.append(
-                ReportDate(year=next_report.year, quarter=next_report.quarter)
-            )
-            if next_report == final_report:
-                break
-            if 1 == next_report.quarter:
-                next_report = ReportDate(year=next_report.year - 1, quarter=4)
-            else:
-                next_report = ReportDate(
-                    year=next_report.year, quarter=next_report.quarter - 1
-                )
-        return dl_list
+        data.index = pd.MultiIndex.from_arrays(
+            [
+                data.index.get_level_values("adsh"),
+                data.index.get_level_values("tag"),
+                columns["cik"].to_numpy(),
+            ],
+            names=["adsh", "tag", "cik"],
+        )
+        return data
 
 
 @beartype
-@dataclass
-class Results:
-    """Filtered data looks like this(in csv format):
-
-    Note that fp has the "Q" removed from the front so it can be stored as a simple number.
-
-    .. code-block:: text
-
-        ticker,tag,fy,fp,ddate,uom,value,period,title
-        AAPL,EntityCommonStockSharesOutstanding,2022,Q1,2023-01-31,shares,2000.0,2022-12-31,Apple Inc.
-        AAPL,FakeAttributeTag,2022,Q1,2023-01-31,shares,200.0,2022-12-31,Apple Inc.
+@dataclass(frozen=True)
+class DataSetReader:
+    """Reads the data from a zip file retrieved from the SEC website.
+
+    The text files are parsed according to `parse_mode`. See `stocktracer.collector.schema`
+    for the available modes. When `workers` is greater than 1, `num.txt` is split into
+    parts that are filtered by that many processes. The text files are parsed
+    `chunk_size` rows at a time. When `use_store` is set, which defaults to the
+    `STOCKTRACER_COLUMNAR_STORE` environment variable, quarters are scanned from the
+    columnar store instead.
     """
 
-    filtered_data: pd.DataFrame
-
-    _cik_list: Optional[set[np.int64]] = None
-
-    def __post_init__(self):
-        if not self.filtered_data.empty:
-            self.filtered_data = self.filtered_data.set_index(
-                ["ticker", "tag", "fy", "fp"]
-            )
-
-    @beartype
-    @dataclass
-    class Table:
-        """This is the results from a `Filter.select()` call.
-
-        The results table looks like the following:
-
-        ```
-        tag            AccountsPayableCurrent  ...  WeightedAverageNumberOfSharesOutstandingBasic
-        ticker fy                              ...
-        AAPL   2021.0            4.852950e+10  ...                                   1.750824e+10
-               2022.0            5.943900e+10  ...                                   1.675645e+10
-        MSFT   2021.0            1.384650e+10  ...                                   7.610000e+09
-               2022.0            1.708150e+10  ...                                   7.551000e+09
-        TMO    2021.0            2.521000e+09  ...                                   3.966667e+08
-               2022.0            3.124000e+09  ...                                   3.940000e+08
-        ```
-
-        From here, you can call functions on this class like `get_value()` or `normalize()`.
-
-        !!! note
-            To get a list of all the tags, run the `annual_reports` analysis module and search through the output for meaningful tags.
-
-        """
-
-        data: pd.DataFrame
-
-        def __str__(self) -> str:
-            return str(self.data)
-
-        @property
-        def tags(self) -> np.ndarray:
-            """List of tags that can be used on this data set.
-
-            Returns:
-                np.ndarray: array with results
-            """
-            return self.data.columns.values
-
-        def get_value(self, ticker: str, tag: str, year: int) -> int | float | np.int64:
-            """Retrieve the exact value of a table cell.
-
-            Args:
-                ticker (str): ticker identifying the equity of interest.
-                tag (str): attribute indicating the type of data to look at.
-                year (int): The year this data applies to.
-
-            Returns:
-                int | float | np.int64: value of result
-            """
-            # Lookup convert ticker to cik
-            ticker = ticker.upper()
-            return self.data.loc[ticker].loc[year].loc[tag]
-
-        def normalize(self):
-            """Remove all values that are NaN."""
-            self.data = self.data.dropna(axis=1, how="any")
-
-        def slice(
-            self,
-            ticker: Optional[str | list[str]] = None,
-            year: Optional[int] = None,
-            tags: Optional[list[str]] = None,
-        ) -> pd.DataFrame:
-            """Slice the results by the specified values
-
-            Args:
-                ticker (Optional[str | list[str]]): _description_. Defaults to None.
-                tags (Optional[str]): _description_. Defaults to None.
-                year (Optional[int]): _description_. Defaults to None.
-
-            Returns:
-                pd.DataFrame: _description_
-            """
-            result = self.data
-            if ticker:
-                if isinstance(ticker, str):
-                    ticker = ticker.upper()
-                else:
-                    ticker = [t.upper() for t in ticker]
-                result = result.loc(axis=0)[ticker, :]
-            if year:
-                result = result.loc(axis=0)[:, year, :]
-            if tags:
-                result = pd.DataFrame(result.loc[:, tags], columns=tags)
-            return result
-
-        def calculate_net_income(self, column_name: str):
-            """Calculates the net income stocks as a series.
-
-            !!! example
-                ``` python
-                results.calculate_net_income()
-                ```
-
-            Args:
-                column_name (str): name to assign to the column
-            """
-            self.data[column_name] = self.data["OperatingIncomeLoss"]
-
-        def calculate_current_ratio(self, column_name: str):
-            """Calculate the current ratio.
-
-            The current ratio is a liquidity ratio that measures a company’s
-            ability to pay short-term obligations or those due within one year.
-
-            Args:
-                column_name (str): _description_
-            """
-            self.data[column_name] = (
-                self.data["AssetsCurrent"] / self.data["LiabilitiesCurrent"]
-            )
-
-        def calculate_debt_to_assets(self, column_name: str):
-            """Calculates the current debt to assets ratio.
-
-            Having more debt than assets is a risk indicator that could indicate
-            a potential for bankruptcy.
-
-            Args:
-                column_name (str): name to assign to the column
-            """
-            self.data[column_name] = (
-                self.data["LiabilitiesCurrent"] / self.data["AssetsCurrent"]
-            )
-
-        def calculate_return_on_assets(self, column_name: str):
-            """Returns the ROA of stocks as a series.
-
-            !!! example
-                ``` python
-                results.calculate_return_on_assets('ROA')
-                ```
-            Args:
-                column_name (str): name to assign to the column
-            """
-            self.data[column_name] = self.data["OperatingIncomeLoss"].div(
-                self.data["Assets"]
-            )
-
-        def calculate_delta(self, column_name: str, delta_of: str):
-            """Calculate the change between the latest row and the one before it within a ticker.
-
-            Args:
-                column_name (str): name to give the calculated column
-                delta_of (str): column name to calculate the delta of, such as ROI
-            """
-            self.data[column_name] = self.data.groupby(by=["ticker"]).diff()[delta_of]
-
-    def select(
-        self,
-        aggregate_func: Optional[
-            Callable | Literal["mean", "std", "var", "sum", "min", "max", "slope"]
-        ] = "mean",
-        tickers: Optional[Sequence[str]] = None,
-    ) -> Table:
-        """Select only a subset of the data matching the specified criteria.
-
-        Args:
-            aggregate_func (Optional[Callable | Literal['mean', 'std', 'var', 'sum', 'min','max','slope']]): Numpy function to use for aggregating the results. This should be a function like `numpy.average` or `numpy.sum`.
-            tickers (Optional[Sequence[str]]): ticker symbol for the company
-
-        Returns:
-            Results.Table: Object that represents a pivot table with the data requested
-        """
-        assert self.filtered_data is not None
-        if tickers is not None:
-            tickers = [t.upper() for t in tickers]
-            logger.debug(f"ticker filter: {tickers}")
-
-        data = (
-            self.filtered_data
-            if tickers is None
-            else self.filtered_data.query("ticker in @tickers")
-        )
-        logger.debug(f"pre-pivot:\n{data}")
-
-        # Try and see if the function exists
-        if isinstance(aggregate_func, str):
-            if aggregate_func in globals():
-                aggregate_func = globals()[aggregate_func]
-
-        table: pd.DataFrame = pd.pivot_table(
-            data,
-            values="value",
-            columns="tag",
-            index=["ticker", "fy"],
-            aggfunc=aggregate_func,
-        )
-
-        return Results.Table(table)
+    request_uri: str
+    use_store: bool = DEFAULT_USE_STORE
+    parse_mode: ParseMode = DEFAULT_PARSE_MODE
+    workers: int = 1
+    chunk_size: int = DEFAULT_CHUNK_SIZE
 
     @property
-    def ciks(self) -> set[np.int64]:
-        """Retrieves a list of CIK values corresponding to the tickers being looked up.
+    def quarter(self) -> str:
+        """Name of the quarter contained in the archive.
 
-        The SEC object will call populateCikList to generate this information. This helps
-        with dependency injection by avoiding the Filter having to maintain references to
-        these helper objects for temporary processing. It also lets us stub out the information
-        provided without having to involve heavier utilities or network access.
-
-        Raises:
-            LookupError: _description_
+        >>> DataSetReader("https://www.sec.gov/files/2023q1.zip").quarter
+        '2023q1'
 
         Returns:
-            set[int]: Set containing all the CIKs that are being filtered out
+            str: quarter name, such as `2023q1`
         """
-        if self._cik_list is None:
-            raise LookupError(
-                "Filter was not provided a mapping of cik's based on the tickers."
-            )
-        return self._cik_list
-
-
-@beartype
-@dataclass(frozen=True)
-class DataSetReader:
-    """Reads the data from a zip file retrieved from the SEC website."""
-
-    request_uri: str
+        return self.request_uri.rsplit("/", 1)[-1].removesuffix(".zip")
 
     def process_zip(
-        self, sec_filter: Filter, ciks: frozenset[int]
-    ) -> Optional[pd.DataFrame]:
+        self, sec_filter: Filter, ciks: frozenset[int], defer: bool = False
+    ) -> Optional[pd.DataFrame] | list["NumTextPartition"]:
         """Process a zip archive with the provided filter.
 
+        When the columnar store is enabled, the archive is decoded into the store the
+        first time it is processed and all later calls only scan the store.
+
         Args:
             sec_filter (Filter): results to filter out of the zip archive
             ciks (frozenset[int]): CIKs to filter data on
+            defer (bool): when `num.txt` is split into parts, return the parts instead
+                of processing them, so the caller can schedule them itself. Defaults
+                to False.
 
         Raises:
             LookupError: if the cache is missing the binary zip file
 
         Returns:
-            Optional[pd.DataFrame]: filtered data
+            Optional[pd.DataFrame] | list[NumTextPartition]: filtered data or the
+                parts that still need to be processed
         """
+        if self.use_store:
+            if not columnar_store.contains(self.quarter):
+                with cache.sec_archives.open(self.request_uri) as myzip:
+                    with myzip.open("sub.txt") as sub_file, myzip.open(
+                        "num.txt"
+                    ) as num_file:
+                        columnar_store.ingest(
+                            self.quarter, sub_file, num_file, self.chunk_size
+                        )
+            return columnar_store.scan(
+                self.quarter,
+                ciks=ciks,
+                focus_periods=sec_filter.focus_period,
+                oldest_fy=sec_filter.oldest_fy,
+                tags=sec_filter.tags,
+            )
 
-        zip_data = cache.sec_data.get(self.request_uri, only_if_cached=True)
-        if zip_data is None:
-            raise LookupError(f"missing cache entry for request: {self.request_uri}")
-
-        with ZipFile(BytesIO(zip_data.content)) as myzip:
+        with cache.sec_archives.open(self.request_uri) as myzip:
             # Process the mapping first
             logger.debug("opening sub.txt")
             with myzip.open("sub.txt") as myfile:
                 # Get reports that are 10-K or 10-Q
                 sub_dataframe = DataSetReader._process_sub_text(
-                    myfile, sec_filter, ciks
+                    myfile, sec_filter, ciks, self.parse_mode, self.chunk_size
                 )
 
                 if sub_dataframe is None or sub_dataframe.empty:
                     logger.debug("nothing found in sub.txt matching the filter")
                     return None
 
+                num_index = self._get_num_index(myzip)
+                adshs = sub_dataframe.index.unique(level="adsh")
+                partitions = num_index.partition(
+                    adshs, self.workers, min_size=MIN_PARTITION_SIZE
+                )
+                if len(partitions) > 1:
+                    archive = cache.sec_archives.get(self.request_uri, allow_stale=True)
+                    assert archive is not None
+                    parts = [
+                        NumTextPartition(
+                            archive=archive,
+                            num_index=num_index,
+                            ranges=ranges,
+                            sec_filter=sec_filter,
+                            sub_dataframe=sub_dataframe,
+                            parse_mode=self.parse_mode,
+                            chunk_size=self.chunk_size,
+                        )
+                        for ranges in partitions
+                    ]
+                    if defer:
+                        return parts
+                    return NumTextPartition.merge(
+                        [
+                            worker_pool.submit(_process_partition_task, part)
+                            for part in parts
+                        ],
+                        self.parse_mode,
+                    )
+
                 with myzip.open("num.txt") as myfile:
+                    # Only read the blocks of rows for the submissions we found
+                    extracted = num_index.extract(myfile, adshs)
                     return DataSetReader._process_num_text(
-                        myfile, sec_filter, sub_dataframe
+                        myfile if extracted is None else extracted,
+                        sec_filter,
+                        sub_dataframe,
+                        self.parse_mode,
+                        self.chunk_size,
                     )
 
+    def _get_num_index(self, myzip: ZipFile) -> NumTextIndex:
+        """Get the byte range index of `num.txt`, building it the first time.
+
+        Args:
+            myzip (ZipFile): opened archive
+
+        Returns:
+            NumTextIndex: index of `num.txt`
+        """
+        key = f"num-index-{self.quarter}"
+        num_index = cache.results.get(key)
+        if num_index is None:
+            logger.info(f"building num.txt index for {self.quarter}")
+            with myzip.open("num.txt") as num_file, myzip.open("sub.txt") as sub_file:
+                num_index = NumTextIndex.build(num_file, sub_file)
+            cache.results.set(key, num_index, tag="index")
+        return num_index
+
     @classmethod
-    def _process_num_text(
-        cls, filepath_or_buffer, sec_filter: Filter, sub_dataframe: pd.DataFrame
+    def _process_num_text(  # pylint: disable=too-many-arguments
+        cls,
+        filepath_or_buffer,
+        sec_filter: Filter,
+        sub_dataframe: pd.DataFrame,
+        parse_mode: ParseMode = "infer",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
     ) -> Optional[pd.DataFrame]:
         """Contains the numerical data.
 
@@ -518,46 +290,48 @@ class DataSetReader:
 
         """
         logger.debug("processing num.txt")
-        reader = pd.read_csv(
-            filepath_or_buffer,
-            delimiter="\t",
-            usecols=["adsh", "tag", "ddate", "uom", "value"],
-            index_col=["adsh", "tag"],
-            chunksize=DEFAULT_CHUNK_SIZE,
-            parse_dates=["ddate"],
-        )
+        reader = NUM_SCHEMA.read(filepath_or_buffer, parse_mode, chunk_size)
 
-        filtered_data = cls._process_num_serial(sec_filter, sub_dataframe, reader)
+        filtered_data = cls._process_num_serial(
+            sec_filter, SubmissionCodes.encode(sub_dataframe), reader
+        )
+        if filtered_data is not None and parse_mode != "infer":
+            filtered_data = categorize(filtered_data)
 
         # if filtered_data is not None:  # pragma: no cover
         #     logger.debug(f"Filtered Records (head+5): {filtered_data.head()}")
         return filtered_data
 
     @classmethod
-    def _process_num_serial(cls, sec_filter, sub_dataframe, reader):
+    def _process_num_serial(cls, sec_filter, submissions, reader):
         """Process num.txt in a single thread (serial fashion)."""
-        filtered_data: Optional[pd.DataFrame] = None
+        filtered_data = Accumulator()
         chunk: pd.DataFrame
 
         for chunk in reader:
-            data = cls._process_num_chunk(sec_filter, sub_dataframe, chunk)
+            data = cls._process_num_chunk(sec_filter, submissions, chunk)
             if data.empty:  # pragma: no cover
                 # logger.debug(f"chunk:\n{chunk}")
-                # logger.debug(f"sub_dataframe:\n{sub_dataframe}")
                 continue
-            filtered_data = cls.append(filtered_data, data)
-        return filtered_data
+            filtered_data.append(data)
+        return filtered_data.result()
 
     @classmethod
-    def _process_num_chunk(cls, sec_filter, sub_dataframe, chunk):
-        # We want only the tables in left if they join on the key, so inner it is
-        data = chunk.join(sub_dataframe, how="inner")
+    def _process_num_chunk(
+        cls, sec_filter: Filter, submissions: "SubmissionCodes", chunk: pd.DataFrame
+    ) -> pd.DataFrame:
+        # Semi-join on the integer codes, only rows that survive get materialized
+        codes = submissions.lookup(chunk.index.get_level_values("adsh"))
+        mask = codes >= 0
 
         # Additional Filtering if needed
         if sec_filter.tags is not None:
-            tag_list = sec_filter.tags  # pylint: disable=unused-variable
-            data = data.query("tag in @tag_list")
-        return data
+            mask &= chunk.index.get_level_values("tag").isin(sec_filter.tags)
+
+        # Keep the same row order an inner join on adsh would produce
+        order = np.flatnonzero(mask)
+        order = order[np.argsort(codes[order], kind="stable")]
+        return submissions.attach(chunk.take(order), codes[order])
 
     @classmethod
     def append(
@@ -565,6 +339,9 @@ class DataSetReader:
     ) -> pd.DataFrame:
         """Append data to the filtered_data and return the updated filtered DataFrame.
 
+        Every call copies all of the existing data. Use `Accumulator` when appending
+        many times.
+
         >>> df1 = pd.DataFrame({"A": ["A0", "A1", "A2", "A3"]},index=[0,1,2,3])
         >>> df2 = pd.DataFrame({"B": ["B0", "B1", "B2", "B3"]},index=[4,5,6,7])
         >>> DataSetReader.append(df1, df2)
@@ -608,11 +385,13 @@ class DataSetReader:
         return filtered_data
 
     @classmethod
-    def _process_sub_text(
+    def _process_sub_text(  # pylint: disable=too-many-arguments
         cls,
         filepath_or_buffer,
         sec_filter: Filter,
         ciks: frozenset[int],  # pylint: disable=unused-argument
+        parse_mode: ParseMode = "infer",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
     ) -> Optional[pd.DataFrame]:
         """Contains the submissions.
 
@@ -623,27 +402,82 @@ class DataSetReader:
         logger.debug("processing sub.txt")
         focus_periods = sec_filter.focus_period
 
-        oldest_fy = sec_filter.last_report.year - sec_filter.years
-        query_str = f"cik in @ciks and fp in @focus_periods and fy >= {oldest_fy}"
-        # logger.debug(f"Query string: {query_str}")
-        reader = pd.read_csv(
-            filepath_or_buffer,
-            delimiter="\t",
-            usecols=["adsh", "cik", "period", "fy", "fp"],
-            index_col=["adsh", "cik"],
-            chunksize=DEFAULT_CHUNK_SIZE,
-            parse_dates=["period"],
-            dtype={"cik": np.int32},
+        query_str = (
+            f"cik in @ciks and fp in @focus_periods and fy >= {sec_filter.oldest_fy}"
         )
+        # logger.debug(f"Query string: {query_str}")
+        reader = SUB_SCHEMA.read(filepath_or_buffer, parse_mode, chunk_size)
         logger.info(f"keeping only these focus periods: {focus_periods}")
-        filtered_data: Optional[pd.DataFrame] = None
+        filtered_data = Accumulator()
         chunk: pd.DataFrame
         for chunk in reader:
             data = chunk.query(query_str)
             if data.empty:
                 continue
-            filtered_data = cls.append(filtered_data, data)
-        return filtered_data
+            filtered_data.append(data)
+        return filtered_data.result()
+
+
+@beartype
+@dataclass(frozen=True)
+class NumTextPartition:
+    """Part of `num.txt` that is filtered by a worker process.
+
+    The worker opens the archive itself and only reads its own byte ranges, so the
+    contents of `num.txt` are never sent between processes.
+    """
+
+    archive: Path
+    num_index: NumTextIndex
+    ranges: list[tuple[int, int]]
+    sec_filter: Filter
+    sub_dataframe: pd.DataFrame
+    parse_mode: ParseMode
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def process(self) -> Optional[pd.DataFrame]:
+        """Filter the rows in this part of `num.txt`.
+
+        Returns:
+            Optional[pd.DataFrame]: filtered data
+        """
+        with open_archive(self.archive) as myzip:
+            with myzip.open("num.txt") as myfile:
+                part = self.num_index.read(myfile, self.ranges)
+        return DataSetReader._process_num_text(  # pylint: disable=protected-access
+            part, self.sec_filter, self.sub_dataframe, self.parse_mode, self.chunk_size
+        )
+
+    @staticmethod
+    def merge(
+        futures: list[Future],
+        parse_mode: ParseMode,
+        timeout: Optional[int] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Combine the results of the parts in the order they appear in the file.
+
+        Args:
+            futures (list[Future]): results of `NumTextPartition.process`, which
+                may be shared by the worker
+            parse_mode (ParseMode): how the parts were parsed
+            timeout (Optional[int]): seconds to wait for each part. Defaults to None.
+
+        Returns:
+            Optional[pd.DataFrame]: filtered data
+        """
+        pieces: list[pd.DataFrame | SharedFrame] = []
+        try:
+            for future in futures:
+                piece = future.result(timeout=timeout)
+                if piece is not None:
+                    pieces.append(piece)
+        except BaseException:
+            discard(futures)
+            raise
+        result = combine(pieces)
+        if result is not None and parse_mode != "infer":
+            result = categorize(result)
+        return result
 
 
 @beartype
@@ -655,6 +489,11 @@ class DownloadManager:
 
     _company_tickers_url = "https://www.sec.gov/files/company_tickers.json"
 
+    def __init__(self, scheduler: Optional[DownloadScheduler] = None):
+        self.scheduler = DownloadScheduler() if scheduler is None else scheduler
+        self._ticker_reader: Optional[TickerReader] = None
+        self._ticker_digest: Optional[str] = None
+
     @property
     def ticker_reader(self) -> TickerReader:
         """Get the CIK ticker mappings. This must be done before processing reports.
@@ -671,6 +510,9 @@ class DownloadManager:
         {"0":{"cik_str":320193,"ticker":"AAPL","title":"Apple Inc."},
          "1":{"cik_str":789019,"ticker":"MSFT","title":"MICROSOFT CORP"},
 
+        The parsed mappings are kept in memory and only parsed again when the JSON
+        file changes.
+
         Returns:
             TickerReader: maps cik to stock ticker
 
@@ -679,7 +521,12 @@ class DownloadManager:
         if response.from_cache:  # pragma: no cover
             logger.info("Retrieved tickers->cik mapping from cache")
         if response.status_code == 200:  # pragma: no cover
-            return TickerReader(response.content.decode())
+            digest = hashlib.sha256(response.content).hexdigest()
+            if self._ticker_reader is None or digest != self._ticker_digest:
+                logger.info("Parsing tickers->cik mapping")
+                self._ticker_reader = TickerReader(response.content.decode())
+                self._ticker_digest = digest
+            return self._ticker_reader
         raise LookupError("unable to retrieve tickers")  # pragma: no cover
 
     def _create_download_uri(self, report_date: ReportDate) -> str:
@@ -699,21 +546,247 @@ class DownloadManager:
             Optional[DataSetReader]: this object helps process the data received more granularly
         """
         request = self._create_download_uri(report_date)
-        response = cache.sec_data.get(request)
-        if response.from_cache:
-            logger.info(f"Retrieved {request} from cache")
+        if self.scheduler.fetch(request) is None:
+            return None  # pragma: no cover
+        return DataSetReader(request)
+
+    def get_quarterly_reports(
+        self, report_dates: Sequence[ReportDate]
+    ) -> Iterator[tuple[ReportDate, Optional[DataSetReader]]]:
+        """Retrieve many quarterly reports concurrently.
+
+        Reports are yielded as soon as they're available, which is not necessarily
+        the order they were requested in.
 
-        if response.status_code == 200:
-            return DataSetReader(request)
-        return None  # pragma: no cover
+        Args:
+            report_dates (Sequence[ReportDate]): quarterly dumps to retrieve
+
+        Yields:
+            Iterator[tuple[ReportDate, Optional[DataSetReader]]]: the report date and
+                the object to process it with or None if it couldn't be retrieved
+        """
+        requested = {
+            self._create_download_uri(report_date): report_date
+            for report_date in report_dates
+        }
+        for request, path in self.scheduler.fetch_all(requested):
+            yield requested[request], None if path is None else DataSetReader(request)
 
 
 download_manager = DownloadManager()
+worker_pool = WorkerPool()
 
 
 @beartype
 class DataSetCollector:
-    """Take care of downloading all the data sets and aggregate them into a single structure."""
+    """Take care of downloading all the data sets and aggregate them into a single structure.
+
+    In universe mode, the reports are processed for every company in the ticker map
+    and stored in the fundamentals cube, see `stocktracer.collector.cube`. Requests
+    for any companies are then served by slicing the cube.
+
+    The reports are parsed in chunks sized to fit the memory budget, and no more work
+    is handed to the workers while their memory use is close to it, see
+    `stocktracer.collector.memory`.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[WorkerPool] = None,
+        universe: bool = DEFAULT_UNIVERSE,
+        budget: Optional[MemoryBudget] = None,
+    ):
+        """Create the collector.
+
+        Args:
+            pool (Optional[WorkerPool]): workers processing the reports. Defaults to
+                the pool shared by every collector in the process.
+            universe (bool): process the reports for every company in the ticker
+                map. Defaults to the `STOCKTRACER_UNIVERSE` environment variable.
+            budget (Optional[MemoryBudget]): memory the collection may use. Defaults
+                to the budget of the process.
+        """
+        self.pool = worker_pool if pool is None else pool
+        self.universe = universe
+        self.budget = memory_budget if budget is None else budget
+
+    @staticmethod
+    def _extraction(sec_filter: Filter, report_date: ReportDate) -> Extraction:
+        return Extraction.create(
+            f"{report_date.year}q{report_date.quarter}",
+            sec_filter.focus_period,
+            sec_filter.tags,
+        )
+
+    def _lookup(
+        self, sec_filter: Filter, ciks: frozenset[int]
+    ) -> tuple[dict[ReportDate, list[pd.DataFrame]], dict[ReportDate, frozenset[int]]]:
+        """Find the records that were already extracted from each report.
+
+        Args:
+            sec_filter (Filter): SEC specific filter of how to filter the results
+            ciks (frozenset[int]): CIK values to filter the datasets on
+
+        Returns:
+            tuple[dict[ReportDate, list[pd.DataFrame]], dict[ReportDate, frozenset[int]]]:
+                the cached records of each report, and the reports that still need to
+                be processed with the CIK values that are missing from them
+        """
+        if self.universe:
+            return self._lookup_cube(sec_filter, ciks)
+
+        cached: dict[ReportDate, list[pd.DataFrame]] = {}
+        missing: dict[ReportDate, frozenset[int]] = {}
+        oldest_fy = sec_filter.oldest_fy
+        for report_date in sec_filter.required_reports:
+            cached[report_date], missing_ciks = self._extraction(
+                sec_filter, report_date
+            ).load(cache.results, ciks, oldest_fy)
+            if missing_ciks:
+                missing[report_date] = missing_ciks
+        return cached, missing
+
+    @staticmethod
+    def _lookup_cube(
+        sec_filter: Filter, ciks: frozenset[int]
+    ) -> tuple[dict[ReportDate, list[pd.DataFrame]], dict[ReportDate, frozenset[int]]]:
+        """Slice the records out of the fundamentals cube.
+
+        Args:
+            sec_filter (Filter): SEC specific filter of how to filter the results
+            ciks (frozenset[int]): CIK values to filter the datasets on
+
+        Returns:
+            tuple[dict[ReportDate, list[pd.DataFrame]], dict[ReportDate, frozenset[int]]]:
+                the records of each report in the cube, and the reports missing from
+                the cube with every CIK value in the ticker map
+        """
+        cached: dict[ReportDate, list[pd.DataFrame]] = {}
+        missing: dict[ReportDate, frozenset[int]] = {}
+        oldest_fy = sec_filter.oldest_fy
+        for report_date in sec_filter.required_reports:
+            path = fundamentals_cube.find(
+                f"{report_date.year}q{report_date.quarter}",
+                sec_filter.focus_period,
+                sec_filter.tags,
+                oldest_fy,
+            )
+            cached[report_date] = []
+            if path is None:
+                missing[report_date] = frozenset()
+                continue
+            data = FundamentalsCube.scan(
+                path, ciks, sec_filter.focus_period, oldest_fy, sec_filter.tags
+            )
+            if data is not None:
+                cached[report_date].append(data)
+
+        if missing:
+            universe = frozenset(
+                int(cik)
+                for cik in download_manager.ticker_reader.map_of_cik_to_ticker[
+                    "cik_str"
+                ]
+            )
+            missing = {report_date: universe for report_date in missing}
+        return cached, missing
+
+    def _store(
+        self,
+        sec_filter: Filter,
+        report_date: ReportDate,
+        extracted: Optional[pd.DataFrame],
+        ciks: frozenset[int],
+    ) -> Optional[pd.DataFrame]:
+        """Cache the records processed from a report.
+
+        Args:
+            sec_filter (Filter): SEC specific filter the report was processed with
+            report_date (ReportDate): the report
+            extracted (Optional[pd.DataFrame]): records processed from the report
+            ciks (frozenset[int]): CIK values requested
+
+        Returns:
+            Optional[pd.DataFrame]: the records of the requested CIK values
+        """
+        extraction = self._extraction(sec_filter, report_date)
+        oldest_fy = sec_filter.oldest_fy
+        if not self.universe:
+            extraction.save(cache.results, extracted, ciks, oldest_fy)
+            return extracted
+        if extracted is None:
+            # There's nothing to slice, the report is processed again next time
+            return None
+        fundamentals_cube.write(extraction, extracted, oldest_fy)
+        extracted = extracted[extracted.index.get_level_values("cik").isin(ciks)]
+        return None if extracted.empty else extracted
+
+    def _schedule(
+        self, sec_filter: Filter, missing: dict[ReportDate, frozenset[int]]
+    ) -> tuple[dict[ReportDate, list[Future]], ParseMode]:
+        """Start processing the reports on the worker pool.
+
+        Args:
+            sec_filter (Filter): SEC specific filter of how to filter the results
+            missing (dict[ReportDate, frozenset[int]]): reports to process and the CIK
+                values to filter each of them on
+
+        Raises:
+            ImportError: when the quarterly report is missing
+
+        Returns:
+            tuple[dict[ReportDate, list[Future]], ParseMode]: results of each report in
+                the order they should be combined, and how the reports were parsed
+        """
+        futures: dict[ReportDate, Future] = {}
+        parse_mode: ParseMode = DEFAULT_PARSE_MODE
+        if not missing:
+            return {}, parse_mode
+
+        # Quarters are processed concurrently, the workers left over are used to
+        # split up the work within each quarter
+        workers = max(1, self.pool.max_workers // len(missing))
+        chunk_size = self.budget.chunk_size(self.pool.max_workers)
+        submitted: list[Future] = []
+
+        def submit(function: Callable, *args) -> Future:
+            self.budget.throttle(self.pool.pids(), submitted)
+            future = self.pool.submit(function, *args)
+            submitted.append(future)
+            return future
+
+        try:
+            # Start processing each report as soon as it is downloaded
+            for report_date, reader in download_manager.get_quarterly_reports(
+                list(missing)
+            ):
+                if reader is None:
+                    raise ImportError(f"missing quarterly report for {report_date}")
+
+                parse_mode = reader.parse_mode
+                futures[report_date] = submit(
+                    _process_report_task,
+                    sec_filter,
+                    missing[report_date],
+                    replace(reader, workers=workers, chunk_size=chunk_size),
+                )
+
+            # Quarters that were split up hand back their parts, which are scheduled
+            # on the same pool as soon as they're known
+            results: dict[ReportDate, list[Future]] = {
+                report_date: [future] for report_date, future in futures.items()
+            }
+            quarters = {future: report_date for report_date, future in futures.items()}
+            for future in as_completed(quarters):
+                result = future.result()
+                if isinstance(result, list):
+                    results[quarters[future]] = [
+                        submit(_process_partition_task, part) for part in result
+                    ]
+        except BaseException:
+            discard(submitted)
+            raise
+        return results, parse_mode
 
     def get_data(self, sec_filter: Filter, ciks: frozenset[int]) -> Results:
         """Collect data based on the provided filter.
@@ -730,9 +803,14 @@ class DataSetCollector:
             Results: filtered data results
 
         """
-        data_frame = None
+        pieces: list[pd.DataFrame] = []
         report_dates = sec_filter.required_reports
         logger.info(f"Creating Unified Data record for these reports: {report_dates}")
+
+        # Only the companies that weren't extracted from a quarter before are processed
+        quarters, missing = self._lookup(sec_filter, ciks)
+        logger.info(f"Processing {len(missing)} of {len(report_dates)} reports")
+
         with alive_bar(
             # total=len(report_dates) * 2,
             theme="smooth",
@@ -742,100 +820,176 @@ class DataSetCollector:
             calibrate=5_000,
             dual_line=True,
         ) as status_bar:
-            funclist: list[Future] = []
-
-            with ProcessPoolExecutor() as executor:
-                for report_date in report_dates:
-                    reader = download_manager.get_quarterly_report(report_date)
-
-                    if reader is None:
-                        raise ImportError(f"missing quarterly report for {report_date}")
-
-                    future = executor.submit(
-                        _process_report_task, sec_filter, ciks, reader
+            results, parse_mode = self._schedule(sec_filter, missing)
+
+            # Collect in a fixed order so the results don't depend on download order.
+            # Workers only hand back handles to their results, which are combined and
+            # cached one quarter at a time.
+            for report_date in report_dates:
+                if report_date in missing:
+                    try:
+                        extracted = NumTextPartition.merge(
+                            results[report_date], parse_mode, timeout=60
+                        )
+                    except BaseException:
+                        # The results of the other quarters are abandoned too
+                        discard(
+                            future for futures in results.values() for future in futures
+                        )
+                        raise
+                    extracted = self._store(
+                        sec_filter,
+                        report_date,
+                        extracted,
+                        ciks if self.universe else missing[report_date],
                     )
-                    funclist.append(future)
-
-                for f in funclist:
-                    data = f.result(timeout=60)  # timeout in 60 seconds
+                    if extracted is not None:
+                        quarters[report_date].append(extracted)
 
-                    if data is None:
-                        # Note, when searching for annual reports, this will generally occur 1/4 times
-                        # if we're only searching for one stock's tags
-                        continue
+                data = assemble(quarters[report_date])
+                if data is None:
+                    # Note, when searching for annual reports, this will generally occur 1/4 times
+                    # if we're only searching for one stock's tags
+                    continue
 
-                    if data_frame is not None:
-                        logger.debug(f"record count: {len(data_frame)}")
-
-                    logger.debug(f"new record count: {len(data)}")
-                    data_frame = DataSetReader.append(data_frame, data)
-                    record_count = len(data_frame)
-                    status_bar(record_count)  # pylint: disable=not-callable
-                    logger.info(f"There are now {record_count} filtered records")
+                logger.debug(f"new record count: {len(data)}")
+                pieces.append(data.assign(report=np.int16(report_code(report_date))))
+                record_count = sum(len(piece) for piece in pieces)
+                status_bar(record_count)  # pylint: disable=not-callable
+                logger.info(f"There are now {record_count} filtered records")
 
         logger.info(f"Created Unified Data record for these reports: {report_dates}")
+        data_frame = combine(pieces)
         if data_frame is None:
             raise LookupError("No data matching the filter was retrieved")
+        if parse_mode != "infer":
+            data_frame = categorize(data_frame)
 
         # Now add an index for ticker values to pair with the cik
         # logger.debug(f"filtered_df_before_merge:\n{data_frame.to_csv()}")
         data_frame = data_frame.reset_index().merge(
-            right=download_manager.ticker_reader.map_of_cik_to_ticker,
+            right=download_manager.ticker_reader.map_of_cik_to_ticker[
+                ["cik_str", "ticker"]
+            ].astype({"ticker": "category"}),
             how="inner",
             left_on="cik",
             right_on=["cik_str"],
         )
 
         # Columns at this point look like this
-        #  ,adsh,tag,cik,ddate,uom,value,period,fy,fp,cik_str,ticker,title
-        # 0,0000097745-23-000008,EarningsPerShareDiluted,97745,2022-12-31,USD,17.63,2022-12-31,2022.0,FY,97745,TMO,THERMO FISHER SCIENTIFIC INC.
-        # 1,0000097745-23-000008,EarningsPerShareDiluted,97745,2020-12-31,USD,15.96,2022-12-31,2022.0,FY,97745,TMO,THERMO FISHER SCIENTIFIC INC.
-        # 2,0000097745-23-000008,EarningsPerShareDiluted,97745,2021-12-31,USD,19.46,2022-12-31,2022.0,FY,97745,TMO,THERMO FISHER SCIENTIFIC INC..
-
-        return Results(data_frame.drop(columns=["cik_str", "adsh", "cik"]))
+        #  ,adsh,tag,cik,ddate,uom,value,period,fy,fp,cik_str,ticker
+        # 0,0000097745-23-000008,EarningsPerShareDiluted,97745,2022-12-31,USD,17.63,2022-12-31,2022.0,FY,97745,TMO
+        # 1,0000097745-23-000008,EarningsPerShareDiluted,97745,2020-12-31,USD,15.96,2022-12-31,2022.0,FY,97745,TMO
+        # 2,0000097745-23-000008,EarningsPerShareDiluted,97745,2021-12-31,USD,19.46,2022-12-31,2022.0,FY,97745,TMO
+
+        # The names of the companies are kept once per ticker instead of on every row
+        return Results(
+            data_frame.drop(columns=["cik_str", "adsh", "cik", "report"]),
+            titles=download_manager.ticker_reader.get_titles(
+                data_frame["ticker"].unique()
+            ),
+            reports=data_frame["report"].to_numpy(),
+        )
 
 
 def _process_report_task(
     sec_filter: Filter, ciks: frozenset[int], reader: DataSetReader
-) -> Optional[pd.DataFrame]:
+) -> Optional[pd.DataFrame | SharedFrame] | list[NumTextPartition]:
     """Task function for processing a single report."""
 
-    return reader.process_zip(sec_filter, ciks)
+    result = reader.process_zip(sec_filter, ciks, defer=True)
+    if isinstance(result, list):
+        return result
+    return share(result)
+
+
+def _process_partition_task(
+    partition: NumTextPartition,
+) -> Optional[pd.DataFrame | SharedFrame]:
+    """Task function for processing part of `num.txt`."""
+
+    return share(partition.process())
+
+
+def _canonical_request(
+    tickers: Iterable[str], sec_filter: Filter, universe: bool = DEFAULT_UNIVERSE
+) -> dict[str, Any]:
+    """Get the arguments of `filter_data` in the form they're cached with.
+
+    Args:
+        tickers (Iterable[str]): ticker symbols
+        sec_filter (Filter): SEC specific data to scrape from the reports
+        universe (bool): extract every company in the ticker map
+
+    Returns:
+        dict[str, Any]: keyword arguments of `filter_data`
+    """
+    return {
+        "tickers": sorted(set(tickers)),
+        "sec_filter": sec_filter.canonical(),
+        "universe": universe,
+    }
 
 
 @beartype
-@cache.results.memoize(tag="sec")
+@cache.memoize(
+    canonical=_canonical_request, weigh=Results.nbytes, tag="sec", ignore={"universe"}
+)
 def filter_data(
     tickers: list[str],
     sec_filter: Filter,
+    universe: bool = DEFAULT_UNIVERSE,
 ) -> Results:
     """Initiate the retrieval of ticker information based on the provided filters.
 
-    Filtered data is stored with the filter
+    Filtered data is stored with the filter. The order of the tickers and tags does
+    not matter, and requests covered by results already cached are sliced out of
+    them rather than extracted again.
 
     Args:
         tickers (list[str]): ticker symbols you want information about
         sec_filter (Filter): SEC specific data to scrape from the reports
+        universe (bool): extract every company in the ticker map into the
+            fundamentals cube and slice the tickers out of it. The results are the
+            same either way. Defaults to the `STOCKTRACER_UNIVERSE` environment
+            variable.
 
     Returns:
         Results: results with filtered data
     """
     logger.debug(f"tickers:\n{repr(tickers)}")
     logger.debug(f"sec_filter:\n{repr(sec_filter)}")
-    return filter_data_nocache(frozenset(tickers), sec_filter)
+    extraction = batch.covering(tickers, sec_filter)
+    if extraction is not None:
+        logger.info("slicing the results out of a shared extraction")
+        return extraction.get(tickers, sec_filter)
 
+    cached = catalog.superset(tickers, sec_filter)
+    if cached is not None:
+        logger.info("slicing the results out of a wider cached extraction")
+        return cached.subset(tickers, sec_filter)
 
-def filter_data_nocache(tickers: frozenset[str], sec_filter: Filter) -> Results:
+    results = filter_data_nocache(frozenset(tickers), sec_filter, universe)
+    if not results.filtered_data.empty:
+        catalog.record(tickers, sec_filter, universe)
+    return results
+
+
+def filter_data_nocache(
+    tickers: frozenset[str], sec_filter: Filter, universe: bool = DEFAULT_UNIVERSE
+) -> Results:
     """Same as filter_data but no caching is applied.
 
     Args:
         tickers (frozenset[str]): ticker symbols you want information about
         sec_filter (Filter): SEC specific data to scrape from the reports
+        universe (bool): extract every company in the ticker map. Defaults to the
+            `STOCKTRACER_UNIVERSE` environment variable.
 
     Returns:
         Results: results with filtered data
     """
-    collector = DataSetCollector()
+    collector = DataSetCollector(universe=universe)
     ticker_reader = download_manager.ticker_reader
 
     # Returns true or throws
@@ -0,0 +1,239 @@
+"""Hand results from worker processes back to the parent through shared memory.
+
+Results returned from a worker process are pickled, pushed through a pipe and
+unpickled again by the parent. For extractions of every tag that's hundreds of MB per
+quarter. Instead, workers write their results as Arrow IPC files in `/dev/shm` and only
+return a small `SharedFrame` handle. The parent memory-maps the files and concatenates
+the tables without reading them through a pipe.
+
+The files are removed once their results are combined. When the results are abandoned
+instead, because processing failed, `discard` removes them as soon as the work that
+writes them finishes, and the files of workers that died are removed when the process
+exits.
+
+!!! note
+    This requires `pyarrow`, installed with `pip install stocktracer[arrow]`. Without
+    it, results are returned as DataFrames.
+"""
+import atexit
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable, Sequence
+
+from stocktracer.collector.accumulator import Accumulator
+from stocktracer.collector.store import HAS_PYARROW
+
+if HAS_PYARROW:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# tmpfs is backed by memory, so files written there never touch the disk
+SHARED_DIRECTORY = (
+    Path("/dev/shm") if os.path.isdir("/dev/shm") else Path(tempfile.gettempdir())
+)
+
+
+@beartype
+@dataclass(frozen=True)
+class SharedFrame:
+    """Handle to a DataFrame written to shared memory by another process."""
+
+    path: Path
+    rows: int
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @classmethod
+    def share(
+        cls, data: pd.DataFrame, directory: Path = SHARED_DIRECTORY
+    ) -> "SharedFrame":
+        """Write a DataFrame to shared memory.
+
+        Args:
+            data (pd.DataFrame): data to share, including its index
+            directory (Path): where the file is written. Defaults to `/dev/shm`.
+
+        Raises:
+            OSError: if the data can't be written, for example when the directory is
+                full. Nothing is left behind.
+
+        Returns:
+            SharedFrame: handle to the shared data
+        """
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        path = directory / f"stocktracer-{os.getpid()}-{uuid.uuid4().hex}.arrow"
+        try:
+            with pa.OSFile(str(path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        except OSError:
+            path.unlink(missing_ok=True)
+            raise
+        return cls(path=path, rows=len(data))
+
+    def table(self):
+        """Map the shared data into this process without copying it.
+
+        Returns:
+            pa.Table: the shared data
+        """
+        return pa.ipc.open_file(pa.memory_map(str(self.path))).read_all()
+
+    def load(self) -> pd.DataFrame:
+        """Read the shared data as a DataFrame.
+
+        Returns:
+            pd.DataFrame: the shared data
+        """
+        return self.table().to_pandas(split_blocks=True)
+
+    def release(self):
+        """Remove the shared data. Tables that are still mapped stay valid."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
+
+
+@beartype
+def share(
+    data: Optional[pd.DataFrame], directory: Path = SHARED_DIRECTORY
+) -> Optional[pd.DataFrame | SharedFrame]:
+    """Prepare the result of a worker to be returned to the parent process.
+
+    Args:
+        data (Optional[pd.DataFrame]): result of the worker
+        directory (Path): where the result is shared. Defaults to `/dev/shm`.
+
+    Returns:
+        Optional[pd.DataFrame | SharedFrame]: a handle to the shared result, or the
+            result itself if it can't be shared
+    """
+    if data is None or not HAS_PYARROW:
+        return data
+    try:
+        return SharedFrame.share(data, directory)
+    except OSError as error:
+        # /dev/shm only holds 64MB in a default Docker container
+        logger.warning(
+            f"unable to share {len(data)} records, pickling them instead: {error}"
+        )
+        return data
+
+
+@beartype
+def release(pieces: Sequence[pd.DataFrame | SharedFrame]):
+    """Remove the shared results that are no longer needed.
+
+    Args:
+        pieces (Sequence[pd.DataFrame | SharedFrame]): results of the workers
+    """
+    for piece in pieces:
+        if isinstance(piece, SharedFrame):
+            piece.release()
+
+
+def _release_result(future: Future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if isinstance(result, SharedFrame):
+        result.release()
+
+
+@beartype
+def discard(futures: Iterable[Future]):
+    """Abandon work whose results are shared, without leaking the shared memory.
+
+    Work that didn't start is cancelled. The shared results of the rest are released
+    as soon as the work finishes.
+
+    Args:
+        futures (Iterable[Future]): work returning `SharedFrame` handles, or any other
+            result, which is left alone
+    """
+    for future in futures:
+        if not future.cancel():
+            future.add_done_callback(_release_result)
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: no cover
+        pass
+    return True
+
+
+@beartype
+def sweep(directory: Path = SHARED_DIRECTORY) -> list[Path]:
+    """Remove the shared results written by processes that are no longer running.
+
+    Args:
+        directory (Path): where the results are written. Defaults to `/dev/shm`.
+
+    Returns:
+        list[Path]: files removed
+    """
+    removed = []
+    for path in directory.glob("stocktracer-*.arrow"):
+        pid = path.name.split("-")[1]
+        if pid.isdigit() and not _is_running(int(pid)):
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    if removed:
+        logger.info(f"removed {len(removed)} abandoned shared results")
+    return removed
+
+
+# Registered before the worker pool is created, so it runs after the workers stopped
+atexit.register(sweep)
+
+
+@beartype
+def combine(pieces: Sequence[pd.DataFrame | SharedFrame]) -> Optional[pd.DataFrame]:
+    """Combine the results of the workers into a single DataFrame.
+
+    Shared results are concatenated as Arrow tables, so they are only copied once,
+    when the combined table is converted to a DataFrame. The shared memory is released
+    afterwards.
+
+    Args:
+        pieces (Sequence[pd.DataFrame | SharedFrame]): results in the order they should
+            be combined
+
+    Returns:
+        Optional[pd.DataFrame]: the combined data or None if there were no results
+    """
+    shared = [piece for piece in pieces if isinstance(piece, SharedFrame)]
+    try:
+        if shared and len(shared) == len(pieces):
+            try:
+                return pa.concat_tables([piece.table() for piece in shared]).to_pandas(
+                    split_blocks=True
+                )
+            except pa.ArrowInvalid as schema_error:
+                # Columns that were inferred differently by the workers
+                logger.debug(f"combining shared results as DataFrames: {schema_error}")
+
+        accumulator = Accumulator()
+        for piece in pieces:
+            accumulator.append(
+                piece.load() if isinstance(piece, SharedFrame) else piece
+            )
+        return accumulator.result()
+    finally:
+        release(shared)
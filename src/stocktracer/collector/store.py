@@ -0,0 +1,233 @@
+"""Columnar on-disk store for decoded SEC quarterly data sets.
+
+The quarterly archives published by the SEC never change once they are released, so
+there is no reason to inflate and parse `sub.txt` and `num.txt` on every run. This
+module converts a quarter into a single Parquet file (one partition per quarter) the
+first time it is used. Rows are sorted by `cik` and `tag`, and the string columns are
+dictionary encoded, so later reads only touch the row groups matching the requested
+companies.
+
+!!! note
+    Parquet support requires `pyarrow`, installed with `pip install stocktracer[arrow]`.
+    When it is not installed, `HAS_PYARROW` is `False` and the collector falls back to
+    parsing the CSV files directly.
+"""
+import logging
+import os
+import tempfile
+from functools import cached_property
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable
+
+from stocktracer import retention
+from stocktracer.collector.dates import ReportDate
+from stocktracer.versions import stage_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow  # pylint: disable=unused-import
+
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover
+    HAS_PYARROW = False
+
+# Bump this whenever the layout of the stored data changes. Changes to the code of this
+# module are picked up by `stocktracer.versions`.
+STORE_VERSION = 1
+
+# Number of rows per row group. Smaller groups give finer grained predicate pushdown.
+ROW_GROUP_SIZE = 50000
+
+_SUB_COLUMNS = ["adsh", "cik", "period", "fy", "fp"]
+_NUM_COLUMNS = ["adsh", "tag", "ddate", "uom", "value"]
+_INDEX = ["adsh", "tag", "cik"]
+
+
+@beartype
+class ColumnarStore:
+    """Stores decoded quarterly data sets in a partitioned columnar format.
+
+    Each quarter is stored in its own file named after the archive, for example
+    `2023q1.parquet`. The stored rows are the inner join of `num.txt` with the
+    submission columns of `sub.txt` that the filters operate on.
+
+    Once the store outgrows `size_limit`, the least recently used quarters are evicted.
+    """
+
+    def __init__(self, directory: Path, size_limit: Optional[int] = None):
+        self.root = directory
+        self.size_limit = size_limit
+
+    @cached_property
+    def directory(self) -> Path:
+        """Directory of the store for the current version of the code.
+
+        Returns:
+            Path: the directory
+        """
+        code = stage_key("store")[:16]
+        return self.root / f"v{STORE_VERSION}-{code}"
+
+    def path(self, quarter: str) -> Path:
+        """Location of the file holding the quarter.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+
+        Returns:
+            Path: path to the parquet file
+        """
+        return self.directory / f"{quarter}.parquet"
+
+    def contains(self, quarter: str) -> bool:
+        """Check if the quarter was already ingested.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+
+        Returns:
+            bool: True if the quarter can be scanned
+        """
+        return self.path(quarter).exists()
+
+    def ingest(
+        self, quarter: str, sub_buffer, num_buffer, chunksize: int = 200000
+    ) -> Path:
+        """Convert the text files of a quarterly archive into the columnar store.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+            sub_buffer: contents of `sub.txt`
+            num_buffer: contents of `num.txt`
+            chunksize (int): number of rows of `num.txt` parsed at a time
+
+        Returns:
+            Path: path to the stored quarter
+        """
+        logger.info(f"ingesting {quarter} into the columnar store")
+        sub_dataframe = pd.read_csv(
+            sub_buffer,
+            delimiter="\t",
+            usecols=_SUB_COLUMNS,
+            index_col="adsh",
+            parse_dates=["period"],
+            dtype={"cik": np.int64, "fy": np.float64, "fp": "category"},
+        )
+
+        reader = pd.read_csv(
+            num_buffer,
+            delimiter="\t",
+            usecols=_NUM_COLUMNS,
+            chunksize=chunksize,
+            parse_dates=["ddate"],
+            dtype={"tag": "category", "uom": "category", "value": np.float64},
+        )
+        chunks = [chunk.join(sub_dataframe, on="adsh", how="inner") for chunk in reader]
+        if chunks:
+            data = pd.concat(chunks, ignore_index=True)
+        else:  # pragma: no cover
+            data = pd.DataFrame(columns=_NUM_COLUMNS + _SUB_COLUMNS[1:])
+
+        # Categories differ between chunks, so unify them before writing
+        for column in ("adsh", "tag", "uom", "fp"):
+            data[column] = data[column].astype(str).astype("category")
+        data = data.sort_values(["cik", "tag"], ignore_index=True)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        destination = self.path(quarter)
+
+        # Write to a temporary file first, so concurrent readers never observe a
+        # partially written quarter.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            data.to_parquet(temporary, index=False, row_group_size=ROW_GROUP_SIZE)
+            os.replace(temporary, destination)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        logger.info(f"stored {len(data)} records for {quarter}")
+        self.trim(keep=destination)
+        return destination
+
+    def trim(self, keep: Optional[Path] = None) -> list[Path]:
+        """Evict the least recently used quarters until they fit in `size_limit`.
+
+        Quarters stored by other versions of the code are never used, so they're
+        evicted first.
+
+        Args:
+            keep (Optional[Path]): quarter that must not be evicted
+
+        Returns:
+            list[Path]: quarters evicted
+        """
+        return retention.trim(
+            self.root.glob("*/*.parquet"),
+            self.size_limit,
+            keep=() if keep is None else (keep,),
+        )
+
+    def prune(self, oldest: Optional[ReportDate]) -> list[Path]:
+        """Remove the quarters outside the retention window and other versions.
+
+        Args:
+            oldest (Optional[ReportDate]): the oldest quarter kept, see
+                `retention.oldest_retained`
+
+        Returns:
+            list[Path]: files and directories removed
+        """
+        removed = retention.drop_versions(self.root, self.directory)
+        return removed + retention.drop_quarters(
+            self.directory.glob("*.parquet"), oldest
+        )
+
+    def scan(  # pylint: disable=too-many-arguments
+        self,
+        quarter: str,
+        ciks: Iterable[int],
+        focus_periods: Iterable[str],
+        oldest_fy: int,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Optional[pd.DataFrame]:
+        """Read the records of a quarter matching the predicates.
+
+        The predicates are pushed down to the parquet reader, so only the row groups
+        that may contain matches are decoded.
+
+        Args:
+            quarter (str): name of the quarter, such as `2023q1`
+            ciks (Iterable[int]): companies to keep
+            focus_periods (Iterable[str]): fiscal periods to keep, such as `FY`
+            oldest_fy (int): oldest fiscal year to keep
+            tags (Optional[Iterable[str]]): tags to keep. Defaults to all tags.
+
+        Returns:
+            Optional[pd.DataFrame]: records indexed the same way as
+                `DataSetReader.process_zip` or None if nothing matched
+        """
+        filters = [
+            ("cik", "in", [int(cik) for cik in ciks]),
+            ("fp", "in", list(focus_periods)),
+            ("fy", ">=", float(oldest_fy)),
+        ]
+        if tags is not None:
+            filters.append(("tag", "in", list(tags)))
+
+        path = self.path(quarter)
+        retention.touch(path)
+        data = pd.read_parquet(path, filters=filters)
+        if data.empty:
+            return None
+
+        # Only the matching rows are left, so decoding them back to strings is cheap
+        for column in ("adsh", "tag", "uom", "fp"):
+            data[column] = data[column].astype(str)
+        return data.set_index(_INDEX)
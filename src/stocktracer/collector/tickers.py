@@ -0,0 +1,162 @@
+"""Translation between the stock tickers and CIK values of the SEC ticker map."""
+import logging
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@beartype
+class TickerReader:
+    """This class provides translation services for CIK and Ticker values.
+
+    The SEC has a `json` file that provides mappings from CIK values to Tickers.
+    The data providing this conversion is injected into this class and then
+    this class provides helper methods for performing the conversion on this data set.
+
+    This class is provided CSV data which is parsed upon initialization. So creating
+    this object is the most expensive part. The tickers and CIK values are indexed once,
+    so every conversion afterwards is a hash lookup.
+
+    >>> reader = TickerReader('{"0":{"cik_str":320193,"ticker":"AAPL","title":"Apple Inc."}}')
+    >>> reader.get_ciks(frozenset({"aapl"}))
+    frozenset({320193})
+    """
+
+    def __init__(self, data: str):
+        self._cik_to_ticker_map = pd.read_json(data, orient="index")
+
+        # A ticker or CIK can be listed more than once, the first listing is used
+        tickers = self._cik_to_ticker_map["ticker"].astype(str)
+        ciks = self._cik_to_ticker_map["cik_str"]
+        first_tickers = ~tickers.duplicated().to_numpy()
+        first_ciks = ~ciks.duplicated().to_numpy()
+        self._tickers = pd.Index(tickers[first_tickers])
+        self._titles = self._cik_to_ticker_map["title"][first_tickers].to_numpy()
+        self._ciks_of_tickers = ciks[first_tickers].to_numpy()
+        self._ciks = pd.Index(ciks[first_ciks])
+        self._tickers_of_ciks = tickers[first_ciks].to_numpy()
+
+    @property
+    def map_of_cik_to_ticker(self) -> pd.DataFrame:
+        """Dataframe containing mapping of cik and ticker information.
+
+        Returns:
+            pd.DataFrame: Dataframe with mapping information
+        """
+        return self._cik_to_ticker_map
+
+    def get_titles(self, tickers: Iterable[str]) -> pd.Series:
+        """Get the names of the companies of the tickers.
+
+        >>> reader = TickerReader('{"0":{"cik_str":320193,"ticker":"AAPL","title":"Apple Inc."}}')
+        >>> reader.get_titles(["AAPL"]).to_dict()
+        {'AAPL': 'Apple Inc.'}
+
+        Args:
+            tickers (Iterable[str]): stock tickers as listed in the ticker map
+
+        Returns:
+            pd.Series: name of the company by ticker, leaving out unknown tickers
+        """
+        titles = pd.Series(self._titles, index=self._tickers, dtype=str)
+        titles.index.name = "ticker"
+        return titles[titles.index.isin(list(tickers))]
+
+    def convert_to_cik(self, ticker: str) -> np.int64:
+        """Get the Cik from the stock ticker.
+
+        Args:
+            ticker (str): stock ticker. The case does not matter.
+
+        Raises:
+            LookupError: If ticker is not found
+
+        Returns:
+            np.int64: cik
+        """
+        return self.convert_to_ciks([ticker])[0]
+
+    def convert_to_ciks(self, tickers: Iterable[str]) -> np.ndarray:
+        """Get the Cik of many stock tickers at once.
+
+        Args:
+            tickers (Iterable[str]): stock tickers. The case does not matter.
+
+        Raises:
+            LookupError: If any of the tickers is not found
+
+        Returns:
+            np.ndarray: cik of each ticker, in the same order
+        """
+        tickers = list(tickers)
+        positions = self._tickers.get_indexer(
+            pd.Index(tickers, dtype=object).str.upper()
+        )
+        missing = np.flatnonzero(positions < 0)
+        if missing.size:
+            raise LookupError(f"unable to find ticker: {tickers[missing[0]]}")
+        return self._ciks_of_tickers[positions]
+
+    def convert_to_ticker(self, cik: int) -> str:
+        """Get the stock ticker from the Cik number.
+
+        Args:
+            cik (int): Cik number for the stock
+
+        Raises:
+            LookupError: If cik is not found
+
+        Returns:
+            str: stock ticker
+        """
+        return self.convert_to_tickers([cik])[0]
+
+    def convert_to_tickers(self, ciks: Iterable[int]) -> list[str]:
+        """Get the stock tickers of many Cik numbers at once.
+
+        Args:
+            ciks (Iterable[int]): Cik numbers of the stocks
+
+        Raises:
+            LookupError: If any of the ciks is not found
+
+        Returns:
+            list[str]: stock ticker of each cik, in the same order
+        """
+        ciks = list(ciks)
+        positions = self._ciks.get_indexer(ciks)
+        missing = np.flatnonzero(positions < 0)
+        if missing.size:
+            raise LookupError(f"unable to find cik: {ciks[missing[0]]}")
+        return self._tickers_of_ciks[positions].tolist()
+
+    def contains(self, tickers: frozenset) -> bool:
+        """Check that the tickers provided exist.
+
+        Args:
+            tickers (frozenset): tickers to check
+
+        Returns:
+            bool: if all the tickers are found
+        """
+        self.convert_to_ciks(tickers)
+        return True
+
+    def get_ciks(self, tickers: frozenset[str]) -> frozenset[int]:
+        """Populates the filter's CIK list to be used for filtering.
+
+        The Filter doesn't need the ticker symbols. If we expand to other data sources,
+        we would have to repeat ticker symbols. For now, the only info we need in the
+        report is the CIK values to find the corresponding stocks.
+
+        Args:
+            tickers (frozenset[str]): ticker symbols to search for
+
+        Returns:
+            frozenset[int]: CIKs values translated from the tickers specified
+        """
+        return frozenset(self.convert_to_ciks(tickers).tolist())
@@ -0,0 +1,138 @@
+"""Compressed storage of the values held in the results cache.
+
+Most of the results cache holds pickled DataFrames, which compress well. Values are
+compressed with zstandard, a dependency of stocktracer. Installs without it fall back
+to zlib, which compresses less and more slowly, and log a warning when the cache is
+opened. Small values are stored as is, since compressing them saves nothing.
+
+!!! note
+    Entries written by earlier versions are not compressed and are still read as is.
+"""
+import logging
+import pickle
+import zlib
+from typing import Any
+
+from beartype import beartype
+from diskcache import UNKNOWN, Disk
+
+try:
+    import zstandard
+
+    HAS_ZSTANDARD = True
+except ImportError:  # pragma: no cover
+    HAS_ZSTANDARD = False
+
+logger = logging.getLogger(__name__)
+
+# Values smaller than this are not compressed
+MIN_COMPRESS_SIZE = 1024
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 1
+
+_MAGIC = b"STC"
+_RAW = _MAGIC + b"\x00"
+_ZLIB = _MAGIC + b"\x01"
+_ZSTD = _MAGIC + b"\x02"
+
+
+@beartype
+def compress(data: bytes) -> bytes:
+    """Compress data, tagging it with the codec used.
+
+    >>> decompress(compress(b"0" * 4096)) == b"0" * 4096
+    True
+    >>> len(compress(b"0" * 4096)) < 100
+    True
+
+    Args:
+        data (bytes): data to compress
+
+    Returns:
+        bytes: compressed data
+    """
+    if len(data) < MIN_COMPRESS_SIZE:
+        return _RAW + data
+    if HAS_ZSTANDARD:
+        return _ZSTD + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return _ZLIB + zlib.compress(data, ZLIB_LEVEL)  # pragma: no cover
+
+
+@beartype
+def decompress(data: bytes) -> bytes:
+    """Decompress data compressed by `compress`.
+
+    Args:
+        data (bytes): compressed data
+
+    Raises:
+        ValueError: if the data wasn't compressed by `compress`
+
+    Returns:
+        bytes: the original data
+    """
+    header, payload = data[: len(_RAW)], data[len(_RAW) :]
+    if header == _RAW:
+        return payload
+    if header == _ZLIB:
+        return zlib.decompress(payload)
+    if header == _ZSTD:
+        if not HAS_ZSTANDARD:  # pragma: no cover
+            raise ValueError("zstandard is required to read this cache entry")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError("data is not compressed by stocktracer")
+
+
+class CompressedDisk(Disk):
+    """Pickles and compresses the values stored by `diskcache.Cache`.
+
+    Keys are stored the same way as `diskcache.Disk` stores them, so they can still be
+    looked up in the database.
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        """Open the storage of a cache.
+
+        Args:
+            directory (str): directory of the cache
+            **kwargs: options of `diskcache.Disk`
+        """
+        super().__init__(directory, **kwargs)
+        if not HAS_ZSTANDARD:
+            logger.warning(
+                "zstandard is not installed, compressing the results cache with zlib"
+            )
+
+    def store(self, value: Any, read: bool, key: Any = UNKNOWN) -> tuple:
+        """Convert a value to the fields stored in the cache.
+
+        Args:
+            value (Any): value to store
+            read (bool): True if the value is a file to read from
+            key (Any): key of the value
+
+        Returns:
+            tuple: size, mode, filename and value stored in the database
+        """
+        if not read:
+            value = compress(pickle.dumps(value, protocol=self.pickle_protocol))
+        return super().store(value, read, key=key)
+
+    def fetch(self, mode: int, filename: str, value: Any, read: bool) -> Any:
+        """Convert the fields stored in the cache back to the value.
+
+        Args:
+            mode (int): how the value was stored
+            filename (str): file holding the value, if any
+            value (Any): value stored in the database
+            read (bool): True to return a file handle rather than the value
+
+        Returns:
+            Any: the value
+        """
+        data = super().fetch(mode, filename, value, read)
+        if read or not isinstance(data, bytes) or not data.startswith(_MAGIC):
+            # Opened as a file or written by an earlier version
+            return data
+        return pickle.loads(decompress(data))
@@ -6,7 +6,7 @@ from typing import Optional
 from beartype import beartype
 from pandas import DataFrame
 
-from stocktracer.collector.sec import ReportDate
+from stocktracer.collector.sec import Filter, ReportDate
 
 
 @beartype
@@ -21,6 +21,20 @@ class Options:
         self.tickers.sort()
 
 
+@beartype
+@dataclass(frozen=True)
+class Requirements:
+    """Data an analysis retrieves with `filter_data`.
+
+    Analyses run together declare their requirements before running, so the data of
+    all of them is extracted at once, see `stocktracer.collector.batch.shared_extraction`.
+    """
+
+    sec_filter: Filter
+    tickers: Optional[list[str]] = None
+    """Tickers to retrieve. Defaults to the tickers of the options."""
+
+
 @beartype
 class Analysis(metaclass=abc.ABCMeta):
     """Base class for all analysis techniques."""
@@ -29,6 +43,15 @@ class Analysis(metaclass=abc.ABCMeta):
         self.options = options
         assert self.options is not None
 
+    def requirements(self) -> Optional[Requirements]:
+        """Declare the data the analysis retrieves.
+
+        Returns:
+            Optional[Requirements]: data retrieved by `analyze`, or None if it isn't
+                known before running
+        """
+        return None
+
     @abc.abstractmethod
     def analyze(self) -> Optional[DataFrame]:
         """Perform financial analysis.
@@ -38,3 +61,11 @@ class Analysis(metaclass=abc.ABCMeta):
         """
 
     under_development: bool = False
+
+    per_ticker: bool = False
+    """True if the results of a ticker don't depend on the other tickers analyzed.
+
+    The results of these analyses must have the ticker in the first level of their
+    index. They're cached for each company, so only the tickers without cached
+    results are analyzed. Other analyses are cached for the whole list of tickers.
+    """
@@ -0,0 +1,457 @@
+"""Metrics computed from the tags of a results table.
+
+A metric is a named expression over tags and other metrics, such as
+`OperatingIncomeLoss / Assets`. Analysis plugins register the metrics they need and
+`Results.Table.evaluate` computes the ones requested in a single pass over the table:
+every distinct subexpression is computed once, however many metrics share it, and
+only the requested metrics end up in the returned table.
+
+Expressions are written in a small subset of Python:
+
+- numbers, tags and metrics. Names that are not identifiers, such as `delta-ROA`, are
+  quoted with backticks.
+- `+`, `-`, `*`, `/` and `**`
+- comparisons, `and`, `or` and `not`, which give 1 when true and 0 otherwise. Missing
+  values count as false.
+- `lag(x, n=1)`: the value of `x` n rows earlier for the same ticker, which is the
+  previous fiscal year in tables created by `Results.select`
+- `delta(x, n=1)`: the change of `x` since `lag(x, n)`
+- `abs(x)`, `min(a, b)`, `max(a, b)` and `where(condition, a, b)`
+
+!!! example
+    ``` python
+    metrics.register("ROA", "OperatingIncomeLoss / Assets")
+    metrics.register("ROA>last-year", "delta(ROA) > 0")
+    table.evaluate(["ROA", "ROA>last-year"])
+    ```
+"""
+import ast
+import functools
+import logging
+import re
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Mapping, Sequence
+
+logger = logging.getLogger(__name__)
+
+_QUOTED = re.compile(r"`([^`]+)`")
+
+_BINARY = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+}
+_COMPARE = {
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+# Smallest and largest number of arguments of each function
+_FUNCTIONS = {
+    "lag": (1, 2),
+    "delta": (1, 2),
+    "abs": (1, 1),
+    "min": (2, 2),
+    "max": (2, 2),
+    "where": (3, 3),
+}
+_NODES = (
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.Call,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+)
+
+
+@beartype
+@dataclass(frozen=True)
+class Metric:
+    """A metric registered by name."""
+
+    name: str
+    expression: str
+    description: str = ""
+
+
+METRICS: dict[str, Metric] = {}
+"""Registered metrics by name."""
+
+
+class _Unquote(ast.NodeTransformer):
+    """Put the names quoted with backticks back in place of their placeholders."""
+
+    def __init__(self, quoted: dict[str, str]):
+        self.quoted = quoted
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:  # pylint: disable=invalid-name
+        """Unquote a name.
+
+        Args:
+            node (ast.Name): the name
+
+        Returns:
+            ast.Name: the name it stands for
+        """
+        return ast.copy_location(
+            ast.Name(id=self.quoted.get(node.id, node.id), ctx=ast.Load()), node
+        )
+
+
+def _validate(node: ast.expr, expression: str):
+    for child in ast.walk(node):
+        if not isinstance(child, _NODES) or isinstance(
+            child, (ast.MatMult, ast.Mod, ast.FloorDiv, ast.BitAnd, ast.BitOr)
+        ):
+            raise ValueError(
+                f"unsupported {type(child).__name__} in metric: {expression}"
+            )
+        if isinstance(child, ast.Constant) and (
+            isinstance(child.value, bool) or not isinstance(child.value, (int, float))
+        ):
+            raise ValueError(f"unsupported constant in metric: {expression}")
+        if isinstance(child, ast.Call):
+            name = getattr(child.func, "id", None)
+            if name not in _FUNCTIONS or child.keywords:
+                raise ValueError(f"unsupported call in metric: {expression}")
+            low, high = _FUNCTIONS[name]
+            if not low <= len(child.args) <= high:
+                raise ValueError(f"wrong number of arguments to {name}: {expression}")
+            if name in ("lag", "delta") and len(child.args) == 2:
+                periods = child.args[1]
+                if not (
+                    isinstance(periods, ast.Constant)
+                    and isinstance(periods.value, int)
+                    and periods.value > 0
+                ):
+                    raise ValueError(f"{name} needs a positive period: {expression}")
+
+
+@functools.lru_cache(maxsize=None)
+@beartype
+def parse(expression: str) -> ast.expr:
+    """Parse the expression of a metric.
+
+    >>> ast.unparse(parse("delta(`debt-to-assets`) < 0"))
+    'delta(debt-to-assets) < 0'
+
+    Args:
+        expression (str): the expression
+
+    Raises:
+        ValueError: if the expression is not valid
+
+    Returns:
+        ast.expr: syntax tree of the expression
+    """
+    quoted: dict[str, str] = {}
+
+    def placeholder(match: re.Match) -> str:
+        name = f"_quoted{len(quoted)}_"
+        quoted[name] = match.group(1)
+        return name
+
+    try:
+        tree = ast.parse(_QUOTED.sub(placeholder, expression).strip(), mode="eval")
+    except SyntaxError as error:
+        raise ValueError(f"invalid metric: {expression}") from error
+    node = _Unquote(quoted).visit(tree.body)
+    _validate(node, expression)
+    return node
+
+
+@beartype
+def register(name: str, expression: str, description: str = "") -> Metric:
+    """Register a metric so it can be evaluated and used by other metrics by name.
+
+    Args:
+        name (str): name of the metric
+        expression (str): how the metric is computed, see the module documentation
+        description (str): what the metric measures
+
+    Raises:
+        ValueError: if the expression is not valid or another metric was already
+            registered with the same name
+
+    Returns:
+        Metric: the registered metric
+    """
+    parse(expression)
+    metric = Metric(name, expression, description)
+    registered = METRICS.get(name)
+    if registered is not None and registered.expression != expression:
+        raise ValueError(
+            f"metric {name} is already registered as: {registered.expression}"
+        )
+    METRICS[name] = metric
+    return metric
+
+
+class _Evaluator:
+    """Evaluate expressions over a table, computing every subexpression once.
+
+    Subexpressions are memoized by a key built from what their names resolve to, so
+    the same expression written in different metrics is only computed once.
+    """
+
+    def __init__(self, data: pd.DataFrame, expressions: Mapping[str, str]):
+        self.data = data
+        self.expressions = expressions
+        self.values: dict[str, np.ndarray] = {}
+        # Expressions (by name) and registered metrics (by True, name) being resolved
+        self.resolving: list[str | tuple[bool, str]] = []
+
+    @cached_property
+    def _groups(self) -> tuple[np.ndarray, np.ndarray]:
+        # Rows ordered by ticker, keeping the order of the rows within a ticker
+        if "ticker" in self.data.index.names:
+            codes, _ = pd.factorize(self.data.index.get_level_values("ticker"))
+        else:
+            codes = np.zeros(len(self.data), dtype=np.int64)
+        order = np.argsort(codes, kind="stable")
+        return order, codes[order]
+
+    def full(self, values: np.ndarray | float) -> np.ndarray:
+        """Broadcast a value to every row of the table.
+
+        Args:
+            values (np.ndarray | float): value of every row or of all of them
+
+        Returns:
+            np.ndarray: value of every row
+        """
+        return np.broadcast_to(values, (len(self.data),))
+
+    def lag(self, values: np.ndarray, periods: int) -> np.ndarray:
+        """Shift values down by a number of rows within each ticker.
+
+        Args:
+            values (np.ndarray): value of every row
+            periods (int): number of rows to shift by
+
+        Returns:
+            np.ndarray: shifted values, NaN where there's no earlier row
+        """
+        order, codes = self._groups
+        ordered = self.full(values)[order]
+        shifted = np.full(len(ordered), np.nan)
+        if periods < len(ordered):
+            shifted[periods:] = np.where(
+                codes[periods:] == codes[:-periods], ordered[:-periods], np.nan
+            )
+        result = np.empty(len(ordered))
+        result[order] = shifted
+        return result
+
+    def expand(
+        self, key: str | tuple[bool, str], expression: str
+    ) -> tuple[str, np.ndarray]:
+        """Evaluate the expression of a metric.
+
+        Args:
+            key (str | tuple[bool, str]): the metric, see `resolving`
+            expression (str): its expression
+
+        Returns:
+            tuple[str, np.ndarray]: memoization key and value of every row
+        """
+        self.resolving.append(key)
+        try:
+            return self.evaluate(parse(expression))
+        finally:
+            self.resolving.pop()
+
+    def resolve(self, name: str) -> tuple[str, np.ndarray]:
+        """Look up a tag, or evaluate a metric.
+
+        Args:
+            name (str): name of the tag or metric
+
+        Raises:
+            ValueError: if a metric depends on itself
+            KeyError: if there's no tag or metric with that name
+
+        Returns:
+            tuple[str, np.ndarray]: memoization key and value of every row
+        """
+        if name in self.data.columns:
+            key = f"tag:{name}"
+            if key not in self.values:
+                self.values[key] = self.data[name].to_numpy(dtype=float)
+            return key, self.values[key]
+        # An expression can use the registered metric it's named after
+        if name in self.expressions and name not in self.resolving:
+            return self.expand(name, self.expressions[name])
+        if name in METRICS and (True, name) not in self.resolving:
+            return self.expand((True, name), METRICS[name].expression)
+        if name in self.expressions or name in METRICS:
+            raise ValueError(f"metric {name} depends on itself")
+        raise KeyError(f"unknown tag or metric: {name}")
+
+    def evaluate(self, node: ast.expr) -> tuple[str, np.ndarray]:
+        """Evaluate an expression unless it was already evaluated.
+
+        Args:
+            node (ast.expr): the expression
+
+        Returns:
+            tuple[str, np.ndarray]: memoization key and value of every row
+        """
+        if isinstance(node, ast.Name):
+            return self.resolve(node.id)
+        if isinstance(node, ast.Constant):
+            return repr(float(node.value)), self.full(float(node.value))
+
+        if isinstance(node, ast.Call):
+            operator = node.func.id  # type: ignore[attr-defined]
+            operands = node.args
+        elif isinstance(node, ast.Compare):
+            operator = ",".join(type(op).__name__ for op in node.ops)
+            operands = [node.left, *node.comparators]
+        elif isinstance(node, ast.BoolOp):
+            operator, operands = type(node.op).__name__, node.values
+        elif isinstance(node, ast.UnaryOp):
+            operator, operands = type(node.op).__name__, [node.operand]
+        else:
+            operator = type(node.op).__name__  # type: ignore[attr-defined]
+            operands = [node.left, node.right]  # type: ignore[attr-defined]
+
+        keys, values = zip(*(self.evaluate(operand) for operand in operands))
+        key = f"{operator}({', '.join(keys)})"
+        if key not in self.values:
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                self.values[key] = self.compute(node, list(values))
+        return key, self.values[key]
+
+    def compute(self, node: ast.expr, values: list[np.ndarray]) -> np.ndarray:
+        """Compute an expression from the values of its operands.
+
+        Args:
+            node (ast.expr): the expression
+            values (list[np.ndarray]): value of every operand
+
+        Returns:
+            np.ndarray: value of every row
+        """
+        if isinstance(node, ast.BinOp):
+            return _BINARY[type(node.op)](values[0], values[1])
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return (~_truth(values[0])).astype(np.int64)
+            return -values[0] if isinstance(node.op, ast.USub) else values[0]
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            truths = [_truth(value) for value in values]
+            return functools.reduce(combine, truths).astype(np.int64)
+        if isinstance(node, ast.Compare):
+            result = np.ones(len(self.data), dtype=bool)
+            for operator, left, right in zip(node.ops, values, values[1:]):
+                result &= _COMPARE[type(operator)](left, right)
+            return result.astype(np.int64)
+        return self.call(node, values)  # type: ignore[arg-type]
+
+    def call(self, node: ast.Call, values: list[np.ndarray]) -> np.ndarray:
+        """Compute a function call.
+
+        Args:
+            node (ast.Call): the call
+            values (list[np.ndarray]): value of every argument
+
+        Returns:
+            np.ndarray: value of every row
+        """
+        name = node.func.id  # type: ignore[attr-defined]
+        if name in ("lag", "delta"):
+            periods = node.args[1].value if len(values) == 2 else 1  # type: ignore
+            lagged = self.lag(values[0], periods)
+            return lagged if name == "lag" else values[0] - lagged
+        if name == "abs":
+            return np.abs(values[0])
+        if name == "min":
+            return np.minimum(values[0], values[1])
+        if name == "max":
+            return np.maximum(values[0], values[1])
+        return np.where(_truth(values[0]), values[1], values[2])
+
+
+def _truth(values: np.ndarray) -> np.ndarray:
+    return np.nan_to_num(values, nan=0.0) != 0
+
+
+@beartype
+def evaluate(
+    data: pd.DataFrame, metrics: str | Sequence[str] | Mapping[str, str]
+) -> pd.DataFrame:
+    """Evaluate metrics over a table with a row per ticker and fiscal year.
+
+    >>> data = pd.DataFrame(
+    ...     {"Assets": [10.0, 20.0], "OperatingIncomeLoss": [1.0, 4.0]},
+    ...     index=pd.MultiIndex.from_tuples(
+    ...         [("AAPL", 2021), ("AAPL", 2022)], names=["ticker", "fy"]
+    ...     ),
+    ... )
+    >>> evaluate(
+    ...     data, {"ROA": "OperatingIncomeLoss / Assets", "up": "delta(ROA) > 0"}
+    ... )  # doctest: +NORMALIZE_WHITESPACE
+                 ROA  up
+    ticker fy
+    AAPL   2021  0.1   0
+           2022  0.2   1
+
+    Args:
+        data (pd.DataFrame): table with a column per tag
+        metrics (str | Sequence[str] | Mapping[str, str]): names of the metrics to
+            evaluate, or expressions by name. Expressions can use each other by name.
+
+    Raises:
+        KeyError: if an expression uses a tag or metric that doesn't exist
+        ValueError: if an expression is not valid
+
+    Returns:
+        pd.DataFrame: a column per requested metric, with the index of `data`
+    """
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    expressions = dict(metrics) if isinstance(metrics, Mapping) else {}
+    evaluator = _Evaluator(data, expressions)
+    columns = {}
+    for name in metrics:
+        if name in expressions:
+            # The expression wins over a column of the same name
+            _, values = evaluator.expand(name, expressions[name])
+        else:
+            _, values = evaluator.resolve(name)
+        columns[name] = evaluator.full(values)
+    logger.debug(f"evaluated {len(evaluator.values)} expressions for {len(columns)}")
+    return pd.DataFrame(columns, index=data.index, columns=list(columns))
+
+
+register("net-income", "OperatingIncomeLoss", "Operating income or loss")
+register(
+    "current-ratio",
+    "AssetsCurrent / LiabilitiesCurrent",
+    "Ability to pay the obligations due within a year",
+)
+register(
+    "debt-to-assets",
+    "LiabilitiesCurrent / AssetsCurrent",
+    "Short-term debt relative to short-term assets",
+)
+register("return-on-assets", "OperatingIncomeLoss / Assets", "Return on assets (ROA)")
@@ -0,0 +1,319 @@
+"""Writers for the reports of the analysis results.
+
+Reports used to be rendered completely in memory, after transposing the whole results,
+before they were written out. Reports are now written in chunks as they're rendered,
+so only one chunk is held in memory at a time, except for the aligned text formats:
+
+| Format    | Layout                    | Streamed | Compression                   |
+| --------- | ------------------------- | -------- | ----------------------------- |
+| `csv`     | a column per ticker       | yes      | gzip, bz2, xz, zstd           |
+| `json`    | an object per ticker      | yes      | gzip, bz2, xz, zstd           |
+| `md`      | a column per ticker       | no       | gzip, bz2, xz, zstd           |
+| `txt`     | a column per ticker       | no       | gzip, bz2, xz, zstd           |
+| `parquet` | a row per ticker          | yes      | snappy, gzip, brotli, zstd, lz4 |
+| `feather` | a row per ticker          | yes      | zstd, lz4                     |
+
+Parquet and Feather (the Arrow IPC file format) keep the layout of the results, with
+the index stored as columns, so downstream jobs can read them without parsing. Both
+require `pyarrow`, installed with `pip install stocktracer[arrow]`, and zstd compression of the text formats requires `zstandard`.
+
+Reports can also be split into a file per ticker, which are written in parallel.
+"""
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from beartype import beartype
+from beartype.typing import Callable, Iterator
+
+from stocktracer.collector.store import HAS_PYARROW
+from stocktracer.compression import HAS_ZSTANDARD
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+if HAS_ZSTANDARD:
+    import zstandard  # pylint: disable=import-error
+
+logger = logging.getLogger(__name__)
+
+# Number of values rendered at a time by the streaming writers
+CHUNK_CELLS = 1_000_000
+
+TEXT_FORMATS = frozenset({"csv", "md", "json", "txt"})
+FORMATS = TEXT_FORMATS | {"parquet", "feather"}
+
+_TEXT_COMPRESSION: dict[str, tuple[str, Callable[..., Any]]] = {
+    "gzip": (".gz", gzip.open),
+    "bz2": (".bz2", bz2.open),
+    "xz": (".xz", lzma.open),
+}
+if HAS_ZSTANDARD:
+    _TEXT_COMPRESSION["zstd"] = (".zst", zstandard.open)
+
+_BINARY_COMPRESSION = {
+    "parquet": frozenset({"snappy", "gzip", "brotli", "zstd", "lz4"}),
+    "feather": frozenset({"zstd", "lz4"}),
+}
+
+
+@beartype
+def suffix(report_format: str, compression: Optional[str] = None) -> str:
+    """Get the file extension of a report.
+
+    >>> suffix("csv", "gzip")
+    '.csv.gz'
+    >>> suffix("parquet", "zstd")
+    '.parquet'
+
+    Args:
+        report_format (str): format of the report
+        compression (Optional[str]): compression of the report
+
+    Returns:
+        str: extension of the report files
+    """
+    if compression is None or report_format not in TEXT_FORMATS:
+        return f".{report_format}"
+    return f".{report_format}{_TEXT_COMPRESSION[compression][0]}"
+
+
+@beartype
+def check(report_format: str, compression: Optional[str] = None):
+    """Check that a report can be written.
+
+    Args:
+        report_format (str): format of the report
+        compression (Optional[str]): compression of the report
+
+    Raises:
+        ValueError: if the format is unknown, a required package is missing or the
+            compression isn't supported by the format
+    """
+    if report_format not in FORMATS:
+        raise ValueError(f"unsupported report format: {report_format}")
+    if report_format not in TEXT_FORMATS:
+        if not HAS_PYARROW:
+            raise ValueError(
+                f"pyarrow is required to write {report_format} reports, "
+                "install stocktracer[arrow]"
+            )
+        supported = _BINARY_COMPRESSION[report_format]
+    elif compression == "zstd" and not HAS_ZSTANDARD:
+        raise ValueError("zstandard is required to write zstd compressed reports")
+    else:
+        supported = frozenset(_TEXT_COMPRESSION)
+    if compression is not None and compression not in supported:
+        raise ValueError(
+            f"unsupported compression for {report_format} reports: {compression}"
+        )
+
+
+def _row_chunks(results: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """Split results into chunks of rows.
+
+    Args:
+        results (pd.DataFrame): the results
+
+    Yields:
+        pd.DataFrame: consecutive rows, at least one chunk even if there are no rows
+    """
+    rows = max(1, CHUNK_CELLS // max(1, len(results.columns)))
+    for start in range(0, max(1, len(results)), rows):
+        yield results.iloc[start : start + rows]
+
+
+def _transposed_dtype(results: pd.DataFrame) -> Optional[np.dtype]:
+    """Get the dtype of the columns of the transposed results.
+
+    Transposing chunks of the results would otherwise give each chunk the dtype of
+    its own columns, and values would be rendered differently from one chunk to the
+    next.
+
+    Args:
+        results (pd.DataFrame): the results
+
+    Returns:
+        Optional[np.dtype]: common dtype of the columns, or None if there are no rows
+    """
+    transposed = results.iloc[:1].transpose()
+    return None if transposed.columns.empty else transposed.dtypes.iloc[0]
+
+
+def _write_csv(results: pd.DataFrame, stream: io.TextIOBase):
+    """Write the transposed results as CSV, a chunk of columns at a time.
+
+    Args:
+        results (pd.DataFrame): the results
+        stream (io.TextIOBase): where to write them
+    """
+    dtype = _transposed_dtype(results)
+    columns = max(1, CHUNK_CELLS // max(1, len(results)))
+    for start in range(0, max(1, len(results.columns)), columns):
+        chunk = results.iloc[:, start : start + columns].transpose()
+        if dtype is not None:
+            chunk = chunk.astype(dtype)
+        chunk.to_csv(stream, header=start == 0)
+
+
+def _write_json(results: pd.DataFrame, stream: io.TextIOBase):
+    """Write the transposed results as JSON, a chunk of tickers at a time.
+
+    The transposed results are written as an object of columns, which is an object
+    of rows of the results themselves.
+
+    Args:
+        results (pd.DataFrame): the results
+        stream (io.TextIOBase): where to write them
+    """
+    dtype = _transposed_dtype(results)
+    stream.write("{")
+    separator = ""
+    for chunk in _row_chunks(results):
+        if dtype is not None:
+            chunk = chunk.astype(dtype)
+        members = chunk.to_json(orient="index")[1:-1]
+        if members:
+            stream.write(separator + members)
+            separator = ","
+    stream.write("}")
+
+
+def _write_text(results: pd.DataFrame, report_format: str, stream: io.TextIOBase):
+    """Write the transposed results in a text format.
+
+    Args:
+        results (pd.DataFrame): the results
+        report_format (str): one of the text formats
+        stream (io.TextIOBase): where to write them
+    """
+    match report_format:
+        case "csv":
+            _write_csv(results, stream)
+        case "json":
+            _write_json(results, stream)
+        case "md":
+            # Columns are aligned on their widest value, so the whole table is needed
+            results.transpose().to_markdown(stream)
+        case "txt":
+            results.transpose().to_string(stream)
+
+
+def _write_arrow(
+    results: pd.DataFrame,
+    report_format: str,
+    path: Path,
+    compression: Optional[str],
+):
+    """Write the results with pyarrow, a chunk of rows at a time.
+
+    Args:
+        results (pd.DataFrame): the results
+        report_format (str): `parquet` or `feather`
+        path (Path): where to write them
+        compression (Optional[str]): compression codec
+    """
+    schema = pa.Schema.from_pandas(results, preserve_index=True)
+    if report_format == "parquet":
+        writer = pq.ParquetWriter(
+            str(path), schema, compression=compression or "snappy"
+        )
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = pa.ipc.new_file(str(path), schema, options=options)
+    with writer:
+        for chunk in _row_chunks(results):
+            # Cast rather than convert with the schema, which doesn't find the
+            # columns of results with several levels of columns
+            table = pa.Table.from_pandas(chunk, preserve_index=True)
+            writer.write_table(table.cast(schema))
+
+
+@beartype
+def write(
+    results: pd.DataFrame,
+    report_format: str,
+    destination: Path | io.TextIOBase | None = None,
+    compression: Optional[str] = None,
+):
+    """Write a report of the results.
+
+    Args:
+        results (pd.DataFrame): results of an analysis, with the tickers in the first
+            level of the index
+        report_format (str): format of the report
+        destination (Path | io.TextIOBase | None): file or stream to write the report
+            to. Text reports are printed when it's None.
+        compression (Optional[str]): compression of the report. Only files can be
+            compressed.
+
+    Raises:
+        ValueError: if the report can't be written to the destination
+    """
+    check(report_format, compression)
+    if destination is None:
+        destination = sys.stdout
+    if not isinstance(destination, Path):
+        if report_format not in TEXT_FORMATS:
+            raise ValueError(f"a report file is required for {report_format} reports")
+        if compression is not None:
+            raise ValueError("only report files can be compressed")
+        _write_text(results, report_format, destination)
+        if destination is sys.stdout:
+            destination.write("\n")
+        return
+    if report_format not in TEXT_FORMATS:
+        _write_arrow(results, report_format, destination, compression)
+        return
+    opener = open if compression is None else _TEXT_COMPRESSION[compression][1]
+    with opener(destination, "wt", encoding="utf8", newline="") as stream:
+        _write_text(results, report_format, stream)
+
+
+@beartype
+def write_split(
+    results: pd.DataFrame,
+    report_format: str,
+    directory: Path,
+    compression: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> list[Path]:
+    """Write a report for each ticker of the results, in parallel.
+
+    Args:
+        results (pd.DataFrame): results of an analysis, with the tickers in the first
+            level of the index
+        report_format (str): format of the reports
+        directory (Path): directory to write the reports to, named after the tickers
+        compression (Optional[str]): compression of the reports
+        workers (Optional[int]): number of reports written at the same time.
+            Defaults to the default of `ThreadPoolExecutor`.
+
+    Returns:
+        list[Path]: the reports written
+    """
+    check(report_format, compression)
+    directory.mkdir(parents=True, exist_ok=True)
+    extension = suffix(report_format, compression)
+    tickers = results.index.get_level_values(0).astype(str)
+    groups = results.groupby(tickers, sort=False, observed=True)
+
+    def write_ticker(group: tuple[str, pd.DataFrame]) -> Path:
+        ticker, rows = group
+        path = directory / f"{ticker}{extension}"
+        write(rows, report_format, path, compression)
+        return path
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        paths = list(executor.map(write_ticker, groups))
+    logger.info(f"wrote {len(paths)} reports to {directory}")
+    return paths
@@ -0,0 +1,240 @@
+"""Limits on the disk space taken by the caches.
+
+Every cache can be given a size limit. Once a cache grows past it, the entries that
+were used the least recently are evicted until it fits again. Files are marked as used
+by updating their modification time whenever they're read, since access times are not
+tracked on many file systems.
+
+Quarters that fall outside the analysis window can also be dropped from every cache
+with `stocktracer prune`. The window covers the same quarters as an analysis of that
+many years ending with the current quarter.
+
+| Environment Variable                   | Default                | Cache                  |
+| -------------------------------------- | ---------------------- | ---------------------- |
+| `STOCKTRACER_RESULTS_SIZE_LIMIT`       | 1GB                    | results                |
+| `STOCKTRACER_RESULTS_EVICTION_POLICY`  | least-recently-used    | results                |
+| `STOCKTRACER_ARCHIVES_SIZE_LIMIT`      | unlimited              | downloaded archives    |
+| `STOCKTRACER_STORE_SIZE_LIMIT`         | unlimited              | columnar store         |
+| `STOCKTRACER_CUBE_SIZE_LIMIT`          | unlimited              | fundamentals cube      |
+| `STOCKTRACER_RETENTION_YEARS`          | unlimited              | all of them            |
+
+Sizes are given in bytes or with a unit, such as `500MB` or `2GiB`.
+"""
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from beartype import beartype
+from beartype.typing import Iterable
+
+from stocktracer.collector.dates import ReportDate
+
+logger = logging.getLogger(__name__)
+
+_UNITS = {
+    "": 1,
+    "b": 1,
+    "kb": 10**3,
+    "mb": 10**6,
+    "gb": 10**9,
+    "tb": 10**12,
+    "kib": 2**10,
+    "mib": 2**20,
+    "gib": 2**30,
+    "tib": 2**40,
+}
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*$")
+_QUARTER = re.compile(r"^(\d{4})q([1-4])")
+
+
+@beartype
+def parse_size(text: str) -> int:
+    """Parse a size in bytes.
+
+    >>> parse_size("512")
+    512
+    >>> parse_size("1.5 GB")
+    1500000000
+    >>> parse_size("2GiB")
+    2147483648
+
+    Args:
+        text (str): number of bytes, optionally followed by a unit
+
+    Raises:
+        ValueError: if the size can't be parsed
+
+    Returns:
+        int: number of bytes
+    """
+    match = _SIZE.match(text.lower())
+    if match is None or match.group(2) not in _UNITS:
+        raise ValueError(f"invalid size: {text}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+@beartype
+def size_limit(name: str, default: Optional[str] = None) -> Optional[int]:
+    """Get the size limit of a cache from `STOCKTRACER_<NAME>_SIZE_LIMIT`.
+
+    Args:
+        name (str): name of the cache, such as `archives`
+        default (Optional[str]): size used when the variable is not set. Defaults
+            to no limit.
+
+    Returns:
+        Optional[int]: limit in bytes or None if the cache is unlimited
+    """
+    value = os.environ.get(f"STOCKTRACER_{name.upper()}_SIZE_LIMIT", default)
+    if value is None or value.strip().lower() in ("", "none", "unlimited"):
+        return None
+    return parse_size(value)
+
+
+@beartype
+def oldest_retained(
+    years: Optional[int] = None, today: Optional[ReportDate] = None
+) -> Optional[ReportDate]:
+    """Get the oldest quarter kept in the caches.
+
+    >>> oldest_retained(5, ReportDate(2023, 2))
+    ReportDate(year=2018, quarter=2)
+
+    Args:
+        years (Optional[int]): number of years kept before the current quarter.
+            Defaults to `STOCKTRACER_RETENTION_YEARS`.
+        today (Optional[ReportDate]): the current quarter. Defaults to today.
+
+    Returns:
+        Optional[ReportDate]: the oldest quarter kept or None if every quarter is kept
+    """
+    if years is None:
+        value = os.environ.get("STOCKTRACER_RETENTION_YEARS")
+        if not value:
+            return None
+        years = int(value)
+    today = ReportDate() if today is None else today
+    return ReportDate(today.year - years, today.quarter)
+
+
+@beartype
+def is_retained(name: str, oldest: Optional[ReportDate]) -> bool:
+    """Check if a cached quarter falls inside the retention window.
+
+    >>> is_retained("2018q1.parquet", ReportDate(2018, 2))
+    False
+    >>> is_retained("2018q2-2016.parquet", ReportDate(2018, 2))
+    True
+    >>> is_retained("scope.json", ReportDate(2018, 2))
+    True
+
+    Args:
+        name (str): name of the quarter or of a file named after it, such as `2023q1`
+        oldest (Optional[ReportDate]): the oldest quarter kept, see `oldest_retained`
+
+    Returns:
+        bool: False if the quarter must be dropped. Names that are not quarters are
+            always retained.
+    """
+    match = _QUARTER.match(name)
+    if oldest is None or match is None:
+        return True
+    return (int(match.group(1)), int(match.group(2))) >= (oldest.year, oldest.quarter)
+
+
+@beartype
+def touch(path: Path):
+    """Mark a cached file as recently used.
+
+    Args:
+        path (Path): the cached file
+    """
+    try:
+        os.utime(path)
+    except OSError:  # pragma: no cover
+        pass
+
+
+@beartype
+def trim(
+    files: Iterable[Path], limit: Optional[int], keep: Iterable[Path] = ()
+) -> list[Path]:
+    """Remove the least recently used files until their total size fits the limit.
+
+    Args:
+        files (Iterable[Path]): files of a cache
+        limit (Optional[int]): size limit in bytes. None doesn't remove anything.
+        keep (Iterable[Path]): files that are never removed, such as the one that
+            was just written
+
+    Returns:
+        list[Path]: files removed
+    """
+    if limit is None:
+        return []
+    entries = []
+    for path in files:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+
+    kept = set(keep)
+    removed = []
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= limit:
+            break
+        if path in kept:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed.append(path)
+    if removed:
+        logger.info(f"evicted {len(removed)} files to fit in {limit} bytes")
+    return removed
+
+
+@beartype
+def drop_quarters(files: Iterable[Path], oldest: Optional[ReportDate]) -> list[Path]:
+    """Remove the files of quarters outside the retention window.
+
+    Args:
+        files (Iterable[Path]): files named after their quarter, such as
+            `2023q1.parquet`
+        oldest (Optional[ReportDate]): the oldest quarter kept, see `oldest_retained`
+
+    Returns:
+        list[Path]: files removed
+    """
+    removed = []
+    for path in files:
+        if not is_retained(path.name, oldest):
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    return removed
+
+
+@beartype
+def drop_versions(root: Path, current: Path) -> list[Path]:
+    """Remove the data stored by other versions of the code.
+
+    Args:
+        root (Path): directory holding a directory per version
+        current (Path): directory of the current version
+
+    Returns:
+        list[Path]: directories removed
+    """
+    if not root.exists():
+        return []
+    removed = []
+    for path in root.iterdir():
+        if path.is_dir() and path != current:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
@@ -0,0 +1,229 @@
+"""Daemon that keeps stocktracer warm between invocations of the CLI.
+
+Every invocation of the CLI starts cold: the modules are imported, the ticker mapping is
+parsed and the worker pool is started before any report is processed, and extractions
+are read and decoded from the disk caches. Running `stocktracer serve` starts a daemon
+that does all of this once, keeps the extractions it recently used in memory and then
+answers requests, such as `analyze`, over a Unix socket. While the daemon is running,
+the CLI forwards its requests to it.
+
+The socket is created in the cache directory and can be moved with the
+`STOCKTRACER_SOCKET` environment variable. Only the user that started the daemon can
+connect to it. When the daemon doesn't answer within `STOCKTRACER_DAEMON_TIMEOUT`
+seconds, the CLI runs the request itself.
+"""
+import logging
+import os
+import pickle
+import socket
+import socketserver
+from pathlib import Path
+from typing import Any, Optional
+
+from beartype import beartype
+from beartype.typing import Callable
+
+from stocktracer import cache
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = Path(
+    os.environ.get("STOCKTRACER_SOCKET", cache.CACHE_DIR / "stocktracer.sock")
+)
+
+# Seconds the CLI waits for the daemon to accept a request, and then to answer it
+CONNECT_TIMEOUT = 5
+REQUEST_TIMEOUT = float(os.environ.get("STOCKTRACER_DAEMON_TIMEOUT", 600))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers a single request sent by a `Client`."""
+
+    def handle(self):
+        try:
+            method, kwargs = pickle.load(self.rfile)
+        except EOFError:
+            # `Client.available` connects without sending anything
+            return
+        logger.info(f"received {method} request: {kwargs}")
+        try:
+            response: tuple[bool, Any] = (True, self.server.dispatch(method, kwargs))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            logger.warning(f"{method} request failed: {error}")
+            response = (False, error)
+        try:
+            payload = pickle.dumps(response)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            payload = pickle.dumps((False, RuntimeError(str(error))))
+        try:
+            self.wfile.write(payload)
+        except BrokenPipeError:
+            logger.warning(f"the client gave up on the {method} request")
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves requests from the CLI, each one on its own thread."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path,
+        handlers: Optional[dict[str, Callable[..., Any]]] = None,
+    ):
+        """Bind the server to a Unix socket that only the current user can use.
+
+        Args:
+            socket_path (Path): location of the socket
+            handlers (Optional[dict[str, Callable[..., Any]]]): functions answering
+                each type of request, called with the parameters of the request
+
+        Raises:
+            RuntimeError: if another daemon is already serving on the socket
+        """
+        if Client(socket_path, timeout=CONNECT_TIMEOUT).available:
+            raise RuntimeError(f"a daemon is already serving requests on {socket_path}")
+        if socket_path.exists():
+            # A daemon that exited without cleaning up leaves its socket behind
+            socket_path.unlink()
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+        self.socket_path = socket_path
+        self.handlers: dict[str, Callable[..., Any]] = {"ping": os.getpid}
+        self.handlers.update(handlers or {})
+
+    def dispatch(self, method: str, kwargs: dict[str, Any]) -> Any:
+        """Run a request.
+
+        Args:
+            method (str): name of the request
+            kwargs (dict[str, Any]): parameters of the request
+
+        Raises:
+            ValueError: if the request is not supported
+
+        Returns:
+            Any: result of the request
+        """
+        if method not in self.handlers:
+            raise ValueError(f"unsupported request: {method}")
+        return self.handlers[method](**kwargs)
+
+    def server_close(self):
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+
+@beartype
+def warm_up():
+    """Do the work that every request would otherwise repeat once, ahead of time.
+
+    The extractions used by the requests are also kept in memory from then on, see
+    `stocktracer.cache.keep_hot`.
+    """
+    # pylint: disable=import-outside-toplevel
+    from stocktracer.collector import sec
+
+    cache.keep_hot()
+    sec.worker_pool.warm()
+    try:
+        sec.download_manager.ticker_reader  # pylint: disable=pointless-statement
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger.warning(f"unable to load the tickers: {error}")
+
+
+@beartype
+def serve(socket_path: Path, handlers: dict[str, Callable[..., Any]]):
+    """Run the daemon until it's interrupted.
+
+    Args:
+        socket_path (Path): location of the socket
+        handlers (dict[str, Callable[..., Any]]): functions answering each type of
+            request
+    """
+    warm_up()
+    with Server(socket_path, handlers) as server:
+        logger.info(f"serving requests on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("shutting down")
+
+
+@beartype
+class Client:
+    """Sends requests to a running daemon."""
+
+    def __init__(
+        self,
+        socket_path: Optional[Path] = None,
+        timeout: Optional[int | float] = None,
+        connect_timeout: Optional[int | float] = None,
+    ):
+        """Create a client. Nothing is sent until a request is made.
+
+        Args:
+            socket_path (Optional[Path]): socket of the daemon. Defaults to
+                `SOCKET_PATH`.
+            timeout (Optional[int | float]): seconds to wait for the daemon. Defaults
+                to waiting forever.
+            connect_timeout (Optional[int | float]): seconds to wait for the daemon
+                to accept the connection. Defaults to `timeout`.
+        """
+        self.socket_path = SOCKET_PATH if socket_path is None else socket_path
+        self.timeout = timeout
+        self.connect_timeout = timeout if connect_timeout is None else connect_timeout
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.connect_timeout)
+        try:
+            connection.connect(str(self.socket_path))
+        except OSError:
+            connection.close()
+            raise
+        connection.settimeout(self.timeout)
+        return connection
+
+    @property
+    def available(self) -> bool:
+        """Check if a daemon is listening on the socket.
+
+        Returns:
+            bool: True if requests can be forwarded to the daemon
+        """
+        if not self.socket_path.exists():
+            return False
+        try:
+            self._connect().close()
+        except OSError:
+            return False
+        return True
+
+    def request(self, method: str, **kwargs) -> Any:
+        """Send a request to the daemon and wait for the result.
+
+        Args:
+            method (str): name of the request, such as `analyze`
+            **kwargs: parameters of the request
+
+        Raises:
+            TimeoutError: if the daemon doesn't answer in time
+            Exception: the exception raised by the daemon when the request failed
+
+        Returns:
+            Any: result of the request
+        """
+        with self._connect() as connection:
+            connection.sendall(pickle.dumps((method, kwargs)))
+            connection.shutdown(socket.SHUT_WR)
+            with connection.makefile("rb") as response:
+                succeeded, result = pickle.load(response)
+        if not succeeded:
+            raise result
+        return result
@@ -0,0 +1,280 @@
+"""Versions of every cached stage of the pipeline.
+
+Each cached stage carries a version key derived from the code that produces it, so
+changing that code only invalidates what it affects: a change to an analysis plugin
+invalidates the results of that plugin and a change to the reader invalidates the
+extractions, but neither throws away the downloaded archives.
+
+The key of a stage combines:
+
+- an explicit version number, bumped when the stored data changes in a way the code
+  doesn't show, such as a change in a dependency
+- a fingerprint of the syntax tree of every component the stage depends on, ignoring
+  comments, docstrings and formatting
+- the keys of the stages it's computed from
+
+| Stage        | Cached data                                        |
+| ------------ | -------------------------------------------------- |
+| `index`      | byte range index of `num.txt`                      |
+| `store`      | quarters decoded into the columnar store           |
+| `extraction` | records extracted per quarter and company          |
+| `cube`       | records extracted per quarter for every company    |
+| `sec`        | `filter_data` results                              |
+| `results`    | results of the analysis plugins, see `plugin_key`  |
+
+The downloaded archives never depend on the code and are not versioned.
+"""
+import ast
+import functools
+import hashlib
+import importlib.util
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from beartype import beartype
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_docstrings(tree: ast.AST) -> ast.AST:
+    for node in ast.walk(tree):
+        if isinstance(
+            node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            body = node.body
+            if (
+                body
+                and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)
+            ):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+@functools.lru_cache(maxsize=None)
+def _parse(module: str) -> ast.Module:
+    # The docstrings are stripped from the cached tree, it's only used for fingerprints
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+        raise LookupError(f"unable to find the source of {module}")
+    with open(spec.origin, encoding="utf8") as source:
+        tree = ast.parse(source.read(), filename=spec.origin)
+    return _strip_docstrings(tree)  # type: ignore[return-value]
+
+
+@functools.lru_cache(maxsize=None)
+@beartype
+def fingerprint(component: str) -> str:
+    """Fingerprint the code of a module or of a class or function in a module.
+
+    The module is parsed without being imported. Comments, docstrings and formatting
+    don't change the fingerprint.
+
+    >>> fingerprint("stocktracer.versions:fingerprint") == fingerprint(
+    ...     "stocktracer.versions:fingerprint"
+    ... )
+    True
+
+    Args:
+        component (str): `module` or `module:name`, such as
+            `stocktracer.collector.sec:DataSetReader`
+
+    Raises:
+        LookupError: if the component can't be found
+
+    Returns:
+        str: fingerprint of the component
+    """
+    module, _, name = component.partition(":")
+    tree: ast.AST = _parse(module)
+    if name:
+        for node in tree.body:  # type: ignore[attr-defined]
+            if getattr(node, "name", None) == name:
+                tree = node
+                break
+        else:
+            raise LookupError(f"unable to find {name} in {module}")
+    return hashlib.sha256(ast.dump(tree).encode()).hexdigest()
+
+
+@beartype
+@dataclass(frozen=True)
+class Stage:
+    """A cached stage of the pipeline."""
+
+    version: int
+    components: tuple[str, ...]
+    depends: tuple[str, ...] = field(default_factory=tuple)
+
+
+_READER = (
+    "stocktracer.collector.results:Filter",
+    "stocktracer.collector.sec:DataSetReader",
+    "stocktracer.collector.sec:SubmissionCodes",
+    "stocktracer.collector.sec:NumTextPartition",
+    "stocktracer.collector.sec:_process_report_task",
+    "stocktracer.collector.sec:_process_partition_task",
+    "stocktracer.collector.sec:DataSetCollector",
+    "stocktracer.collector.schema",
+    "stocktracer.collector.shared",
+    "stocktracer.collector.accumulator",
+)
+
+STAGES: dict[str, Stage] = {
+    "index": Stage(1, ("stocktracer.collector.index",)),
+    "store": Stage(1, ("stocktracer.collector.store",)),
+    "extraction": Stage(
+        1, _READER + ("stocktracer.collector.extraction",), ("index", "store")
+    ),
+    "cube": Stage(
+        1, _READER + ("stocktracer.collector.cube",), ("index", "store", "extraction")
+    ),
+    "sec": Stage(
+        1,
+        (
+            "stocktracer.collector.tickers:TickerReader",
+            "stocktracer.collector.results:Results",
+            "stocktracer.collector.sec:DataSetCollector",
+            "stocktracer.collector.sec:filter_data",
+            "stocktracer.collector.sec:filter_data_nocache",
+            "stocktracer.collector.catalog",
+        ),
+        ("extraction", "cube"),
+    ),
+    "results": Stage(
+        1,
+        (
+            "stocktracer.interface",
+            "stocktracer.metrics",
+            "stocktracer.cli:get_analysis_instance",
+            "stocktracer.cli:_cached",
+            "stocktracer.cli:_companies",
+            "stocktracer.cli:_company_entries",
+            "stocktracer.cli:_rows_by_company",
+        ),
+        ("sec",),
+    ),
+}
+"""Stages of the pipeline by the tag of their entries in `stocktracer.cache.results`."""
+
+
+@functools.lru_cache(maxsize=None)
+@beartype
+def stage_key(tag: str) -> str:
+    """Get the version key of a stage.
+
+    Args:
+        tag (str): name of the stage, see `STAGES`
+
+    Returns:
+        str: version key
+    """
+    stage = STAGES[tag]
+    digest = hashlib.sha256(f"{tag}:{stage.version}".encode())
+    for component in stage.components:
+        digest.update(fingerprint(component).encode())
+    for dependency in stage.depends:
+        digest.update(stage_key(dependency).encode())
+    return digest.hexdigest()
+
+
+def _is_package(module: str) -> bool:
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        return False
+    return spec is not None and spec.submodule_search_locations is not None
+
+
+@functools.lru_cache(maxsize=None)
+@beartype
+def imports(module: str) -> tuple[str, ...]:
+    """Get the modules of stocktracer and of its own package a module imports.
+
+    The module is parsed without being imported.
+
+    >>> imports("stocktracer.analysis.f_score")  # doctest: +NORMALIZE_WHITESPACE
+    ('stocktracer', 'stocktracer.analysis.annual_reports', 'stocktracer.collector.sec',
+     'stocktracer.interface', 'stocktracer.metrics')
+
+    Args:
+        module (str): full name of the module
+
+    Raises:
+        LookupError: if the module can't be found
+
+    Returns:
+        tuple[str, ...]: full names of the imported modules, sorted
+    """
+    packages = {"stocktracer", module.split(".")[0]}
+    imported = set()
+    for node in ast.walk(_parse(module)):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif (
+            isinstance(node, ast.ImportFrom)
+            and node.module
+            and not node.level
+            and node.module.split(".")[0] in packages
+        ):
+            imported.add(node.module)
+            # `from package import module` imports a module too
+            if _is_package(node.module):
+                for alias in node.names:
+                    name = f"{node.module}.{alias.name}"
+                    if importlib.util.find_spec(name) is not None:
+                        imported.add(name)
+    return tuple(
+        sorted(
+            name
+            for name in imported
+            if name.split(".")[0] in packages and name != module
+        )
+    )
+
+
+@beartype
+def plugin_key(module_name: str) -> str:
+    """Get the version key of the results of an analysis plugin.
+
+    The key covers the plugin module and the modules of stocktracer or of the
+    plugin's own package it imports, such as a helper shared by several plugins.
+    Plugins that can't be parsed are keyed by their name only.
+
+    Args:
+        module_name (str): full name of the plugin module
+
+    Returns:
+        str: version key
+    """
+    try:
+        code = ":".join(
+            fingerprint(module) for module in (module_name, *imports(module_name))
+        )
+    except (LookupError, ImportError, SyntaxError) as error:
+        logger.warning(f"unable to version {module_name}: {error}")
+        code = module_name
+    return hashlib.sha256(f"{stage_key('results')}:{code}".encode()).hexdigest()
+
+
+@beartype
+def refresh(results: Any) -> list[str]:
+    """Evict the entries of the stages whose code changed since they were cached.
+
+    Args:
+        results (Any): the `diskcache.Cache` holding the entries
+
+    Returns:
+        list[str]: stages that were evicted
+    """
+    evicted = []
+    for tag in STAGES:
+        key = stage_key(tag)
+        if results.get(("stage", tag)) != key:
+            evicted.append(tag)
+            count = results.evict(tag=tag)
+            logger.info(f"{tag} changed, evicted {count} cached entries")
+            results.set(("stage", tag), key)
+    return evicted
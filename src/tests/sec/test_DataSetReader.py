@@ -4,11 +4,15 @@ from datetime import date
 from pathlib import Path
 
 import mock
+import numpy as np
+import pandas as pd
 import pytest
 
 import stocktracer.filter as Filter
 from stocktracer.cli import Cli
 from stocktracer.collector.sec import DataSetReader
+from stocktracer.collector.sec import Filter as SecFilter
+from stocktracer.collector.sec import SubmissionCodes
 from tests.fixtures.unit import data_txt_sample, filter_aapl, sub_txt_sample
 
 logger = logging.getLogger(__name__)
@@ -49,3 +53,71 @@ def test_DataSetReader_processSubText(filter_aapl: Filter.Selectors, sub_txt_sam
     assert "0000320193-23-000006" in sub_df.index.get_level_values("adsh")
     assert "0000723125-23-000022" not in sub_df.index.get_level_values("adsh")
     assert "0000004457-23-000026" not in sub_df.index.get_level_values("adsh")
+
+
+@pytest.mark.parametrize("tags", [None, ["A", "C"]])
+def test_DataSetReader_processNumChunk_matches_join(tags):
+    rng = np.random.default_rng(0)
+    adshs = [f"{cik:010d}-23-{n:06d}" for cik in range(50) for n in range(3)]
+    sub_df = (
+        pd.DataFrame(
+            {
+                "adsh": adshs,
+                "cik": np.array([int(adsh[:10]) for adsh in adshs], dtype=np.int32),
+                "period": pd.Timestamp("2022-12-31"),
+                "fy": 2022,
+                "fp": rng.choice(["FY", "Q1"], len(adshs)),
+            }
+        )
+        .sample(frac=0.3, random_state=1)
+        .set_index(["adsh", "cik"])
+    )
+    chunk = pd.DataFrame(
+        {
+            "adsh": rng.choice(adshs, 2000),
+            "tag": rng.choice(["A", "B", "C"], 2000),
+            "ddate": pd.Timestamp("2023-01-31"),
+            "uom": "USD",
+            "value": rng.random(2000),
+        }
+    ).set_index(["adsh", "tag"])
+
+    expected = chunk.join(sub_df, how="inner")
+    if tags is not None:
+        expected = expected.query("tag in @tags")
+
+    sec_filter = SecFilter(years=1, tags=tags)
+    result = DataSetReader._process_num_chunk(
+        sec_filter, SubmissionCodes.encode(sub_df), chunk
+    )
+    assert result.equals(expected)
+    assert list(result.index.names) == list(expected.index.names)
+
+
+@pytest.mark.parametrize("parse_mode", ["schema", "pyarrow"])
+def test_DataSetReader_parseMode_matches_infer(
+    filter_aapl: Filter.Selectors, sub_txt_sample, data_txt_sample, parse_mode
+):
+    if parse_mode == "pyarrow":
+        pytest.importorskip("pyarrow")
+    results = {}
+    for mode in ("infer", parse_mode):
+        sub_df = DataSetReader._process_sub_text(
+            io.StringIO(sub_txt_sample),
+            filter_aapl.sec_filter,
+            frozenset({320193}),
+            mode,
+        )
+        results[mode] = DataSetReader._process_num_text(
+            io.StringIO(data_txt_sample), filter_aapl.sec_filter, sub_df, mode
+        )
+
+    expected, result = results["infer"], results[parse_mode]
+    assert result is not None
+    assert isinstance(result["uom"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["fp"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(
+        result.reset_index().astype({"tag": object, "uom": object, "fp": object}),
+        expected.reset_index(),
+        check_dtype=False,
+    )
@@ -0,0 +1,75 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from stocktracer.collector.accumulator import Accumulator
+
+logger = logging.getLogger(__name__)
+
+
+def create_chunk(start: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "adsh": [f"adsh-{i}" for i in range(start, start + 100)],
+            "tag": ["Assets"] * 100,
+            "value": [float(i) for i in range(start, start + 100)],
+        }
+    ).set_index(["adsh", "tag"])
+
+
+def test_empty():
+    accumulator = Accumulator()
+    assert accumulator.empty
+    assert len(accumulator) == 0
+    assert accumulator.result() is None
+
+
+def test_matches_concat():
+    accumulator = Accumulator()
+    chunks = [create_chunk(start) for start in range(0, 1000, 100)]
+    for chunk in chunks:
+        accumulator.append(chunk)
+    assert not accumulator.empty
+    assert len(accumulator) == 1000
+    assert accumulator.spilled == 0
+    result = accumulator.result()
+    assert result is not None
+    assert result.equals(pd.concat(chunks))
+
+
+def test_spill(tmp_path: Path):
+    accumulator = Accumulator(max_memory=10000, spill_directory=tmp_path)
+    chunks = [create_chunk(start) for start in range(0, 1000, 100)]
+    for chunk in chunks:
+        accumulator.append(chunk)
+    logger.debug(f"spilled {accumulator.spilled} times")
+    assert accumulator.spilled > 0
+    assert any(tmp_path.iterdir())
+
+    result = accumulator.result()
+    assert result is not None
+    assert result.equals(pd.concat(chunks))
+
+    # Temporary files are removed once the result is materialized
+    assert not any(tmp_path.iterdir())
+    assert len(accumulator) == 1000
+
+
+def test_parts(tmp_path: Path):
+    max_memory = 10000
+    accumulator = Accumulator(max_memory=max_memory, spill_directory=tmp_path)
+    chunks = [create_chunk(start) for start in range(0, 1000, 100)]
+    for chunk in chunks:
+        accumulator.append(chunk)
+    chunk_memory = max(chunk.memory_usage(deep=True).sum() for chunk in chunks)
+
+    # Every piece handed back fits in the ceiling, plus the chunk that exceeded it
+    parts = []
+    for part in accumulator.parts():
+        assert part.memory_usage(deep=True).sum() <= max_memory + chunk_memory
+        parts.append(part)
+    assert len(parts) > 1
+    assert pd.concat(parts).equals(pd.concat(chunks))
+    assert not any(tmp_path.iterdir())
+    assert accumulator.empty
@@ -0,0 +1,143 @@
+import io
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+from zipfile import ZipFile
+
+import pandas as pd
+import pytest
+from diskcache import Cache
+
+import stocktracer.collector.sec as Sec
+import stocktracer.filter as Filter
+from stocktracer import cache
+from stocktracer.collector.archive import ArchiveStore
+from stocktracer.collector.dates import ReportDate
+from stocktracer.collector.sec import DataSetReader
+from stocktracer.collector.store import HAS_PYARROW, ColumnarStore
+from tests.fixtures.unit import fake_data_txt_sample, fake_sub_txt_sample, filter_aapl
+
+logger = logging.getLogger(__name__)
+
+url = "https://www.sec.gov/files/dera/data/financial-statement-data-sets/2023q1.zip"
+
+
+def create_zip(sub_txt: str, num_txt: str) -> bytes:
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        archive.writestr("sub.txt", sub_txt)
+        archive.writestr("num.txt", num_txt)
+    return buffer.getvalue()
+
+
+def test_put_and_open(tmp_path: Path, fake_sub_txt_sample, fake_data_txt_sample):
+    store = ArchiveStore(tmp_path, expire_after=timedelta(days=1))
+    assert store.get(url) is None
+    with pytest.raises(LookupError, match="missing cache entry"):
+        with store.open(url):
+            pass
+
+    content = create_zip(fake_sub_txt_sample, fake_data_txt_sample)
+    path = store.put(url, [content[:100], content[100:]])
+    assert store.get(url) == path
+    assert path.read_bytes() == content
+
+    metadata = store.metadata(url)
+    assert metadata is not None
+    assert metadata.size == len(content)
+    assert metadata.url == url
+
+    with store.open(url) as archive:
+        with archive.open("sub.txt") as sub_file:
+            assert sub_file.read().decode() == fake_sub_txt_sample
+
+
+def test_expired(tmp_path: Path):
+    store = ArchiveStore(tmp_path, expire_after=timedelta(days=-1))
+    path = store.put(url, [b"data"])
+    assert store.get(url) is None
+    assert store.get(url, allow_stale=True) == path
+
+
+@pytest.mark.parametrize(
+    "use_store",
+    [False, pytest.param(True, marks=pytest.mark.skipif(not HAS_PYARROW, reason=""))],
+)
+def test_process_zip(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    filter_aapl: Filter.Selectors,
+    fake_sub_txt_sample,
+    fake_data_txt_sample,
+    use_store: bool,
+):
+    store = ArchiveStore(tmp_path / "archives", expire_after=timedelta(days=1))
+    store.put(url, [create_zip(fake_sub_txt_sample, fake_data_txt_sample)])
+    monkeypatch.setattr(cache, "sec_archives", store)
+    monkeypatch.setattr(Sec, "columnar_store", ColumnarStore(tmp_path / "store"))
+
+    reader = DataSetReader(url, use_store=use_store)
+    assert reader.quarter == "2023q1"
+    data = reader.process_zip(filter_aapl.sec_filter, frozenset({320193}))
+    assert data is not None
+    logger.debug(f"\n{data}")
+    assert list(data.index.names) == ["adsh", "tag", "cik"]
+    assert list(data["value"]) == [6000.0]
+
+
+def test_process_zip_parallel(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    fake_sub_txt_sample,
+    fake_data_txt_sample,
+):
+    store = ArchiveStore(tmp_path / "archives", expire_after=timedelta(days=1))
+    store.put(url, [create_zip(fake_sub_txt_sample, fake_data_txt_sample)])
+    monkeypatch.setattr(cache, "sec_archives", store)
+    monkeypatch.setattr(cache, "results", Cache(tmp_path / "results"))
+    monkeypatch.setattr(Sec, "MIN_PARTITION_SIZE", 1)
+
+    sec_filter = Sec.Filter(
+        years=3, last_report=Sec.ReportDate(2023, 1), only_annual=False
+    )
+    serial = DataSetReader(url, use_store=False).process_zip(
+        sec_filter, frozenset({320193})
+    )
+    parallel = DataSetReader(url, use_store=False, workers=3).process_zip(
+        sec_filter, frozenset({320193})
+    )
+    assert serial is not None and parallel is not None
+    assert len(parallel) == 12
+    pd.testing.assert_frame_equal(parallel.sort_index(), serial.sort_index())
+
+    parts = DataSetReader(url, use_store=False, workers=3).process_zip(
+        sec_filter, frozenset({320193}), defer=True
+    )
+    assert isinstance(parts, list) and len(parts) == 3
+    deferred = Sec.NumTextPartition.merge(
+        [Sec.worker_pool.submit(part.process) for part in parts], "infer"
+    )
+    assert deferred is not None
+    pd.testing.assert_frame_equal(deferred, parallel)
+
+
+def test_trim_and_prune(tmp_path: Path):
+    store = ArchiveStore(tmp_path, expire_after=timedelta(days=1), size_limit=10)
+    old_url = url.replace("2023q1", "2020q1")
+    old = store.put(old_url, [b"0" * 6])
+    os.utime(old, (1000, 1000))
+
+    # Storing the new archive evicts the least recently used one
+    new = store.put(url, [b"1" * 6])
+    assert not old.exists()
+    assert store.metadata(old_url) is None
+    assert store.get(url) == new
+
+    # An archive larger than the limit is still kept until another one is stored
+    store.size_limit = 1
+    assert not store.trim(keep=new)
+
+    assert store.prune(None) == []
+    assert store.prune(ReportDate(2023, 2)) == [new]
+    assert store.get(url) is None
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import stocktracer.collector.sec as Sec
+from stocktracer.collector.cube import FundamentalsCube
+from stocktracer.collector.extraction import Extraction
+from tests.fixtures.unit import fake_data_txt_sample, fake_sub_txt_sample
+from tests.sec.test_extraction import AAPL, MSFT, REPORT_DATE, SEC_FILTER, scheduled
+
+
+def records() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "adsh": ["a", "a", "b", "c"],
+            "tag": ["Assets", "Liabilities", "Assets", "Assets"],
+            "cik": [AAPL, AAPL, MSFT, MSFT],
+            "uom": "USD",
+            "value": [1.0, 2.0, 3.0, 4.0],
+            "fy": [2022.0, 2022.0, 2022.0, 2020.0],
+            "fp": ["FY", "FY", "Q1", "FY"],
+        }
+    ).set_index(["adsh", "tag", "cik"])
+
+
+def test_find_write_scan(tmp_path: Path):
+    cube = FundamentalsCube(tmp_path)
+    assert cube.find("2023q1", {"FY"}, None, 2020) is None
+
+    path = cube.write(Extraction.create("2023q1", {"FY", "Q1"}, None), records(), 2020)
+    assert cube.find("2023q1", {"FY"}, ["Assets"], 2021) == path
+    assert cube.find("2023q1", {"FY", "Q1"}, None, 2020) == path
+    assert cube.find("2023q1", {"FY", "Q2"}, None, 2020) is None
+    assert cube.find("2023q1", {"FY"}, None, 2019) is None
+    assert cube.find("2022q4", {"FY"}, None, 2020) is None
+
+    data = cube.scan(path, [MSFT], {"FY", "Q1"}, 2021, ["Assets"])
+    assert data is not None
+    assert list(data.index.names) == ["adsh", "tag", "cik"]
+    assert list(data["value"]) == [3.0]
+    assert cube.scan(path, [1], {"FY"}, 2020) is None
+
+    # Extracting an older window replaces the stored quarter
+    older = cube.write(Extraction.create("2023q1", {"FY", "Q1"}, None), records(), 2019)
+    assert not path.exists()
+    assert cube.find("2023q1", {"FY"}, None, 2019) == older
+
+    # Narrower extractions are stored separately
+    narrow = cube.write(
+        Extraction.create("2023q1", {"FY"}, ["Assets"]), records(), 2019
+    )
+    assert narrow.parent != older.parent
+    assert cube.find("2023q1", {"FY", "Q1"}, None, 2019) == older
+
+
+def test_get_data_universe(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, scheduled: list[dict]
+):
+    monkeypatch.setattr(Sec, "fundamentals_cube", FundamentalsCube(tmp_path / "cube"))
+
+    collector = Sec.DataSetCollector(universe=True)
+    apple = collector.get_data(SEC_FILTER, frozenset({AAPL}))
+    microsoft = collector.get_data(SEC_FILTER, frozenset({MSFT}))
+    both = collector.get_data(SEC_FILTER, frozenset({AAPL, MSFT}))
+
+    # The quarter is only processed once, for every company in the ticker map
+    assert scheduled == [{REPORT_DATE: {AAPL, MSFT}}, {}, {}]
+    assert set(apple.filtered_data.index.get_level_values("ticker")) == {"AAPL"}
+    assert set(microsoft.filtered_data.index.get_level_values("ticker")) == {"MSFT"}
+
+    expected = Sec.DataSetCollector(universe=False).get_data(
+        SEC_FILTER, frozenset({AAPL, MSFT})
+    )
+    pd.testing.assert_frame_equal(
+        both.filtered_data.sort_index(), expected.filtered_data.sort_index()
+    )
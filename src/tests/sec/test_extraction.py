@@ -0,0 +1,156 @@
+import json
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from diskcache import Cache
+
+import stocktracer.collector.sec as Sec
+from stocktracer import cache
+from stocktracer.collector.archive import ArchiveStore
+from stocktracer.collector.extraction import Extraction, assemble
+from tests.fixtures.unit import fake_data_txt_sample, fake_sub_txt_sample
+from tests.sec.test_archive import create_zip
+
+AAPL = 320193
+MSFT = 789019
+REPORT_DATE = Sec.ReportDate(2023, 1)
+URL = Sec.download_manager._create_download_uri(REPORT_DATE)
+SEC_FILTER = Sec.Filter(years=0, last_report=REPORT_DATE, only_annual=False)
+
+
+def records(cik: int, fys: list[float]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "adsh": [f"{cik}-{index}" for index in range(len(fys))],
+            "tag": "Assets",
+            "cik": cik,
+            "fy": fys,
+            "value": [float(index) for index in range(len(fys))],
+        }
+    ).set_index(["adsh", "tag", "cik"])
+
+
+def test_load_and_save(tmp_path: Path):
+    store = Cache(tmp_path)
+    extraction = Extraction.create("2023q1", ["FY"], ["Assets"])
+
+    found, missing = extraction.load(store, [AAPL, MSFT], 2020)
+    assert not found
+    assert missing == {AAPL, MSFT}
+
+    # MSFT has no records, which is cached too
+    extraction.save(store, records(AAPL, [2020.0, 2022.0]), [AAPL, MSFT], 2020)
+    found, missing = extraction.load(store, [AAPL, MSFT, 1], 2020)
+    assert missing == {1}
+    assert len(found) == 1
+    pd.testing.assert_frame_equal(found[0], records(AAPL, [2020.0, 2022.0]))
+
+    # A more recent window is served from the same records
+    found, missing = extraction.load(store, [AAPL], 2021)
+    assert not missing
+    assert list(found[0]["fy"]) == [2022.0]
+
+    # An older window needs records that were never extracted
+    found, missing = extraction.load(store, [AAPL], 2019)
+    assert missing == {AAPL}
+
+    # The order of the tags doesn't matter, but the tags do
+    assert not Extraction.create("2023q1", ["FY"], ["Assets"]).load(
+        store, [AAPL], 2020
+    )[1]
+    assert Extraction.create("2023q1", ["FY"], None).load(store, [AAPL], 2020)[1]
+
+
+def test_assemble():
+    assert assemble([]) is None
+    data = assemble([records(MSFT, [2022.0]), records(AAPL, [2022.0, 2022.0])])
+    assert data is not None
+    assert list(data.index.get_level_values("adsh")) == [
+        f"{AAPL}-0",
+        f"{AAPL}-1",
+        f"{MSFT}-0",
+    ]
+
+
+def second_company(sample: str) -> str:
+    rows = sample.strip().splitlines()[1:]
+    return "\n".join(
+        row.replace(f"0000{AAPL}", f"0000{MSFT}").replace(str(AAPL), str(MSFT))
+        for row in rows
+    )
+
+
+@pytest.fixture
+def scheduled(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    fake_sub_txt_sample: str,
+    fake_data_txt_sample: str,
+) -> list[dict]:
+    """Collect a quarter with two companies in this process.
+
+    Returns:
+        list[dict]: the companies processed from each report by every collection
+    """
+    store = ArchiveStore(tmp_path / "archives", expire_after=timedelta(days=1))
+    store.put(
+        URL,
+        [
+            create_zip(
+                fake_sub_txt_sample + second_company(fake_sub_txt_sample) + "\n",
+                fake_data_txt_sample.strip()
+                + "\n"
+                + second_company(fake_data_txt_sample)
+                + "\n",
+            )
+        ],
+    )
+    monkeypatch.setattr(cache, "sec_archives", store)
+    monkeypatch.setattr(cache, "results", Cache(tmp_path / "results"))
+
+    class FakeDownloadManager:
+        ticker_reader = Sec.TickerReader(
+            json.dumps(
+                {
+                    "0": {"cik_str": AAPL, "ticker": "AAPL", "title": "Apple"},
+                    "1": {"cik_str": MSFT, "ticker": "MSFT", "title": "Microsoft"},
+                }
+            )
+        )
+
+    monkeypatch.setattr(Sec, "download_manager", FakeDownloadManager())
+
+    # Process the reports in this process and keep track of what was processed
+    processed: list[dict] = []
+
+    def schedule(self, sec_filter, missing):
+        processed.append(missing)
+        results = {}
+        for report_date, ciks in missing.items():
+            future: Future = Future()
+            future.set_result(
+                Sec.DataSetReader(URL, use_store=False).process_zip(sec_filter, ciks)
+            )
+            results[report_date] = [future]
+        return results, "infer"
+
+    monkeypatch.setattr(Sec.DataSetCollector, "_schedule", schedule)
+    return processed
+
+
+def test_get_data_incremental(scheduled: list[dict]):
+    collector = Sec.DataSetCollector(universe=False)
+    apple = collector.get_data(SEC_FILTER, frozenset({AAPL}))
+    both = collector.get_data(SEC_FILTER, frozenset({AAPL, MSFT}))
+    again = collector.get_data(SEC_FILTER, frozenset({AAPL, MSFT}))
+
+    assert scheduled == [{REPORT_DATE: {AAPL}}, {REPORT_DATE: {MSFT}}, {}]
+    assert len(apple.filtered_data) == 2
+    assert set(both.filtered_data.index.get_level_values("ticker")) == {
+        "AAPL",
+        "MSFT",
+    }
+    pd.testing.assert_frame_equal(again.filtered_data, both.filtered_data)
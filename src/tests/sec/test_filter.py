@@ -7,6 +7,7 @@ import pandas as pd
 import pytest
 
 import stocktracer.filter as Filter
+from stocktracer.collector.results import slope
 from stocktracer.collector.sec import Filter as SecFilter
 from stocktracer.collector.sec import ReportDate
 from stocktracer.collector.sec import Results as SecResults
@@ -137,6 +138,78 @@ AAPL,FakeAttributeTag,2022,Q1,2023-01-31,shares,200.0,2022-12-31,Apple Inc."""
             == 2000
         )
 
+    def test_compact_layout(self):
+        csv_data = """ticker,tag,fy,fp,ddate,uom,value,period,title
+AAPL,EntityCommonStockSharesOutstanding,2022,Q1,2023-01-31,shares,2000.0,2022-12-31,Apple Inc.
+AAPL,FakeAttributeTag,2022,Q1,2023-01-31,shares,200.0,2022-12-31,Apple Inc.
+MSFT,FakeAttributeTag,2022,Q1,2023-01-31,shares,100.0,2022-12-31,Microsoft"""
+        df = pd.read_csv(StringIO(csv_data))
+        results = SecResults(df, value_dtype="float32")
+
+        assert "title" not in results.filtered_data
+        assert results.titles is not None
+        assert results.titles.to_dict() == {"AAPL": "Apple Inc.", "MSFT": "Microsoft"}
+        index = results.filtered_data.index
+        assert isinstance(
+            index.levels[index.names.index("ticker")], pd.CategoricalIndex
+        )
+        assert index.levels[index.names.index("fy")].dtype == np.int16
+        assert results.filtered_data["uom"].dtype == "category"
+        assert results.filtered_data["value"].dtype == np.float32
+        assert "titles" in results.memory_usage()
+
+        table = results.select()
+        assert table.get_value("msft", "FakeAttributeTag", 2022) == 100
+
+    @staticmethod
+    def _random_results(rows: int) -> SecResults:
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame(
+            {
+                "ticker": rng.choice(
+                    [f"T{index}" for index in range(rows // 25)], rows
+                ),
+                "tag": pd.Categorical(rng.choice(["Assets", "EPS", "Sales"], rows)),
+                "fy": rng.choice([2020.0, 2021.0, 2022.0], rows),
+                "fp": "FY",
+                "value": rng.normal(size=rows) * 1000,
+            }
+        )
+        data.loc[rng.choice(rows, rows // 100), "value"] = np.nan
+        return SecResults(data)
+
+    @pytest.mark.filterwarnings("ignore")
+    def test_select_slope(self):
+        results = self._random_results(5000)
+        expected = pd.pivot_table(
+            results.filtered_data,
+            values="value",
+            columns="tag",
+            index=["ticker", "fy"],
+            aggfunc=slope,
+            observed=True,
+        )
+        pd.testing.assert_frame_equal(results.select("slope").data, expected)
+
+        # Single values have no trend and missing values leave the trend undefined
+        data = pd.DataFrame(
+            {
+                "ticker": ["AAPL", "AAPL", "AAPL", "MSFT", "MSFT", "IBM"],
+                "tag": ["EPS", "EPS", "EPS", "EPS", "EPS", "EPS"],
+                "fy": [2022.0] * 6,
+                "fp": "FY",
+                "value": [1.0, 3.0, 5.0, 1.0, np.nan, 4.0],
+            }
+        )
+        table = SecResults(data).select("slope")
+        assert table.get_value("aapl", "EPS", 2022) == pytest.approx(2)
+        assert table.get_value("ibm", "EPS", 2022) == 0
+        assert "MSFT" not in table.data.index.get_level_values("ticker")
+
+    def test_benchmark_select_slope(self, benchmark):
+        results = self._random_results(100000)
+        benchmark.pedantic(results.select, args=("slope",), rounds=3)
+
     def test_slice(self):
         data = pd.DataFrame(
             data={
@@ -0,0 +1,78 @@
+import io
+import logging
+
+import stocktracer.filter as Filter
+from stocktracer.collector.index import NumTextIndex
+from stocktracer.collector.sec import DataSetReader
+from tests.fixtures.unit import (
+    data_txt_sample,
+    fake_data_txt_sample,
+    fake_sub_txt_sample,
+    filter_aapl,
+    sub_txt_sample,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def test_build(fake_sub_txt_sample: str, fake_data_txt_sample: str):
+    index = NumTextIndex.build(
+        io.BytesIO(fake_data_txt_sample.encode()),
+        io.BytesIO(fake_sub_txt_sample.encode()),
+    )
+    logger.debug(f"\n{index.blocks}")
+    assert index.size == len(fake_data_txt_sample.encode())
+    assert "0000320193-23-000006" in index.blocks["adsh"].values
+    assert (index.blocks.dropna()["cik"] == 320193).all()
+
+    # Each submission appears in two separate blocks
+    assert len(index.ranges(["0000320193-23-000006"])) == 2
+    assert len(index.ranges(["missing"])) == 0
+
+
+def test_extract(
+    filter_aapl: Filter.Selectors, sub_txt_sample: str, data_txt_sample: str
+):
+    num = data_txt_sample.encode()
+    index = NumTextIndex.build(io.BytesIO(num))
+    sub_df = DataSetReader._process_sub_text(
+        io.StringIO(sub_txt_sample), filter_aapl.sec_filter, frozenset({320193})
+    )
+    assert sub_df is not None
+
+    extracted = index.extract(
+        io.BytesIO(num), sub_df.index.unique(level="adsh"), max_fraction=1.0
+    )
+    assert extracted is not None
+    contents = extracted.getvalue()
+    assert b"0000320193-23-000006" in contents
+    assert b"0000723125-23-000022" not in contents
+
+    expected = DataSetReader._process_num_text(
+        io.StringIO(data_txt_sample), filter_aapl.sec_filter, sub_df
+    )
+    result = DataSetReader._process_num_text(extracted, filter_aapl.sec_filter, sub_df)
+    assert result is not None and expected is not None
+    assert result.equals(expected)
+
+    # Reading most of the file through the index does not pay off
+    assert (
+        index.extract(io.BytesIO(num), sub_df.index.unique(level="adsh"), 0.1) is None
+    )
+
+
+def test_partition(fake_data_txt_sample: str):
+    num = fake_data_txt_sample.encode()
+    index = NumTextIndex.build(io.BytesIO(num))
+    adshs = index.blocks["adsh"].unique()
+
+    parts = index.partition(adshs, 4)
+    assert len(parts) == 4
+    ranges = [r for part in parts for r in part]
+    assert ranges == sorted(ranges)
+    # Every part starts at the beginning of a line and nothing is lost
+    assert all(num[start - 1 : start] == b"\n" for start, _ in ranges)
+    assert sum(stop - start for start, stop in ranges) == len(num) - len(index.header)
+
+    assert len(index.partition(adshs, 4, min_size=len(num))) == 1
+    assert index.partition(["missing"], 4) == []
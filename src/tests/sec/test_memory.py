@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+from stocktracer.collector import memory
+
+GIB = 1024**3
+
+requires_proc = pytest.mark.skipif(
+    not Path("/proc/self/statm").exists(), reason="memory is measured through /proc"
+)
+
+
+def test_cgroup_limit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    limit = tmp_path / "memory.max"
+    monkeypatch.setattr(memory, "_CGROUP_LIMITS", (tmp_path / "missing", limit))
+    assert memory.cgroup_limit() is None
+
+    limit.write_text("max\n")
+    assert memory.cgroup_limit() is None
+
+    limit.write_text(f"{GIB}\n")
+    assert memory.cgroup_limit() == GIB
+    monkeypatch.delenv("STOCKTRACER_MEMORY_BUDGET", raising=False)
+    assert memory.default_limit() == int(GIB * memory.CGROUP_SHARE)
+
+    monkeypatch.setenv("STOCKTRACER_MEMORY_BUDGET", "2GiB")
+    assert memory.default_limit() == 2 * GIB
+
+
+@requires_proc
+def test_resident_memory():
+    assert memory.resident_memory(os.getpid()) > 0
+    assert memory.resident_memory(2**22 + 1) == 0
+
+
+def test_workers_and_chunk_size():
+    budget = memory.MemoryBudget(4 * GIB, worker_memory=GIB)
+    assert budget.workers(16, parent=GIB) == 3
+    assert budget.workers(2, parent=GIB) == 2
+    # At least one worker runs, however small the budget
+    assert budget.workers(16, parent=8 * GIB) == 1
+
+    assert budget.chunk_size(1) == memory.MAX_CHUNK_SIZE
+    assert memory.MIN_CHUNK_SIZE < budget.chunk_size(64) < memory.MAX_CHUNK_SIZE
+    assert memory.MemoryBudget(GIB).chunk_size(1024) == memory.MIN_CHUNK_SIZE
+    assert memory.MemoryBudget(None).chunk_size(1024) == memory.MAX_CHUNK_SIZE
+
+
+@requires_proc
+def test_throttle(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(memory, "POLL_INTERVAL", 0.01)
+    budget = memory.MemoryBudget(1)
+    # Without pending work, nothing is held back
+    assert budget.throttle([], []) == 0
+    assert memory.MemoryBudget(None).throttle([], [Future()]) == 0
+
+    pending: Future = Future()
+    timer = threading.Timer(0.1, pending.set_result, [None])
+    timer.start()
+    started = time.monotonic()
+    assert budget.throttle([os.getpid()], [pending]) > 0
+    assert pending.done()
+    assert time.monotonic() - started >= 0.05
+    timer.join()
+
+
+def test_configure(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(memory, "budget", memory.MemoryBudget(None))
+    memory.configure("4GB")
+    assert memory.budget.limit == 4 * 10**9
+    memory.configure(None)
+    assert memory.budget.limit is None
@@ -0,0 +1,63 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from stocktracer.collector import memory
+from stocktracer.collector.pool import WorkerPool
+
+
+def test_reused_across_calls():
+    pool = WorkerPool(max_workers=2)
+    try:
+        workers = pool.warm()
+        assert len(workers) == 2
+        assert os.getpid() not in workers
+
+        # The same workers serve every call
+        for _ in range(3):
+            assert {pool.submit(os.getpid).result() for _ in range(4)} <= workers
+    finally:
+        pool.shutdown()
+
+
+def test_restarts_after_shutdown():
+    pool = WorkerPool(max_workers=1)
+    first = pool.warm()
+    pool.shutdown()
+    try:
+        assert pool.submit(abs, -2).result() == 2
+        assert pool.warm() != first
+    finally:
+        pool.shutdown()
+
+
+def test_sized_by_memory_budget(monkeypatch):
+    monkeypatch.setattr(memory, "budget", memory.MemoryBudget(None))
+    assert WorkerPool().max_workers == (os.cpu_count() or 1)
+
+    worker = memory.WORKER_MEMORY
+    monkeypatch.setattr(memory, "budget", memory.MemoryBudget(worker, worker // 2))
+    pool = WorkerPool()
+    assert pool.max_workers == 1
+    assert not pool.pids()
+    try:
+        assert pool.warm() == set(pool.pids())
+    finally:
+        pool.shutdown()
+
+
+def test_restarts_when_broken():
+    pool = WorkerPool(max_workers=1)
+    try:
+        (worker,) = pool.warm()
+        assert pool.max_workers == 1
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os.kill, worker, signal.SIGKILL).result()
+
+        # The broken pool is replaced by new workers
+        assert pool.submit(abs, -2).result() == 2
+        assert worker not in pool.warm()
+    finally:
+        pool.shutdown()
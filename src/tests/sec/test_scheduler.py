@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from stocktracer import cache
+from stocktracer.collector.archive import ArchiveStore
+from stocktracer.collector.scheduler import DownloadScheduler, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+archives = {
+    f"/{year}q{quarter}.zip": bytes([quarter]) * 5000
+    for year in (2022, 2023)
+    for quarter in range(1, 5)
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in for the SEC website that supports range requests."""
+
+    ranges: list[str] = []
+    requests: list[str] = []
+    etag = '"v1"'
+
+    def do_GET(self):
+        StandInHandler.requests.append(self.path)
+        content = archives.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        requested_range = self.headers.get("Range")
+        if requested_range and self.headers.get("If-Range") == StandInHandler.etag:
+            StandInHandler.ranges.append(requested_range)
+            start = int(requested_range.removeprefix("bytes=").split("-")[0])
+            self.send_response(206)
+            content = content[start:]
+        else:
+            self.send_response(200)
+        self.send_header("ETag", StandInHandler.etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ArchiveStore:
+    store = ArchiveStore(tmp_path, expire_after=timedelta(days=1))
+    monkeypatch.setattr(cache, "sec_archives", store)
+    return store
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(requests_per_second=100)
+    start = time.monotonic()
+    for _ in range(11):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.1
+
+    with pytest.raises(ValueError):
+        RateLimiter(requests_per_second=0)
+
+
+def test_fetch_all(server: str, store: ArchiveStore):
+    scheduler = DownloadScheduler(max_workers=4, requests_per_second=1000)
+    urls = [server + name for name in archives]
+    fetched = dict(scheduler.fetch_all(urls))
+    assert set(fetched) == set(urls)
+    for name, content in archives.items():
+        path = fetched[server + name]
+        assert path is not None
+        assert path.read_bytes() == content
+
+    # Everything is served from the cache now
+    assert scheduler.fetch(server + "/missing.zip") is None
+    assert store.get(server + "/2023q1.zip") is not None
+
+
+def test_resume(server: str, store: ArchiveStore):
+    url = server + "/2023q2.zip"
+    partial = store.partial_path(url)
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(archives["/2023q2.zip"][:1000])
+    store.validator_path(url).write_text('"v1"', "utf8")
+
+    StandInHandler.ranges.clear()
+    path = DownloadScheduler(requests_per_second=1000).fetch(url)
+    assert StandInHandler.ranges == ["bytes=1000-"]
+    assert path is not None
+    assert path.read_bytes() == archives["/2023q2.zip"]
+    assert not partial.exists()
+    assert not store.validator_path(url).exists()
+
+
+@pytest.mark.parametrize("validator", ['"v0"', None])
+def test_restart_changed_archive(
+    server: str, store: ArchiveStore, validator: Optional[str]
+):
+    url = server + "/2023q3.zip"
+    partial = store.partial_path(url)
+    partial.parent.mkdir(parents=True)
+    # Bytes of a previous version of the archive
+    partial.write_bytes(b"x" * 1000)
+    if validator is not None:
+        store.validator_path(url).write_text(validator, "utf8")
+
+    StandInHandler.ranges.clear()
+    path = DownloadScheduler(requests_per_second=1000).fetch(url)
+    assert not StandInHandler.ranges
+    assert path is not None
+    assert path.read_bytes() == archives["/2023q3.zip"]
+
+
+def test_concurrent_fetches(server: str, store: ArchiveStore):
+    url = server + "/2022q4.zip"
+    scheduler = DownloadScheduler(requests_per_second=1000)
+    StandInHandler.requests.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        paths = list(executor.map(lambda _: scheduler.fetch(url), range(4)))
+
+    # The archive is downloaded once and the other fetches wait for it
+    assert StandInHandler.requests == ["/2022q4.zip"]
+    assert len(set(paths)) == 1
+    assert paths[0].read_bytes() == archives["/2022q4.zip"]
@@ -0,0 +1,43 @@
+import io
+
+import pandas as pd
+import pytest
+
+from stocktracer.collector.schema import NUM_SCHEMA
+
+num_txt = (
+    "adsh\ttag\tversion\tcoreg\tddate\tqtrs\tuom\tvalue\tfootnote\n"
+    "0001\tAssets\tus-gaap/2022\t\t20221231\t0\tUSD\t100.0\t\n"
+    "0001\tRevenues\tus-gaap/2022\t\t20211231\t4\tUSD\t\t\n"
+    "0002\tAssets\tus-gaap/2022\t\t20230331\t0\tUSD\t5\t\n"
+)
+
+
+@pytest.mark.parametrize(
+    "parse_mode",
+    ["infer", "schema", "pyarrow"],
+)
+def test_read_num(parse_mode):
+    if parse_mode == "pyarrow":
+        pytest.importorskip("pyarrow")
+    chunks = list(NUM_SCHEMA.read(io.StringIO(num_txt), parse_mode, chunksize=2))
+    data = pd.concat(chunks)
+    assert list(data.index.names) == ["adsh", "tag"]
+    assert list(data.index.get_level_values("tag")) == ["Assets", "Revenues", "Assets"]
+    assert list(data["ddate"].dt.strftime("%Y%m%d")) == [
+        "20221231",
+        "20211231",
+        "20230331",
+    ]
+    assert data["value"].dtype == "float64"
+    assert data["value"].isna().tolist() == [False, True, False]
+    if parse_mode == "pyarrow":
+        assert len(chunks) == 1
+
+
+def test_read_num_falls_back_on_short_rows(caplog):
+    pytest.importorskip("pyarrow")
+    short = num_txt.replace("\t\n", "\n")
+    data = pd.concat(NUM_SCHEMA.read(io.StringIO(short), "pyarrow", chunksize=2))
+    assert len(data) == 3
+    assert "falling back" in caplog.text
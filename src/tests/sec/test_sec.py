@@ -1,6 +1,8 @@
 import logging
 import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
 
 import mock
@@ -11,6 +13,8 @@ import pytest
 import stocktracer.collector.sec
 import stocktracer.filter as Filter
 from stocktracer import cache
+from stocktracer.collector import batch
+from stocktracer.collector.batch import shared_extraction
 from stocktracer.collector.sec import DataSetReader, DownloadManager
 from stocktracer.collector.sec import Filter as SecFilter
 from stocktracer.collector.sec import (
@@ -19,6 +23,7 @@ from stocktracer.collector.sec import (
     TickerReader,
     filter_data,
     filter_data_nocache,
+    report_code,
 )
 from tests.fixtures.unit import (
     data_txt_sample,
@@ -93,6 +98,255 @@ def test_caching_tickers(monkeypatch: pytest.MonkeyPatch):
     assert 0 == hits
 
 
+@mock.patch(
+    "stocktracer.collector.sec.filter_data_nocache",
+    return_value=Results(pd.DataFrame()),
+)
+def test_caching_hot(nocache: mock.MagicMock, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(cache, "hot", cache.HotCache(size_limit=10**6))
+    cache.results.evict(tag="sec")
+    cache.results.stats(enable=True, reset=True)
+
+    first = filter_data(tickers=["test"], sec_filter=SecFilter(years=1))
+    second = filter_data(tickers=["test"], sec_filter=SecFilter(years=1))
+    hits, misses = cache.results.stats(enable=False, reset=True)
+    # The second request is answered from memory without reading the disk
+    assert second is first
+    assert 1 == misses
+    assert 0 == hits
+    nocache.assert_called_once()
+    assert len(cache.hot) == 1
+
+
+TICKERS_JSON = """{"0":{"cik_str":320193,"ticker":"AAPL","title":"Apple Inc."},
+"1":{"cik_str":1652044,"ticker":"GOOGL","title":"Alphabet Inc."},
+"2":{"cik_str":1652044,"ticker":"GOOG","title":"Alphabet Inc."},
+"3":{"cik_str":789019,"ticker":"MSFT","title":"MICROSOFT CORP"}}"""
+
+
+def test_ticker_reader():
+    ticker_reader = TickerReader(TICKERS_JSON)
+    assert ticker_reader.convert_to_cik("aapl") == 320193
+    assert ticker_reader.convert_to_cik("GOOG") == 1652044
+    assert ticker_reader.convert_to_ticker(1652044) == "GOOGL"
+    assert list(ticker_reader.convert_to_ciks(["msft", "GOOG", "aapl"])) == [
+        789019,
+        1652044,
+        320193,
+    ]
+    assert ticker_reader.convert_to_tickers([789019, 320193]) == ["MSFT", "AAPL"]
+    assert ticker_reader.get_ciks(frozenset({"aapl", "goog", "googl"})) == {
+        320193,
+        1652044,
+    }
+    assert ticker_reader.contains(frozenset({"aapl", "msft"}))
+    with pytest.raises(LookupError, match="unable to find ticker: invalid"):
+        ticker_reader.contains(frozenset(("aapl", "invalid")))
+    with pytest.raises(LookupError, match="unable to find cik: 1"):
+        ticker_reader.convert_to_ticker(1)
+
+
+def test_shared_extraction(monkeypatch: pytest.MonkeyPatch):
+    ticker_reader = TickerReader(TICKERS_JSON)
+    monkeypatch.setattr(
+        stocktracer.collector.sec,
+        "download_manager",
+        mock.Mock(ticker_reader=ticker_reader),
+    )
+    records = pd.DataFrame(
+        {
+            "ticker": ["AAPL", "AAPL", "MSFT", "MSFT", "MSFT"],
+            "tag": ["EPS", "Assets", "EPS", "Assets", "Assets"],
+            "fy": [2022, 2022, 2022, 2022, 2018],
+            "fp": ["FY", "FY", "FY", "Q1", "FY"],
+            "value": [1.0, 2.0, 3.0, 4.0, 5.0],
+            "title": ["Apple Inc."] * 2 + ["MICROSOFT CORP"] * 3,
+        }
+    )
+    get_data = mock.Mock(return_value=Results(records))
+    monkeypatch.setattr(
+        stocktracer.collector.sec.DataSetCollector, "get_data", get_data
+    )
+    cache.results.evict(tag="sec")
+
+    last_report = ReportDate(2023, 1)
+    eps = SecFilter(years=1, tags=["EPS"], last_report=last_report)
+    assets = SecFilter(
+        years=2, tags=["Assets"], last_report=last_report, only_annual=False
+    )
+    with shared_extraction([(["aapl"], eps), (["msft"], assets)]) as extractions:
+        apple = filter_data(tickers=["aapl"], sec_filter=eps)
+        microsoft = filter_data(tickers=["msft"], sec_filter=assets)
+
+        # Other threads, such as other requests to the daemon, don't share it
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            shared = executor.submit(batch._shared_extractions.get)
+            assert shared.result() == ()
+        assert batch._shared_extractions.get() == tuple(extractions)
+
+    # Both requests were answered by a single extraction covering them
+    get_data.assert_called_once()
+    sec_filter, ciks = get_data.call_args.args
+    assert ciks == {320193, 789019}
+    assert sec_filter == SecFilter(
+        years=2, tags=["Assets", "EPS"], last_report=last_report, only_annual=False
+    )
+    assert apple.filtered_data.index.tolist() == [("AAPL", "EPS", 2022, "FY")]
+    assert microsoft.filtered_data["value"].tolist() == [4.0]
+    assert apple.titles.to_dict() == {"AAPL": "Apple Inc."}
+
+    # Outside of the context, requests that are not cached are extracted on their own
+    filter_data(tickers=["msft"], sec_filter=replace(eps, years=3))
+    assert get_data.call_count == 2
+    cache.results.evict(tag="sec")
+
+
+def test_cache_subsumption(monkeypatch: pytest.MonkeyPatch):
+    ticker_reader = TickerReader(TICKERS_JSON)
+    monkeypatch.setattr(
+        stocktracer.collector.sec,
+        "download_manager",
+        mock.Mock(ticker_reader=ticker_reader),
+    )
+    records = pd.DataFrame(
+        {
+            "ticker": ["AAPL", "AAPL", "MSFT", "MSFT"],
+            "tag": ["EPS", "Assets", "EPS", "EPS"],
+            "fy": [2022, 2022, 2022, 2019],
+            "fp": ["FY", "FY", "FY", "FY"],
+            "value": [1.0, 2.0, 3.0, 4.0],
+            "title": ["Apple Inc."] * 2 + ["MICROSOFT CORP"] * 2,
+        }
+    )
+    get_data = mock.Mock(return_value=Results(records))
+    monkeypatch.setattr(
+        stocktracer.collector.sec.DataSetCollector, "get_data", get_data
+    )
+    cache.results.evict(tag="sec")
+
+    last_report = ReportDate(2023, 1)
+    wide = SecFilter(years=5, tags=["EPS", "Assets"], last_report=last_report)
+    filter_data(tickers=["msft", "aapl"], sec_filter=wide)
+    assert get_data.call_count == 1
+
+    # The order of the tickers and tags doesn't matter
+    assert filter_data.__cache_key__(["msft", "aapl"], wide) == (
+        filter_data.__cache_key__(
+            ["aapl", "msft"], replace(wide, tags=["Assets", "EPS"])
+        )
+    )
+    filter_data(
+        tickers=["aapl", "msft"], sec_filter=replace(wide, tags=["Assets", "EPS"])
+    )
+    assert get_data.call_count == 1
+
+    # Narrower requests are sliced out of the cached extraction
+    narrow = SecFilter(years=2, tags=["EPS"], last_report=last_report)
+    microsoft = filter_data(tickers=["msft"], sec_filter=narrow)
+    assert get_data.call_count == 1
+    assert microsoft.filtered_data.index.tolist() == [("MSFT", "EPS", 2022, "FY")]
+    assert microsoft.titles.to_dict() == {"MSFT": "MICROSOFT CORP"}
+
+    # Requests that are not covered are extracted
+    filter_data(tickers=["msft", "googl"], sec_filter=narrow)
+    filter_data(tickers=["msft"], sec_filter=replace(narrow, only_annual=False))
+    filter_data(tickers=["msft"], sec_filter=replace(narrow, tags=None))
+    assert get_data.call_count == 4
+    cache.results.evict(tag="sec")
+
+
+def test_subsumed_equals_extracted(monkeypatch: pytest.MonkeyPatch):
+    ticker_reader = TickerReader(TICKERS_JSON)
+    monkeypatch.setattr(
+        stocktracer.collector.sec,
+        "download_manager",
+        mock.Mock(ticker_reader=ticker_reader),
+    )
+    last_report = ReportDate(2023, 1)
+    records = pd.DataFrame(
+        {
+            "cik": [1652044, 1652044, 789019, 789019, 789019],
+            "report": [
+                report_code(report)
+                for report in [
+                    last_report,
+                    ReportDate(2022, 2),
+                    last_report,
+                    # Filed before the narrow window, for a recent fiscal year
+                    ReportDate(2021, 4),
+                    ReportDate(2021, 1),
+                ]
+            ],
+            "tag": ["EPS", "Assets", "EPS", "EPS", "EPS"],
+            "fy": [2022, 2022, 2022, 2022, 2020],
+            "fp": ["FY"] * 5,
+            "value": [1.0, 2.0, 3.0, 4.0, 5.0],
+        }
+    )
+
+    def extract(sec_filter: SecFilter, ciks: frozenset[int]) -> Results:
+        reports = [report_code(report) for report in sec_filter.required_reports]
+        rows = records[
+            records["cik"].isin(ciks)
+            & records["report"].isin(reports)
+            & records["fp"].isin(sec_filter.focus_period)
+            & (records["fy"] >= sec_filter.oldest_fy)
+            & records["tag"].isin(sec_filter.tags or records["tag"])
+        ].merge(
+            ticker_reader.map_of_cik_to_ticker[["cik_str", "ticker"]],
+            left_on="cik",
+            right_on="cik_str",
+        )
+        return Results(
+            rows.drop(columns=["cik", "cik_str", "report"]),
+            titles=ticker_reader.get_titles(rows["ticker"].unique()),
+            reports=rows["report"].to_numpy(np.int16),
+        )
+
+    get_data = mock.Mock(side_effect=extract)
+    monkeypatch.setattr(
+        stocktracer.collector.sec.DataSetCollector, "get_data", get_data
+    )
+    cache.results.evict(tag="sec")
+
+    wide = SecFilter(years=3, tags=None, last_report=last_report)
+    filter_data(tickers=["goog", "msft"], sec_filter=wide)
+    narrow = SecFilter(years=1, tags=["EPS"], last_report=last_report)
+    for tickers in (["goog"], ["googl"], ["msft"]):
+        extractions = get_data.call_count
+        subsumed = filter_data(tickers=tickers, sec_filter=narrow)
+        assert get_data.call_count == extractions
+        extracted = filter_data_nocache(frozenset(tickers), narrow)
+        pd.testing.assert_frame_equal(subsumed.filtered_data, extracted.filtered_data)
+        pd.testing.assert_series_equal(subsumed.titles, extracted.titles)
+        np.testing.assert_array_equal(subsumed.reports, extracted.reports)
+
+    # Every ticker of the company is kept, as when it's extracted
+    google = filter_data(tickers=["goog"], sec_filter=narrow)
+    assert set(google.filtered_data.index.unique(level="ticker")) == {"GOOG", "GOOGL"}
+    microsoft = filter_data(tickers=["msft"], sec_filter=narrow)
+    assert microsoft.filtered_data["value"].tolist() == [3.0]
+    cache.results.evict(tag="sec")
+
+
+def test_ticker_reader_is_reused(monkeypatch: pytest.MonkeyPatch):
+    response = mock.Mock(
+        status_code=200, from_cache=True, content=TICKERS_JSON.encode()
+    )
+    monkeypatch.setattr(
+        cache, "sec_tickers", mock.Mock(get=mock.Mock(return_value=response))
+    )
+    download_manager = DownloadManager()
+
+    ticker_reader = download_manager.ticker_reader
+    assert download_manager.ticker_reader is ticker_reader
+
+    # A new version of the file is parsed again
+    response.content = TICKERS_JSON.replace("MSFT", "MSFT2").encode()
+    assert download_manager.ticker_reader is not ticker_reader
+    assert download_manager.ticker_reader.convert_to_ticker(789019) == "MSFT2"
+
+
 # fake_download_manager = mock.MagicMock(DownloadManager)
 
 
@@ -0,0 +1,91 @@
+import errno
+from concurrent.futures import Future
+
+import pandas as pd
+import pytest
+
+from stocktracer.collector.shared import SharedFrame, combine, discard, share, sweep
+
+pa = pytest.importorskip("pyarrow")
+
+
+def create_frame(adsh: str, tags: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "adsh": adsh,
+            "tag": tags,
+            "cik": 320193,
+            "ddate": pd.Timestamp("2023-01-31"),
+            "uom": pd.Categorical(["USD"] * len(tags)),
+            "value": range(len(tags)),
+        }
+    ).set_index(["adsh", "tag", "cik"])
+
+
+def test_share_and_load(tmp_path):
+    data = create_frame("0001", ["A", "B"])
+    shared = SharedFrame.share(data, tmp_path)
+    assert len(shared) == 2
+    assert shared.path.exists()
+    pd.testing.assert_frame_equal(shared.load(), data)
+
+    shared.release()
+    assert not shared.path.exists()
+
+
+def test_share_when_full(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    def new_file(sink, schema):
+        sink.write(b"partial")
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(pa.ipc, "new_file", new_file)
+    data = create_frame("0001", ["A", "B"])
+    # The result is pickled back instead, and the partial file is removed
+    assert share(data, tmp_path) is data
+    assert not list(tmp_path.iterdir())
+
+
+def test_combine():
+    frames = [create_frame("0001", ["A", "B"]), create_frame("0002", ["C"])]
+    pieces = [share(frame) for frame in frames]
+    assert all(isinstance(piece, SharedFrame) for piece in pieces)
+
+    result = combine(pieces)
+    assert result is not None
+    expected = pd.concat(frames)
+    pd.testing.assert_frame_equal(result, expected)
+    assert not any(piece.path.exists() for piece in pieces)
+
+
+def test_combine_mixed():
+    frames = [create_frame("0001", ["A", "B"]), create_frame("0002", ["C"])]
+    piece = SharedFrame.share(frames[0])
+    result = combine([piece, frames[1]])
+    assert result is not None
+    assert list(result["value"]) == [0, 1, 0]
+    assert not piece.path.exists()
+    assert share(None) is None
+    assert combine([]) is None
+
+
+def test_discard(tmp_path):
+    finished, running, pending = Future(), Future(), Future()
+    finished.set_result(SharedFrame.share(create_frame("0001", ["A"]), tmp_path))
+    running.set_running_or_notify_cancel()
+    discard([finished, running, pending])
+    assert not finished.result().path.exists()
+    assert pending.cancelled()
+
+    # Results of work that was already running are released when it finishes
+    shared = SharedFrame.share(create_frame("0002", ["B"]), tmp_path)
+    running.set_result(shared)
+    assert not shared.path.exists()
+
+
+def test_sweep(tmp_path):
+    live = SharedFrame.share(create_frame("0001", ["A"]), tmp_path)
+    # A pid that can't be running, as it's above the kernel's limit
+    dead = tmp_path / "stocktracer-99999999-0.arrow"
+    dead.write_bytes(b"")
+    assert sweep(tmp_path) == [dead]
+    assert live.path.exists()
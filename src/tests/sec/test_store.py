@@ -0,0 +1,98 @@
+import io
+import logging
+from pathlib import Path
+
+import pytest
+
+import stocktracer.filter as Filter
+from stocktracer.collector.dates import ReportDate
+from stocktracer.collector.sec import DataSetReader
+from stocktracer.collector.store import ColumnarStore
+from tests.fixtures.unit import fake_data_txt_sample, fake_sub_txt_sample, filter_aapl
+
+logger = logging.getLogger(__name__)
+
+pytest.importorskip("pyarrow")
+
+
+def test_ingest_and_scan(
+    tmp_path: Path,
+    filter_aapl: Filter.Selectors,
+    fake_sub_txt_sample: str,
+    fake_data_txt_sample: str,
+):
+    store = ColumnarStore(tmp_path)
+    assert not store.contains("2023q1")
+    store.ingest(
+        "2023q1",
+        io.StringIO(fake_sub_txt_sample),
+        io.StringIO(fake_data_txt_sample),
+    )
+    assert store.contains("2023q1")
+
+    sec_filter = filter_aapl.sec_filter
+    scanned = store.scan(
+        "2023q1",
+        ciks=[320193],
+        focus_periods=sec_filter.focus_period,
+        oldest_fy=sec_filter.last_report.year - sec_filter.years,
+        tags=sec_filter.tags,
+    )
+    assert scanned is not None
+    logger.debug(f"scanned:\n{scanned}")
+
+    sub_df = DataSetReader._process_sub_text(
+        io.StringIO(fake_sub_txt_sample), sec_filter, frozenset({320193})
+    )
+    expected = DataSetReader._process_num_text(
+        io.StringIO(fake_data_txt_sample), sec_filter, sub_df
+    )
+    assert expected is not None
+    assert list(scanned.index.names) == list(expected.index.names)
+    assert list(scanned.columns) == list(expected.columns)
+    assert sorted(scanned["value"]) == sorted(expected["value"])
+
+
+def test_scan_no_match(tmp_path: Path, fake_sub_txt_sample, fake_data_txt_sample):
+    store = ColumnarStore(tmp_path)
+    store.ingest(
+        "2023q1",
+        io.StringIO(fake_sub_txt_sample),
+        io.StringIO(fake_data_txt_sample),
+    )
+    assert (
+        store.scan("2023q1", ciks=[1], focus_periods=["FY", "Q1"], oldest_fy=2000)
+        is None
+    )
+    assert (
+        store.scan(
+            "2023q1",
+            ciks=[320193],
+            focus_periods=["Q1"],
+            oldest_fy=2000,
+            tags=["NotATag"],
+        )
+        is None
+    )
+
+
+def test_trim_and_prune(tmp_path: Path, fake_sub_txt_sample, fake_data_txt_sample):
+    stale = tmp_path / "v0-stale" / "2023q1.parquet"
+    stale.parent.mkdir()
+    stale.write_bytes(b"0")
+
+    store = ColumnarStore(tmp_path, size_limit=1)
+    for quarter in ("2022q4", "2023q1"):
+        store.ingest(
+            quarter,
+            io.StringIO(fake_sub_txt_sample),
+            io.StringIO(fake_data_txt_sample),
+        )
+    # Only the quarter that was just stored fits
+    assert not stale.exists()
+    assert not store.contains("2022q4")
+    assert store.contains("2023q1")
+
+    stale.parent.mkdir(exist_ok=True)
+    assert store.prune(ReportDate(2023, 2)) == [stale.parent, store.path("2023q1")]
+    assert not stale.parent.exists()
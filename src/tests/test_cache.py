@@ -0,0 +1,27 @@
+from stocktracer import cache
+
+
+def test_hot_cache():
+    hot = cache.HotCache(size_limit=100)
+    hot.set(("a",), "a", 40)
+    hot.set(("b",), "b", 40)
+    assert hot.get(("a",)) == "a"
+
+    # The least recently used value is dropped to make room
+    hot.set(("c",), "c", 40)
+    assert hot.get(("b",)) is None
+    assert hot.get(("a",)) == "a"
+    assert hot.get(("c",)) == "c"
+    assert hot.size == 80
+
+    # Values larger than the limit are never kept
+    hot.set(("d",), "d", 200)
+    assert hot.get(("d",)) is None
+    assert len(hot) == 2
+
+
+def test_keep_hot(monkeypatch):
+    monkeypatch.setattr(cache, "hot", None)
+    monkeypatch.setenv("STOCKTRACER_HOT_SIZE_LIMIT", "2MB")
+    cache.keep_hot()
+    assert cache.hot.size_limit == 2 * 10**6
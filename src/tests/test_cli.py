@@ -1,4 +1,5 @@
 import io
+import json
 
 import beartype.roar
 import mock
@@ -7,7 +8,10 @@ import pytest
 
 import stocktracer.collector.sec as Sec
 import stocktracer.filter as Filter
-from stocktracer.cli import Cli
+from stocktracer import cache
+from stocktracer.analysis import diluted_eps, f_score
+from stocktracer.cli import Cli, _companies
+from stocktracer.collector import batch
 from stocktracer.collector.sec import DownloadManager
 
 
@@ -27,3 +31,140 @@ def test_generate():
 
     with pytest.raises(beartype.roar.BeartypeCallHintParamViolation):
         Cli._generate_report("invalid", None, data_frame)
+
+
+TICKERS = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "2": {"cik_str": 1045810, "ticker": "NVDA", "title": "NVIDIA CORP"},
+    "3": {"cik_str": 1652044, "ticker": "GOOGL", "title": "Alphabet Inc."},
+    "4": {"cik_str": 1652044, "ticker": "GOOG", "title": "Alphabet Inc."},
+}
+
+
+@pytest.fixture
+def ticker_reader(monkeypatch: pytest.MonkeyPatch) -> Sec.TickerReader:
+    reader = Sec.TickerReader(json.dumps(TICKERS))
+    monkeypatch.setattr(Sec, "download_manager", mock.Mock(ticker_reader=reader))
+    return reader
+
+
+def test_analyze_batch(
+    monkeypatch: pytest.MonkeyPatch, ticker_reader: Sec.TickerReader
+):
+    frames = {
+        "stocktracer.analysis.diluted_eps": pd.DataFrame(
+            {"EarningsPerShareDiluted": [1.0]}, index=["AAPL"]
+        ),
+        "stocktracer.analysis.f_score": pd.DataFrame({"ROA>0": [1]}, index=["AAPL"]),
+    }
+    get_result = mock.MagicMock(
+        side_effect=lambda **kwargs: frames[kwargs["analysis_plugin"]]
+    )
+    monkeypatch.setattr(Cli, "_get_result", get_result)
+    cache.results.evict(tag="results")
+    monkeypatch.setattr(Cli, "forward", False)
+    monkeypatch.setattr(Cli, "return_results", True)
+    shared = mock.MagicMock()
+    monkeypatch.setattr(batch, "shared_extraction", shared)
+
+    with pytest.warns(UserWarning, match="under development"):
+        result = Cli().analyze(
+            ["aapl", "msft"],
+            analysis_plugin="stocktracer.analysis.diluted_eps,stocktracer.analysis.f_score",
+            final_year=2023,
+            final_quarter=1,
+        )
+
+    pd.testing.assert_frame_equal(result, pd.concat(frames, axis=1))
+    assert get_result.call_count == 2
+    # The requirements of both plugins are extracted together
+    (requests,), _ = shared.call_args
+    assert [sorted(tickers) for tickers, _ in requests] == [["aapl", "msft"]] * 2
+    assert [sec_filter.years for _, sec_filter in requests] == [
+        diluted_eps.Analysis.years_of_analysis,
+        f_score.Analysis.years_of_analysis,
+    ]
+
+
+@pytest.fixture
+def cached_results(monkeypatch: pytest.MonkeyPatch, ticker_reader: Sec.TickerReader):
+    def analyze(tickers, analysis_plugin, final_year, final_quarter):
+        # Like an extraction, every ticker of the companies is kept
+        ticker_map = ticker_reader.map_of_cik_to_ticker
+        ciks = ticker_reader.convert_to_ciks(tickers)
+        index = pd.Index(
+            ticker_map["ticker"][ticker_map["cik_str"].isin(ciks)].tolist(),
+            name="ticker",
+        )
+        return pd.DataFrame({"EarningsPerShareDiluted": 1.0}, index=index)
+
+    run = mock.MagicMock(side_effect=analyze)
+    monkeypatch.setattr(Cli, "_run", run)
+    monkeypatch.setattr(Cli, "forward", False)
+    monkeypatch.setattr(Cli, "return_results", True)
+    cache.results.evict(tag="results")
+    yield run
+    cache.results.evict(tag="results")
+
+
+def cli_analyze(tickers):
+    with pytest.warns(UserWarning, match="under development"):
+        return Cli().analyze(
+            tickers,
+            analysis_plugin="stocktracer.analysis.diluted_eps",
+            final_year=2023,
+            final_quarter=1,
+        )
+
+
+def test_results_per_ticker(cached_results: mock.MagicMock):
+    run = cached_results
+    cli_analyze(["aapl", "msft"])
+    result = cli_analyze(["aapl", "msft", "nvda"])
+    # Only the ticker without cached results is analyzed again
+    assert run.call_args.args[0] == ["nvda"]
+    assert result.index.tolist() == ["AAPL", "MSFT", "NVDA"]
+
+    cli_analyze(["MSFT", "aapl"])
+    assert run.call_count == 2
+
+
+def test_results_per_company(cached_results: mock.MagicMock):
+    run = cached_results
+    # Every ticker of a company is pulled in, whether it's cached or not
+    assert sorted(cli_analyze(["goog", "msft"]).index) == ["GOOG", "GOOGL", "MSFT"]
+    assert sorted(cli_analyze(["goog"]).index) == ["GOOG", "GOOGL"]
+    result = cli_analyze(["googl", "aapl"])
+    assert run.call_args.args[0] == ["aapl"]
+    assert sorted(result.index) == ["AAPL", "GOOG", "GOOGL"]
+    assert run.call_count == 2
+
+    # Tickers the SEC doesn't list are left to the analysis
+    assert _companies(["goog", "invalid"]) == {
+        "goog": ("GOOG", "GOOGL"),
+        "invalid": ("INVALID",),
+    }
+
+
+def test_results_partly_cached(cached_results: mock.MagicMock):
+    run = cached_results
+    cli_analyze(["aapl"])
+    run.side_effect = LookupError("No analysis results available!")
+    # The cached results are returned when the other tickers have none
+    assert cli_analyze(["aapl", "msft"]).index.tolist() == ["AAPL"]
+    with pytest.raises(LookupError, match="No analysis results"):
+        cli_analyze(["msft"])
+
+
+def test_report_format_case(monkeypatch: pytest.MonkeyPatch, capsys):
+    results = pd.DataFrame({"EarningsPerShareDiluted": [1.0]}, index=["AAPL"])
+    monkeypatch.setattr(Cli, "_get_result", mock.MagicMock(return_value=results))
+    monkeypatch.setattr(Cli, "forward", False)
+    with pytest.warns(UserWarning, match="under development"):
+        Cli().analyze(
+            "aapl",
+            analysis_plugin="stocktracer.analysis.diluted_eps",
+            report_format="CSV",
+        )
+    assert capsys.readouterr().out == results.transpose().to_csv() + "\n"
@@ -0,0 +1,44 @@
+import pickle
+
+import pandas as pd
+import pytest
+from diskcache import Cache
+
+from stocktracer import compression
+
+
+def test_compress_round_trip():
+    small = b"small"
+    assert compression.decompress(compression.compress(small)) == small
+
+    large = pickle.dumps(pd.DataFrame({"value": range(10000)}))
+    compressed = compression.compress(large)
+    assert len(compressed) < len(large)
+    assert compression.decompress(compressed) == large
+
+    with pytest.raises(ValueError, match="not compressed"):
+        compression.decompress(large)
+
+
+def test_compressed_disk(tmp_path):
+    data = pd.DataFrame({"tag": ["Assets"] * 10000, "value": range(10000)})
+    plain = Cache(tmp_path / "plain")
+    plain.set("data", data)
+    plain.set("legacy", data)
+    plain.close()
+
+    compressed = Cache(tmp_path / "plain", disk=compression.CompressedDisk)
+    compressed.set("data", data)
+    compressed.set("number", 1)
+    pd.testing.assert_frame_equal(compressed.get("data"), data)
+    assert compressed.get("number") == 1
+    # Entries stored before compression was enabled are still readable
+    pd.testing.assert_frame_equal(compressed.get("legacy"), data)
+    assert compressed.volume() < plain.volume() + len(pickle.dumps(data))
+
+
+def test_zlib_fallback_is_logged(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(compression, "HAS_ZSTANDARD", False)
+    with caplog.at_level("WARNING", logger=compression.__name__):
+        Cache(tmp_path / "cache", disk=compression.CompressedDisk).close()
+    assert "compressing the results cache with zlib" in caplog.text
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stocktracer import metrics
+from stocktracer.analysis.f_score import F_SCORE_TAGS
+from stocktracer.collector.sec import Results
+
+TAGS = [
+    "Assets",
+    "AssetsCurrent",
+    "CommonStockSharesIssued",
+    "LiabilitiesCurrent",
+    "NetCashProvidedByUsedInOperatingActivities",
+    "OperatingIncomeLoss",
+]
+
+
+def _random_table(tickers: int = 20, years: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [[f"T{ticker}" for ticker in range(tickers)], range(2019, 2019 + years)],
+        names=["ticker", "fy"],
+    )
+    data = pd.DataFrame(
+        rng.integers(-5, 10, size=(len(index), len(TAGS))).astype(float),
+        index=index,
+        columns=pd.Index(TAGS, name="tag"),
+    )
+    data.iloc[::7, 1] = np.nan
+    return data
+
+
+def test_evaluate():
+    data = _random_table(tickers=3, years=3)
+    result = metrics.evaluate(
+        data,
+        {
+            "ROA": "OperatingIncomeLoss / Assets",
+            "lag": "lag(ROA)",
+            "two-years": "delta(ROA, 2)",
+            "growing": "delta(ROA) > 0 and not `lag` < 0",
+            "capped": "min(max(ROA, -1), 1)",
+        },
+    )
+    assert list(result.columns) == ["ROA", "lag", "two-years", "growing", "capped"]
+
+    roa = data["OperatingIncomeLoss"] / data["Assets"]
+    lagged = roa.groupby("ticker").shift()
+    pd.testing.assert_series_equal(result["ROA"], roa, check_names=False)
+    pd.testing.assert_series_equal(result["lag"], lagged, check_names=False)
+    pd.testing.assert_series_equal(
+        result["two-years"], roa.groupby("ticker").diff(2), check_names=False
+    )
+    expected = ((roa.groupby("ticker").diff() > 0) & ~(lagged < 0)).astype(np.int64)
+    pd.testing.assert_series_equal(result["growing"], expected, check_names=False)
+    pd.testing.assert_series_equal(result["capped"], roa.clip(-1, 1), check_names=False)
+
+
+def test_shared_subexpressions(monkeypatch: pytest.MonkeyPatch):
+    computed = []
+    compute = metrics._Evaluator.compute
+
+    def counting(self, node, values):
+        computed.append(metrics.ast.unparse(node))
+        return compute(self, node, values)
+
+    monkeypatch.setattr(metrics._Evaluator, "compute", counting)
+    metrics.evaluate(
+        _random_table(),
+        {"a": "delta(Assets / AssetsCurrent)", "b": "Assets / AssetsCurrent > 1"},
+    )
+    assert computed.count("Assets / AssetsCurrent") == 1
+
+
+def test_shadowing_registered_metric():
+    data = _random_table()
+    result = metrics.evaluate(
+        data, {"net-income": "`net-income` * 2", "twice": "`net-income` * 2"}
+    )
+    pd.testing.assert_series_equal(
+        result["twice"], data["OperatingIncomeLoss"] * 4, check_names=False
+    )
+
+
+def test_errors():
+    data = _random_table()
+    with pytest.raises(KeyError, match="unknown tag or metric: Missing"):
+        metrics.evaluate(data, {"a": "Missing + 1"})
+    with pytest.raises(ValueError, match="depends on itself"):
+        metrics.evaluate(data, {"a": "b", "b": "a + 1"})
+    for expression in ["Assets +", "Assets % 2", "open(Assets)", "lag(Assets, 0)"]:
+        with pytest.raises(ValueError):
+            metrics.evaluate(data, {"a": expression})
+    with pytest.raises(ValueError, match="already registered"):
+        metrics.register("net-income", "Assets")
+
+
+def test_f_score_criteria():
+    data = _random_table().fillna(0)
+    scores = Results.Table(data.copy()).evaluate(F_SCORE_TAGS)
+    assert list(scores.columns) == F_SCORE_TAGS
+
+    # The criteria computed one column at a time
+    roa = data["OperatingIncomeLoss"].div(data["Assets"])
+    debt_to_assets = data["LiabilitiesCurrent"] / data["AssetsCurrent"]
+    current_ratio = data["AssetsCurrent"] / data["LiabilitiesCurrent"]
+    expected = pd.DataFrame(
+        {
+            "ROA>0": roa > 0,
+            "NetIncome>0": data["OperatingIncomeLoss"] > 0,
+            "delta-ROA>0": roa.groupby("ticker").diff() > 0,
+            "CF/Total-Assets>ROA": data["NetCashProvidedByUsedInOperatingActivities"]
+            / data["Assets"]
+            > roa,
+            "debt-to-assets<last-year": debt_to_assets.groupby("ticker").diff() < 0,
+            "current-ratio>last-year": current_ratio.groupby("ticker").diff() > 0,
+            "shares-issued==0": data["CommonStockSharesIssued"] == 0,
+        }
+    ).astype(np.int64)
+    pd.testing.assert_frame_equal(scores, expected)
+
+
+def test_calculate():
+    table = Results.Table(_random_table())
+    table.calculate_return_on_assets("ROA")
+    table.calculate_delta("delta-ROA", delta_of="ROA")
+    table.calculate_current_ratio("current-ratio")
+    data = table.data
+    pd.testing.assert_series_equal(
+        data["delta-ROA"],
+        (data["OperatingIncomeLoss"] / data["Assets"]).groupby("ticker").diff(),
+        check_names=False,
+    )
+    pd.testing.assert_series_equal(
+        data["current-ratio"],
+        data["AssetsCurrent"] / data["LiabilitiesCurrent"],
+        check_names=False,
+    )
@@ -0,0 +1,77 @@
+import gzip
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stocktracer import report
+
+
+def _results() -> pd.DataFrame:
+    index = pd.MultiIndex.from_product(
+        [["AAPL", "GOOGL", "MSFT"], [2021, 2022]], names=["ticker", "fy"]
+    )
+    return pd.DataFrame(
+        {
+            "Assets": np.arange(6, dtype=np.int64),
+            "EarningsPerShareDiluted": [1.5, np.nan, 2.25, 3.0, -1.0, 0.5],
+            "ROA>0": [1, 0, 1, 1, 0, 1],
+        },
+        index=index,
+    ).rename_axis(columns="tag")
+
+
+@pytest.mark.parametrize("report_format", ["csv", "json"])
+def test_streaming(report_format: str, monkeypatch: pytest.MonkeyPatch):
+    results = _results()
+    expected = io.StringIO()
+    report.write(results, report_format, expected)
+    assert expected.getvalue() == getattr(results.transpose(), f"to_{report_format}")()
+
+    # Rendering a few values at a time gives the same report
+    monkeypatch.setattr(report, "CHUNK_CELLS", 4)
+    streamed = io.StringIO()
+    report.write(results, report_format, streamed)
+    assert streamed.getvalue() == expected.getvalue()
+
+
+def test_compression(tmp_path: Path):
+    results = _results()
+    path = tmp_path / "report.csv.gz"
+    report.write(results, "csv", path, compression="gzip")
+    with gzip.open(path, "rt", encoding="utf8") as stream:
+        assert stream.read() == results.transpose().to_csv()
+
+    with pytest.raises(ValueError, match="unsupported compression"):
+        report.write(results, "csv", path, compression="snappy")
+    with pytest.raises(ValueError, match="only report files can be compressed"):
+        report.write(results, "csv", io.StringIO(), compression="gzip")
+
+
+@pytest.mark.parametrize("report_format", ["parquet", "feather"])
+def test_columnar(report_format: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(report, "CHUNK_CELLS", 4)
+    results = _results()
+    path = tmp_path / f"report.{report_format}"
+    report.write(results, report_format, path, compression="zstd")
+    read = getattr(pd, f"read_{report_format}")(path)
+    pd.testing.assert_frame_equal(read, results)
+
+    with pytest.raises(ValueError, match="a report file is required"):
+        report.write(results, report_format, io.StringIO())
+
+
+def test_split(tmp_path: Path):
+    results = _results()
+    paths = report.write_split(results, "csv", tmp_path / "reports", workers=2)
+    assert sorted(path.name for path in paths) == [
+        "AAPL.csv",
+        "GOOGL.csv",
+        "MSFT.csv",
+    ]
+    assert (tmp_path / "reports" / "MSFT.csv").read_text("utf8") == (
+        results.loc[["MSFT"]].transpose().to_csv()
+    )
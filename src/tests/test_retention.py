@@ -0,0 +1,99 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from diskcache import Cache
+from requests_cache import CachedResponse, CachedSession, SQLiteCache
+
+from stocktracer import cache, retention
+from stocktracer.collector.archive import ArchiveStore
+from stocktracer.collector.dates import ReportDate
+
+
+def write(path: Path, size: int, mtime: float) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_size_limit(monkeypatch: pytest.MonkeyPatch):
+    assert retention.size_limit("store") is None
+    assert retention.size_limit("store", default="1KB") == 1000
+    monkeypatch.setenv("STOCKTRACER_STORE_SIZE_LIMIT", "2 MiB")
+    assert retention.size_limit("store", default="1KB") == 2 * 1024 * 1024
+    monkeypatch.setenv("STOCKTRACER_STORE_SIZE_LIMIT", "unlimited")
+    assert retention.size_limit("store", default="1KB") is None
+    with pytest.raises(ValueError, match="invalid size"):
+        retention.parse_size("2 parsecs")
+
+
+def test_oldest_retained(monkeypatch: pytest.MonkeyPatch):
+    assert retention.oldest_retained() is None
+    monkeypatch.setenv("STOCKTRACER_RETENTION_YEARS", "2")
+    assert retention.oldest_retained(today=ReportDate(2023, 3)) == ReportDate(2021, 3)
+
+
+def test_trim(tmp_path: Path):
+    oldest = write(tmp_path / "a", 100, 1000)
+    used = write(tmp_path / "b", 100, 3000)
+    newest = write(tmp_path / "c", 100, 2000)
+    files = [oldest, used, newest]
+
+    assert not retention.trim(files, None)
+    assert not retention.trim(files, 300)
+
+    # The least recently used files go first, unless they must be kept
+    assert retention.trim(files, 200, keep=[oldest]) == [newest]
+    assert retention.trim(files, 100) == [oldest]
+    assert used.exists()
+
+
+def test_drop_quarters(tmp_path: Path):
+    files = [
+        write(tmp_path / name, 1, 1000)
+        for name in ("2020q4.parquet", "2021q1.parquet", "scope.json")
+    ]
+    assert retention.drop_quarters(files, None) == []
+    assert retention.drop_quarters(files, ReportDate(2021, 1)) == [files[0]]
+    assert [path.exists() for path in files] == [False, True, True]
+
+
+def test_prune_results(tmp_path: Path):
+    results = Cache(tmp_path)
+    results.set(("extraction", "2020q4", ("FY",), None, 1), "old")
+    results.set(("extraction", "2021q1", ("FY",), None, 1), "new")
+    results.set("num-index-2020q4", "old")
+    results.set("num-index-2021q1", "new")
+    results.set("other", "kept")
+
+    assert cache._prune_results(results, None) == 0
+    assert cache._prune_results(results, ReportDate(2021, 1)) == 2
+    assert sorted(map(str, results.iterkeys())) == sorted(
+        [
+            str(("extraction", "2021q1", ("FY",), None, 1)),
+            "num-index-2021q1",
+            "other",
+        ]
+    )
+
+
+def test_migrate_sec_data(tmp_path: Path):
+    url = "https://www.sec.gov/files/dera/data/financial-statement-data-sets/2023q1.zip"
+    legacy = tmp_path / "data.sqlite"
+    session = CachedSession(backend=SQLiteCache(db_path=legacy))
+    session.cache.save_response(
+        CachedResponse(url=url, status_code=200, content=b"archive")
+    )
+    session.close()
+
+    store = ArchiveStore(tmp_path / "archives", expire_after=timedelta(days=1))
+    assert cache._migrate_sec_data(store, legacy) == 1
+    path = store.get(url)
+    assert path is not None
+    assert path.read_bytes() == b"archive"
+    assert not list(tmp_path.glob("data.sqlite*"))
+
+    # Nothing is left to migrate
+    assert cache._migrate_sec_data(store, legacy) == 0
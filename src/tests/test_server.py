@@ -0,0 +1,107 @@
+import threading
+from pathlib import Path
+
+import mock
+import pandas as pd
+import pytest
+
+from stocktracer import server, versions
+from stocktracer.analysis import stub
+from stocktracer.cli import Cli
+
+
+@pytest.fixture
+def daemon(tmp_path: Path):
+    socket_path = tmp_path / "stocktracer.sock"
+    with server.Server(socket_path, {"analyze": Cli()._compute}) as instance:
+        thread = threading.Thread(target=instance.serve_forever, daemon=True)
+        thread.start()
+        yield server.Client(socket_path, timeout=30)
+        instance.shutdown()
+        thread.join()
+    assert not socket_path.exists()
+
+
+def test_not_available(tmp_path: Path):
+    client = server.Client(tmp_path / "missing.sock")
+    assert not client.available
+
+
+def test_requests(daemon: server.Client):
+    assert daemon.available
+    assert daemon.request("ping") > 0
+    assert (daemon.socket_path.stat().st_mode & 0o077) == 0
+
+    with pytest.raises(ValueError, match="unsupported request"):
+        daemon.request("missing")
+
+
+def test_analyze_forwarded(daemon: server.Client, monkeypatch: pytest.MonkeyPatch):
+    results = pd.DataFrame({"AAPL": [1.0]}, index=["EarningsPerShareDiluted"])
+    get_result = mock.MagicMock(return_value=results)
+    monkeypatch.setattr(Cli, "_get_result", get_result)
+    monkeypatch.setattr(stub.Analysis, "under_development", True)
+    monkeypatch.setattr(server, "SOCKET_PATH", daemon.socket_path)
+    monkeypatch.setattr(Cli, "return_results", True)
+    # Only the daemon may compute the results
+    monkeypatch.setattr(Cli, "_compute", mock.MagicMock(side_effect=AssertionError))
+
+    with pytest.warns(UserWarning, match="under development"):
+        forwarded = Cli().analyze("aapl", analysis_plugin="stocktracer.analysis.stub")
+    pd.testing.assert_frame_equal(forwarded, results)
+    get_result.assert_called_once_with(
+        tickers=["aapl"],
+        analysis_plugin="stocktracer.analysis.stub",
+        final_year=mock.ANY,
+        final_quarter=mock.ANY,
+        plugin_version=versions.plugin_key("stocktracer.analysis.stub"),
+    )
+
+
+def test_errors_are_raised(daemon: server.Client):
+    with pytest.raises(LookupError, match="No analysis results available!"):
+        daemon.request(
+            "analyze",
+            tickers=["aapl"],
+            analysis_plugin="stocktracer.analysis.stub",
+            final_year=2023,
+            final_quarter=1,
+        )
+
+
+def test_running_daemon_is_kept(daemon: server.Client):
+    with pytest.raises(RuntimeError, match="already serving"):
+        server.Server(daemon.socket_path)
+    assert daemon.available
+
+    # The socket left behind by a daemon that died is replaced
+    stale = daemon.socket_path.with_name("stale.sock")
+    stale.touch()
+    with server.Server(stale) as instance:
+        assert instance.socket_path == stale
+
+
+def test_hung_daemon(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    socket_path = tmp_path / "stocktracer.sock"
+    released = threading.Event()
+    results = pd.DataFrame({"AAPL": [1.0]}, index=["EarningsPerShareDiluted"])
+    monkeypatch.setattr(server, "SOCKET_PATH", socket_path)
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT", 0.5)
+    compute = mock.MagicMock(return_value=(results, False))
+    monkeypatch.setattr(Cli, "_compute", compute)
+    monkeypatch.setattr(Cli, "return_results", True)
+
+    with server.Server(socket_path, {"analyze": lambda **_: released.wait()}) as hung:
+        thread = threading.Thread(target=hung.serve_forever, daemon=True)
+        thread.start()
+        try:
+            # The request is run here instead of waiting for the daemon forever
+            analyzed = Cli().analyze(
+                "aapl", analysis_plugin="stocktracer.analysis.stub"
+            )
+        finally:
+            released.set()
+            hung.shutdown()
+            thread.join()
+    pd.testing.assert_frame_equal(analyzed, results)
+    compute.assert_called_once()
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import stocktracer
+
+# Modules that take most of the startup time and are only needed to run a command
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "requests_cache",
+    "diskcache",
+    "alive_progress",
+    "stocktracer.collector.sec",
+)
+
+
+def run_python(code: str, tmp_path: Path) -> str:
+    environment = dict(os.environ, STOCKTRACER_CACHE_DIR=str(tmp_path))
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [str(Path(stocktracer.__file__).parents[1]), environment.get("PYTHONPATH", "")]
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        env=environment,
+        text=True,
+    ).stdout
+
+
+@pytest.mark.parametrize("module", ["stocktracer.__main__", "stocktracer.cache"])
+def test_import_is_lazy(tmp_path: Path, module: str):
+    loaded = run_python(
+        f"import sys, {module}; "
+        f"print(*[name for name in {HEAVY_MODULES!r} if name in sys.modules])",
+        tmp_path,
+    )
+    assert loaded.split() == []
+
+    # Nothing was opened in the cache directory either
+    assert {path.name for path in tmp_path.iterdir()} == set()
+
+
+def test_benchmark_import(benchmark, tmp_path: Path):
+    benchmark.pedantic(
+        run_python, args=("import stocktracer.__main__", tmp_path), rounds=3
+    )
@@ -0,0 +1,121 @@
+import dataclasses
+import importlib
+from pathlib import Path
+
+import pytest
+from diskcache import Cache
+
+from stocktracer import versions
+
+SOURCE = '''"""A plugin."""
+
+
+class Analysis:
+    """Analyze."""
+
+    def analyze(self):
+        return 1
+
+
+def helper():
+    return 2
+'''
+
+
+@pytest.fixture
+def modules(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Write modules that can be fingerprinted."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def write(name: str, source: str) -> str:
+        (tmp_path / f"{name}.py").write_text(source, "utf8")
+        importlib.invalidate_caches()
+        return name
+
+    return write
+
+
+def test_fingerprint(modules):
+    original = versions.fingerprint(modules("original", SOURCE))
+
+    # Documentation, comments and formatting don't change the code
+    documented = SOURCE.replace('"""Analyze."""', '"""Analyze the data."""')
+    documented = documented.replace(
+        "return 1", "return (\n            1  # one\n        )"
+    )
+    assert versions.fingerprint(modules("documented", documented)) == original
+
+    changed = modules("changed", SOURCE.replace("return 1", "return 3"))
+    assert versions.fingerprint(changed) != original
+    # Only the parts of the module that changed are affected
+    assert versions.fingerprint(f"{changed}:Analysis") != versions.fingerprint(
+        "original:Analysis"
+    )
+    assert versions.fingerprint(f"{changed}:helper") == versions.fingerprint(
+        "original:helper"
+    )
+
+    with pytest.raises(LookupError):
+        versions.fingerprint("original:missing")
+    with pytest.raises(LookupError):
+        versions.fingerprint("stocktracer_missing_module")
+
+
+def test_plugin_key(modules):
+    assert versions.plugin_key(modules("first", SOURCE)) != versions.plugin_key(
+        modules("second", SOURCE.replace("return 1", "return 3"))
+    )
+    assert versions.plugin_key("first") == versions.plugin_key("first")
+
+
+def test_plugin_key_imports(tmp_path: Path, modules):
+    (tmp_path / "plugins").mkdir()
+    modules("plugins/__init__", "")
+    modules("plugins/helpers", SOURCE)
+    plugin = modules("plugins/score", "from plugins.helpers import helper\n")
+    plugin = plugin.replace("/", ".")
+    assert versions.imports(plugin) == ("plugins.helpers",)
+    before = versions.plugin_key(plugin)
+
+    # Changing a helper the plugin imports changes its results
+    modules("plugins/helpers", SOURCE.replace("return 2", "return 3"))
+    versions.fingerprint.cache_clear()
+    versions._parse.cache_clear()
+    assert versions.plugin_key(plugin) != before
+
+
+def test_refresh(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    results = Cache(tmp_path)
+    assert versions.refresh(results) == list(versions.STAGES)
+    assert not versions.refresh(results)
+
+    for tag in versions.STAGES:
+        results.set(tag, "cached", tag=tag)
+
+    # A new version of the extraction only evicts the extractions
+    monkeypatch.setattr(
+        versions,
+        "stage_key",
+        lambda tag: "changed" if tag == "extraction" else results.get(("stage", tag)),
+    )
+    assert versions.refresh(results) == ["extraction"]
+    assert "extraction" not in results
+    assert all(tag in results for tag in versions.STAGES if tag != "extraction")
+
+
+def test_stage_key_depends_on_upstream_stages(monkeypatch: pytest.MonkeyPatch):
+    index = versions.stage_key("index")
+    sec = versions.stage_key("sec")
+    results = versions.stage_key("results")
+    versions.stage_key.cache_clear()
+    monkeypatch.setitem(
+        versions.STAGES,
+        "extraction",
+        dataclasses.replace(versions.STAGES["extraction"], version=2),
+    )
+    try:
+        assert versions.stage_key("sec") != sec
+        assert versions.stage_key("results") != results
+        assert versions.stage_key("index") == index
+    finally:
+        versions.stage_key.cache_clear()